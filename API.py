@@ -1,88 +1,729 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
 import serial
-import serial.tools.list_ports
 import time
+import heapq
+import threading
+import itertools
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+from telemetry import TelemetryHistory
+from eventlog import get_logger
+from metrics import LINK_METRICS
+
+log = get_logger("api")
+
+
+def _command_label(cmd) -> str:
+    """Metric label for a command byte or a pipelined batch (e.g. "0x01", "0x01+0x02")."""
+    if isinstance(cmd, tuple): return "+".join(f"{c:#04x}" for c in cmd)
+    return f"{cmd:#04x}"
 
 # ==============================================================================
 # 1. API LAYER 
 # ==============================================================================
 
+# Transaction priorities: the lowest number gets the port first
+PRIORITY_URGENT = 0         # Setter writes and close(): the user is waiting on them
+PRIORITY_INTERACTIVE = 1    # Reads a user asked for (refresh button, CLI)
+PRIORITY_POLL = 2           # Background polling (the default)
+
+
+class Transaction:
+    """
+    Priority, deadline and cancel flag shared by every exchange a thread
+    makes inside `with transaction(...)`. A cancelled or expired transaction
+    stops before its next exchange (also while queued for the port); bytes
+    already on the wire always complete, so the link never desynchronizes.
+    """
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        self.priority = priority
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.cancelled = False
+        self._lock = None       # PortLock it is queued on, woken by cancel()
+
+    def remaining(self):
+        """Seconds left before the deadline (None = no deadline)."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.cancelled or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def cancel(self):
+        """Stops the transaction before its next exchange (callable from any thread)."""
+        self.cancelled = True
+        lock = self._lock
+        if lock is not None: lock.wake()
+
+
+_transactions = threading.local()
+
+
+@contextmanager
+def transaction(priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+    """
+    Runs the exchanges this thread makes in the block at `priority`, starting
+    them within `timeout` seconds: `with transaction(PRIORITY_INTERACTIVE, 2.0) as t: conn.update()`.
+    Exchanges past the deadline or after t.cancel() return None, like a lost
+    reply; one already on the wire still waits out its reply deadline.
+    """
+    txn = Transaction(priority, timeout)
+    stack = _transactions.__dict__.setdefault("stack", [])
+    stack.append(txn)
+    try:
+        yield txn
+    finally:
+        stack.pop()
+
+
+def current_transaction():
+    """The innermost transaction() of the calling thread (None = background poll)."""
+    stack = getattr(_transactions, "stack", None)
+    return stack[-1] if stack else None
+
+
+class PortLock:
+    """
+    Re-entrant lock around one serial transaction (write + reply).
+    Waiters are served by priority, then in arrival order: a setter write
+    (PRIORITY_URGENT) or a user's read goes ahead of any waiting background
+    poll, so it waits for at most the one exchange already on the wire.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._owner = None
+        self._depth = 0
+        self._waiting = []      # Heap of (priority, ticket)
+        self._tickets = itertools.count()
+
+    def acquire(self, priority: int = PRIORITY_POLL, txn: Transaction = None) -> bool:
+        """
+        Blocks until this thread owns the port. With a transaction, gives up
+        (returns False) once it is cancelled or past its deadline.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            if txn is not None: txn._lock = self
+            try:
+                while self._owner is not None or self._waiting[0] != ticket:
+                    if txn is not None and txn.expired():
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        self._cond.notify_all()     # The next waiter may be first now
+                        return False
+                    remaining = None if txn is None else txn.remaining()
+                    self._cond.wait(None if remaining is None else max(remaining, 0.0))
+                heapq.heappop(self._waiting)
+                self._owner, self._depth = me, 1
+                return True
+            finally:
+                if txn is not None: txn._lock = None
+
+    def release(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._cond.notify_all()
+
+    def wake(self):
+        """Makes waiters re-check their transactions (after a cancel())."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def waiting(self) -> int:
+        with self._cond:
+            return len(self._waiting)
+
+    @contextmanager
+    def hold(self, priority: int = PRIORITY_POLL):
+        """Context manager: `with lock.hold(PRIORITY_URGENT): ...`"""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class CommandQueue:
+    """
+    Queue of user requests (setter writes or on-demand reads), drained by its
+    own thread. submit() returns a Future right away. A request whose
+    key is already waiting replaces the queued arguments instead of queueing
+    another call, so ten slider positions dragged while one write is in flight
+    collapse to the latest one; every superseded Future resolves with that
+    call's result.
+    Each call runs as a transaction(): the lowest priority number goes first
+    (arrival order among equals), and a call still queued at its deadline is
+    not run; its Futures raise TimeoutError. Future.cancel() drops a queued call.
+    """
+    def __init__(self, name: str = "commands"):
+        self.name = name
+        self.coalesced = 0          # Writes dropped because a newer value replaced them
+        self.expired = 0            # Calls dropped because their deadline passed in the queue
+        self._pending = OrderedDict()   # key -> [func, args, futures, priority, deadline]
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, key, func, *args, priority: int = PRIORITY_URGENT, timeout: float = None) -> Future:
+        """
+        Queues func(*args). `key` None never coalesces; `timeout` is the
+        budget in seconds for queueing and port waits (an exchange already
+        on the wire finishes).
+        """
+        future = Future()
+        if key is None: key = object()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[0], entry[1] = func, args
+                entry[2].append(future)
+                entry[3], entry[4] = min(entry[3], priority), deadline
+                self.coalesced += 1
+            else:
+                self._pending[key] = [func, args, [future], priority, deadline]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = min(self._pending, key=lambda k: self._pending[k][3])
+                func, args, futures, priority, deadline = self._pending.pop(key)
+            futures = [f for f in futures if f.set_running_or_notify_cancel()]
+            if not futures: continue
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                self.expired += 1
+                for f in futures: f.set_exception(TimeoutError(f"{self.name}: deadline passed in the queue"))
+                continue
+            try:
+                with transaction(priority, timeout):
+                    result = func(*args)
+            except Exception as e:
+                for f in futures: f.set_exception(e)
+            else:
+                for f in futures: f.set_result(result)
+
+
+class CircuitBreaker:
+    """
+    Health state of one link: CLOSED (normal), OPEN (board silent, fail fast)
+    and HALF_OPEN (one trial exchange in flight).
+    `threshold` consecutive failures trip it open; after a backoff that
+    doubles on every failed trial (up to max_delay) the next exchange is let
+    through as the trial, and its outcome closes or re-opens the breaker.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0           # Consecutive failed exchanges
+        self.delay = base_delay     # Current backoff
+        self.retry_at = 0.0         # monotonic time of the next trial
+        self.lastError = None       # "timeout" or "io" of the last failure
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if an exchange may go on the wire (claims the trial slot when due)."""
+        with self._lock:
+            if self.state == self.CLOSED: return True
+            if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def reset(self):
+        """Back to CLOSED with a fresh backoff (e.g. after a deliberate close())."""
+        with self._lock:
+            self.state, self.failures, self.delay, self.lastError = self.CLOSED, 0, self.base_delay, None
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial is due (0 when not open)."""
+        if self.state != self.OPEN: return 0.0
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record(self, ok: bool, error: str = "timeout") -> str:
+        """Feeds one exchange outcome; returns the new state."""
+        with self._lock:
+            if ok:
+                self.state, self.failures, self.delay = self.CLOSED, 0, self.base_delay
+                return self.state
+            self.failures += 1
+            self.lastError = error
+            if self.state == self.HALF_OPEN:
+                self.delay = min(self.delay * 2, self.max_delay)
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.retry_at = time.monotonic() + self.delay
+            return self.state
+
+
+class RttEstimator:
+    """
+    Reply deadline of one command, from the round trips seen so far
+    (Jacobson/Karels, as in TCP's RTO): `srtt` and `rttvar` track the mean
+    and mean deviation, and the deadline is srtt + K * rttvar clamped to
+    [floor, ceiling]. Until the first reply is timed it is `initial`. A
+    timeout doubles it (up to the ceiling) until the next good reply, so a
+    link that slowed down is not cut off on every exchange. The connection
+    applies Karn's rule: no sample from an exchange right after a timeout.
+    """
+    ALPHA = 1 / 8       # Gain of the mean
+    BETA = 1 / 4        # Gain of the deviation
+    K = 4               # Deviations of slack above the mean
+
+    def __init__(self, initial: float, floor: float = 0.05, ceiling: float = 2.0):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.srtt = None            # Smoothed round trip (None = no reply timed yet)
+        self.rttvar = None          # Smoothed mean deviation
+        self.rto = self._clamp(initial)
+        self.samples = 0
+        self.backoffs = 0
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.floor), self.ceiling)
+
+    def observe(self, rtt: float):
+        """Feeds the round trip of one complete reply."""
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.samples += 1
+        self.rto = self._clamp(self.srtt + self.K * self.rttvar)
+
+    def backoff(self):
+        """A reply missed the deadline: double it until a reply is timed again."""
+        self.backoffs += 1
+        self.rto = self._clamp(self.rto * 2)
+
+
 class HomeAutomationSystemConnection(ABC):
     """
     Abstract Base Class for handling serial connections to different automation boards.
     """
+    BOARD_NAME = "board"    # Default "board" label on the exported metrics
+    PROBE_COMMAND = None    # Cheap GET used to re-probe a board after the breaker trips
+    # Bulk status opcode: one request, reply frame LEN | payload | CHK where
+    # LEN is the payload length and CHK = (LEN + payload) mod 256.
+    # Older firmware ignores the opcode; see _read_status_frame().
+    BULK_COMMAND = 0x0F
+    BULK_PROBES = 3         # Silent replies in a row before the firmware counts as legacy
+    BULK_REPROBE = 600.0    # Seconds between re-probes of legacy firmware (it may be reflashed)
+    BULK_LENGTH = None      # Payload bytes of this board's frame (None = no bulk read)
+    # Reply deadlines before the link has been timed; see replyDeadline()
+    REPLY_DEADLINE = 1.0
+    BULK_DEADLINE = 1.0
+
     def __init__(self):
+        self.name = self.BOARD_NAME
+        self.metrics = LINK_METRICS     # Latency/timeout/byte counters (see metrics.py)
         self.comPort = 0
         self.baudRate = 9600
         self.ser = None
+        self.lastTiming = None  # (command, seconds, ok) of the last exchange
+        self.timingStats = {}   # command -> running timing counters
+        self.onWrite = None     # Optional callback(field) run after a setter writes
+        # Builds the port object; swap for recording.Recorder / recording.Replayer
+        self.serialFactory = serial.serial_for_url
+        self.portLock = PortLock()                  # One transaction on the wire at a time
+        # Async requests, in two lanes: a queued write never waits behind a
+        # whole update() on the read thread, only for the exchange on the wire
+        self.commands = CommandQueue(f"commands-{type(self).__name__}")  # On-demand reads
+        self.writes = CommandQueue(f"writes-{type(self).__name__}")      # Setter writes
+        self.breaker = CircuitBreaker()     # Fails fast while the board is silent
+        self.bulkSupported = None           # Firmware answers BULK_COMMAND? (None = not probed yet)
+        self.onBulkProbe = None             # Optional callback(supported) when bulkSupported changes
+        self._bulkSilent = 0                # Consecutive unanswered probes
+        self._bulkRetryAt = 0.0             # monotonic time of the next legacy re-probe
+        # Per-command reply deadlines follow the measured round trips, kept
+        # within [deadlineFloor, deadlineCeiling]; False = fixed initial values
+        self.adaptiveDeadlines = True
+        self.deadlineFloor = 0.05
+        self.deadlineCeiling = 2.0
+        self.rtt = {}                       # command -> RttEstimator
+        self._rttAmbiguous = False          # Last exchange timed out (Karn's rule)
+        self._drainUntil = 0.0              # clock() time a late reply may still land by
+        # Time source of the exchanges (round trips, reply deadlines, drain
+        # waits); recording.replay() swaps in the session's virtual clock
+        self.clock = time.perf_counter
+        self.sleep = time.sleep
 
-    def setComPort(self, port: int):
+    def setComPort(self, port):
+        """Port number (opens COM{n}) or a device path / pyserial URL (e.g. /dev/pts/3)."""
         self.comPort = port
 
     def setBaudRate(self, rate: int):
         self.baudRate = rate
 
+    def getPortName(self) -> str:
+        """Resolves the configured port to the name passed to pyserial."""
+        if isinstance(self.comPort, int): return f"COM{self.comPort}"
+        return str(self.comPort)
+
     def open(self) -> bool:
         """Attempts to open the serial connection with specified settings."""
+        port_name = self.getPortName()
         try:
-            port_name = f"COM{self.comPort}"
-            # Timeout increased based on requirement R2.3-2
-            self.ser = serial.Serial(port_name, self.baudRate, timeout=0.5)
-            # Stable settings derived from previous board2ui.py configurations
+            # Every exchange sets its own read timeout (see _read_reply); this
+            # only bounds reads made before the first one
+            self.ser = self.serialFactory(port_name, self.baudRate, timeout=self.deadlineCeiling, do_not_open=True)
+            # Stable settings derived from previous board2ui.py configurations.
+            # Set before open() so pyserial applies them (and tolerates ptys without modem lines).
             self.ser.dtr = False
             self.ser.rts = False
+            self.ser.open()
             self.ser.flushInput()   # Clear buffer on startup to remove stale data
             self.ser.flushOutput()
+            self.bulkSupported = None   # The board may run different firmware now
+            self._bulkSilent = 0
+            self.rtt = {}               # ... behind a different link
             return True
         except Exception as e:
-            print(f"Connection Error ({port_name}): {e}")
+            log.error("Connection Error (%s): %s", port_name, e)
             return False
 
     def close(self) -> bool:
         """Safely closes the serial connection."""
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-            return True
-        return False
+        with self.portLock.hold(PRIORITY_URGENT):
+            self.breaker.reset()    # A closed port is not a failing link
+            if self.ser and self.ser.is_open:
+                self.ser.close()
+                return True
+            return False
 
     def is_connected(self) -> bool:
         """Checks if the serial port is currently open."""
         return self.ser is not None and self.ser.is_open
 
-    def _send_command(self, cmd_byte) -> int:
+    def _read_reply(self, count: int, deadline: float) -> bytes:
         """
-        FIX: Send and Wait for Response (Smart Read).
-        Old code just slept and read; this waits until data actually arrives.
+        Blocking read of up to `count` bytes within `deadline` seconds.
+        pyserial waits on the port itself (select() on POSIX, overlapped I/O on
+        Windows), so this returns as soon as the bytes arrive instead of polling.
         """
-        if not self.is_connected(): return 0
-        
+        data = b""
+        end_time = self.clock() + deadline
+        while len(data) < count:
+            remaining = end_time - self.clock()
+            if remaining <= 0:
+                break
+            self.ser.timeout = remaining
+            chunk = self.ser.read(count - len(data))
+            if not chunk:
+                break   # Port timeout expired
+            data += chunk
+        return data
+
+    def _record_timing(self, cmd_byte, elapsed: float, ok: bool):
+        """Stores the duration of one request/response exchange."""
+        self.lastTiming = (cmd_byte, elapsed, ok)
+        labels = (self.name, _command_label(cmd_byte))
+        if ok: self.metrics.latency.observe(labels, elapsed)
+        else: self.metrics.timeouts.inc(labels)
+        stats = self.timingStats.get(cmd_byte)
+        if stats is None:
+            stats = self.timingStats[cmd_byte] = {"count": 0, "timeouts": 0, "total": 0.0, "max": 0.0}
+        stats["count"] += 1
+        if not ok: stats["timeouts"] += 1
+        stats["total"] += elapsed
+        if elapsed > stats["max"]: stats["max"] = elapsed
+        est = self._estimator(cmd_byte)
+        # Karn's rule: right after a timeout a reply may be the late answer
+        # to the previous command, so its round trip is not sampled
+        if ok and not self._rttAmbiguous: est.observe(elapsed)
+        # A slow link (e.g. a long I2C read) delays every command, so all of
+        # them back off
+        elif not ok:
+            for other in self.rtt.values(): other.backoff()
+        self._rttAmbiguous = not ok
+        self.metrics.reply_deadline.set(labels, self.replyDeadline(cmd_byte))
+
+    def _estimator(self, cmd) -> RttEstimator:
+        est = self.rtt.get(cmd)
+        if est is None:
+            initial = self.BULK_DEADLINE if cmd == self.BULK_COMMAND else self.REPLY_DEADLINE
+            est = self.rtt[cmd] = RttEstimator(initial, self.deadlineFloor, self.deadlineCeiling)
+        return est
+
+    def replyDeadline(self, cmd) -> float:
+        """
+        Seconds to wait for the reply to `cmd` (a command byte, or a tuple for
+        a pipelined batch): REPLY_DEADLINE / BULK_DEADLINE until the command
+        has been timed on this link, then its RttEstimator's deadline.
+        """
+        if not self.adaptiveDeadlines:
+            return self.BULK_DEADLINE if cmd == self.BULK_COMMAND else self.REPLY_DEADLINE
+        return self._estimator(cmd).rto
+
+    def getTimingStats(self) -> dict:
+        """
+        Returns per-command timing: count, timeouts, mean and max seconds, and
+        the reply deadline estimate (srtt, rttvar, deadline).
+        """
+        stats = {}
+        for cmd, st in self.timingStats.items():
+            est = self.rtt.get(cmd)
+            stats[cmd] = {
+                "count": st["count"],
+                "timeouts": st["timeouts"],
+                "mean": st["total"] / st["count"] if st["count"] else 0.0,
+                "max": st["max"],
+                "srtt": est.srtt if est else None,
+                "rttvar": est.rttvar if est else None,
+                "deadline": self.replyDeadline(cmd) if est else None,
+            }
+        return stats
+
+    def _exchange(self, cmd_bytes, deadline: float = None, count: int = None, probe: bool = False):
+        """
+        One transaction: discard stale input, write the command bytes and block
+        for `count` reply bytes (default one per command). Returns the reply
+        bytes (short on a timeout) or None on an IO error; every outcome lands
+        in the metrics. Runs at the calling thread's transaction() priority and
+        within its deadline (None when it was cancelled or ran out of time).
+        `deadline` None waits replyDeadline(); a number is a fixed wait.
+        With `probe`, no reply at all is an answer (the firmware lacks the
+        command), not a timeout: it stays out of the stats and the breaker.
+        """
+        if count is None: count = len(cmd_bytes)
+        label = cmd_bytes[0] if len(cmd_bytes) == 1 else tuple(cmd_bytes)
+        txn = current_transaction()
+        if not self.portLock.acquire(PRIORITY_POLL if txn is None else txn.priority, txn):
+            self.metrics.deadline_misses.inc((self.name, _command_label(label)))
+            return None
         try:
-            # Clear old (delayed) data from the buffer so synchronization doesn't drift
-            self.ser.reset_input_buffer() 
-            
-            # Send the command byte
-            self.ser.write(bytes([cmd_byte]))
-            
-            # Wait for response (Max 1.0 second)
-            # Sensors like BMP180 read via I2C might delay the PIC's response.
-            start_time = time.time()
-            while (time.time() - start_time) < 1.0:
-                if self.ser.in_waiting > 0:
-                    data = self.ser.read(1)
-                    return int.from_bytes(data, byteorder='big')
-                time.sleep(0.01) # Tiny sleep to reduce CPU usage
-            
-            print(f"Timeout: No response for command {hex(cmd_byte)}.")
-            return 0 # Return 0 on Timeout
-        except Exception as e:
-            print(f"IO Error: {e}")
-            return 0
+            if deadline is None: deadline = self.replyDeadline(label)
+            # The transaction deadline only stops new exchanges: a reply cut
+            # short would arrive during the next one and pass for its answer
+            if txn is not None and txn.expired():
+                self.metrics.deadline_misses.inc((self.name, _command_label(label)))
+                return None
+            # Checked under the lock: a trial slot claimed here is always used
+            if not self.breaker.allow():
+                self.metrics.short_circuits.inc((self.name, _command_label(label)))
+                return None
+            try:
+                # Clear old (delayed) data from the buffer so synchronization doesn't drift
+                # After a timeout the reply may still be on its way: let it
+                # land before the buffer is cleared, or it passes for this answer
+                wait = self._drainUntil - self.clock()
+                if wait > 0: self.sleep(wait)
+                stale = self.ser.in_waiting
+                if stale: self.metrics.stale_discards.inc((self.name,), stale)
+                self.ser.reset_input_buffer()
+
+                start_time = self.clock()
+                self.ser.write(bytes(cmd_bytes))
+                self.metrics.bytes_sent.inc((self.name,), len(cmd_bytes))
+
+                data = self._read_reply(count, deadline)
+                if data: self.metrics.bytes_received.inc((self.name,), len(data))
+                # A silent probe is an answer, unless it was the breaker's trial.
+                # Firmware that has the opcode may still answer late (slow boot,
+                # board 2's long main loop): let that frame land before the next
+                # exchange, or its LEN byte passes for a single-value reply
+                if probe and not data and self.breaker.state == CircuitBreaker.CLOSED:
+                    self._drainUntil = start_time + 2 * deadline
+                    return data
+                ok = len(data) == count
+                self._record_timing(label, self.clock() - start_time, ok)
+                self._record_health(ok)
+                # Late by more than the backed-off deadline counts as lost
+                # (fixed deadlines are long enough not to need the wait)
+                if not ok and self.adaptiveDeadlines: self._drainUntil = start_time + 2 * deadline
+                return data
+            except Exception as e:
+                self.metrics.io_errors.inc((self.name, _command_label(label)))
+                log.error("IO Error on %s: %s", self.comPort, e)
+                self._record_health(False, "io")
+                return None
+        finally:
+            self.portLock.release()
+
+    def _record_health(self, ok: bool, error: str = "timeout"):
+        """Feeds the circuit breaker and logs/exports its state changes."""
+        before = self.breaker.state
+        after = self.breaker.record(ok, error)
+        if after != before:
+            self.metrics.circuit_open.set((self.name,), 0 if after == CircuitBreaker.CLOSED else 1)
+            if after == CircuitBreaker.OPEN:
+                log.warning("%s link down (%s); retrying in %.1f s", self.name, error, self.breaker.delay)
+            else:
+                log.info("%s link %s", self.name, after)
+
+    def recover(self) -> bool:
+        """
+        Background reconnection step, called by the poll thread while the
+        breaker is open. Once the backoff has elapsed it reopens the port if
+        it was lost (IO error) and re-probes with one cheap command; only a
+        reply closes the breaker and resumes full polling.
+        """
+        if self.breaker.retry_in() > 0 or self.breaker.state != CircuitBreaker.OPEN: return False
+        if self.breaker.lastError == "io" or not self.is_connected():
+            with self.portLock.hold(PRIORITY_URGENT):
+                if self.ser: self.ser.close()
+                if not self.open():
+                    self.breaker.allow()    # Counts as the failed trial
+                    self._record_health(False, "io")
+                    return False
+        if self.PROBE_COMMAND is None: return False
+        return self._exchange((self.PROBE_COMMAND,)) not in (None, b"")
+
+    def _send_command(self, cmd_byte, deadline: float = None):
+        """
+        Send and Wait for Response.
+        Blocks on the port until the reply byte arrives (or the deadline passes;
+        None = the command's adaptive replyDeadline()).
+        Returns the reply value, or None on a timeout or IO error so callers can
+        tell a lost reply from a real reading of 0.
+        """
+        if not self.is_connected(): return None
+
+        # Sensors like BMP180 read via I2C might delay the PIC's response.
+        data = self._exchange((cmd_byte,), deadline)
+        if data: return data[0]
+        if data is not None:
+            log.warning("Timeout: No response for command %#04x on %s.", cmd_byte, self.comPort)
+        return None
+
+    def _send_batch(self, cmd_bytes, deadline: float = None):
+        """
+        Pipelined read: writes all command bytes in one call and reads the
+        replies as one block under a single deadline.
+        Returns the reply values in command order, or None if the block came
+        back short (a lost reply would shift every later value to the wrong field).
+        """
+        if not self.is_connected(): return None
+
+        data = self._exchange(tuple(cmd_bytes), deadline)
+        if data is not None and len(data) == len(cmd_bytes):
+            return list(data)
+        if data is not None:
+            log.warning("Pipeline short read on %s: %d/%d replies.", self.comPort, len(data), len(cmd_bytes))
+        return None
+
+    def _read_status_frame(self):
+        """
+        Reads the whole board state in one exchange. Returns the payload bytes,
+        or None when the firmware lacks the opcode or the frame was bad; the
+        caller then falls back to the single-value commands. Until a frame
+        has arrived each call is a probe: BULK_PROBES unanswered ones in a
+        row (one lost reply is not enough) mark the firmware as legacy, and
+        the opcode is then only re-sent every BULK_REPROBE seconds.
+        """
+        if self.BULK_LENGTH is None: return None
+        if self.bulkSupported is False and time.monotonic() < self._bulkRetryAt: return None
+        probing = self.bulkSupported is not True
+        frame = self._exchange((self.BULK_COMMAND,), count=self.BULK_LENGTH + 2, probe=probing)
+        if frame is None: return None
+        if probing and not frame:
+            self._bulkSilent += 1
+            if self._bulkSilent >= self.BULK_PROBES:
+                self._bulkRetryAt = time.monotonic() + self.BULK_REPROBE
+                if self.bulkSupported is None:
+                    log.info("%s firmware has no bulk status opcode; using single reads", self.name)
+                    self._set_bulk_supported(False)
+            return None
+        if len(frame) != self.BULK_LENGTH + 2: return None     # Timed out (already counted)
+        if frame[0] != self.BULK_LENGTH or sum(frame[:-1]) & 0xFF != frame[-1]:
+            self.metrics.frame_errors.inc((self.name,))
+            log.warning("Bad status frame on %s: %s", self.comPort, frame.hex())
+            return None
+        self._bulkSilent = 0
+        if self.bulkSupported is not True:
+            log.info("%s firmware supports the bulk status opcode", self.name)
+            self._set_bulk_supported(True)
+        return frame[1:-1]
+
+    def probeBulkSupport(self):
+        """
+        Settles bulkSupported now (up to BULK_PROBES exchanges) instead of
+        during the next updates. Returns it, or None when the board answered
+        nothing at all (a dead link says nothing about its firmware).
+        """
+        if self.BULK_LENGTH is None: return None
+        for _ in range(self.BULK_PROBES):
+            if self.bulkSupported is not None: break
+            self._read_status_frame()
+        if self.bulkSupported is False and self.PROBE_COMMAND is not None \
+                and not self._exchange((self.PROBE_COMMAND,)):
+            self.bulkSupported, self._bulkSilent = None, 0
+        return self.bulkSupported
+
+    def _set_bulk_supported(self, supported: bool):
+        self.bulkSupported = supported
+        if self.onBulkProbe: self.onBulkProbe(supported)
+
+    def assumeLegacyFirmware(self):
+        """
+        Skips the bulk probe after open() (e.g. the port map already knows the
+        firmware lacks the opcode); it is still re-probed every BULK_REPROBE s.
+        """
+        self.bulkSupported = False
+        self._bulkSilent = self.BULK_PROBES
+        self._bulkRetryAt = time.monotonic() + self.BULK_REPROBE
+
+    def _count_write(self, count: int):
+        """Counts setter bytes written outside a request/response exchange."""
+        self.metrics.bytes_sent.inc((self.name,), count)
+
+    def _wrote(self, field: str):
+        """Notifies the onWrite hook (e.g. the poll scheduler) that a setter changed a field."""
+        if self.onWrite: self.onWrite(field)
+
+    def _refresh(self, fields=None) -> dict:
+        self.update(fields)
+        return self.snapshot()
+
+    def updateAsync(self, fields=None, priority: int = PRIORITY_INTERACTIVE, timeout: float = None) -> Future:
+        """
+        Queues update() on the read thread and returns at once; the Future
+        resolves with the new snapshot. Its reads go ahead of the background
+        poll, and refresh requests at the same priority that pile up while
+        one is queued collapse into it (a user's refresh never joins a
+        PRIORITY_POLL one). `timeout` bounds queueing and port waits; fields
+        not read by then keep their previous values.
+        """
+        key = ("update", None if fields is None else tuple(fields), priority)
+        return self.commands.submit(key, self._refresh, fields, priority=priority, timeout=timeout)
+
+    @abstractmethod
+    def update(self, fields=None): 
+        """
+        Abstract method to update sensor data from the board.
+        `fields` limits the read to some keys of FIELD_COMMANDS (None = all).
+        """
+        pass
 
     @abstractmethod
-    def update(self): 
-        """Abstract method to update sensor data from the board."""
+    def snapshot(self) -> dict:
+        """Abstract method returning the last readings as a plain dict."""
         pass
 
 
@@ -90,59 +731,178 @@ class AirConditionerSystemConnection(HomeAutomationSystemConnection):
     """
     Concrete implementation for the Air Conditioner control board.
     """
+    BOARD_NAME = "ac"
+    PROBE_COMMAND = 0x05    # Fan speed: one byte, answered within a display frame
+    # Bulk frame payload, in STATUS_COMMANDS order: one consistent snapshot (no torn pairs)
+    BULK_LENGTH = 5
+    BULK_DEADLINE = 0.25
+    # Commands defined in board1.asm firmware, in the order update() reads them
+    STATUS_COMMANDS = (0x01, 0x02, 0x03, 0x04, 0x05)
+    # Field -> commands that read it (fraction/integer pairs are always read together)
+    FIELD_COMMANDS = {
+        "desiredTemperature": (0x01, 0x02),
+        "ambientTemperature": (0x03, 0x04),
+        "fanSpeed": (0x05,),
+    }
+    # Smallest change that counts as "moving" for the adaptive poll scheduler
+    FIELD_TOLERANCE = {"desiredTemperature": 0.1, "ambientTemperature": 0.1, "fanSpeed": 1}
+
     def __init__(self):
         super().__init__()
         self.desiredTemperature = 0.0
         self.ambientTemperature = 0.0
         self.fanSpeed = 0
+        # Pipelined mode: send 0x01-0x05 in one write, read 5 replies as one block.
+        # board1.asm keeps a single-byte RX mailbox that is serviced once per
+        # display frame, so a back-to-back batch can lose bytes on real hardware;
+        # short replies fall back to the one-by-one exchange.
+        self.pipelined = False
+        # Write-through setpoint cache: setDesiredTemp() and every 0x01/0x02
+        # read make desiredTemperature valid for setpointCacheTTL seconds, and
+        # update() skips those two round trips meanwhile. The keypad can change
+        # the setpoint on the board, so the cache expires on this slow schedule;
+        # invalidateSetpoint() drops it early (0 disables it).
+        self.setpointCacheTTL = 30.0
+        self._setpointValidUntil = 0.0
+        # Bumped by every setDesiredTemp(): a 0x01/0x02 read that started
+        # before the latest write returns the old setpoint and is dropped
+        self._setpointWrites = 0
+
+    def invalidateSetpoint(self):
+        """Forces the next update() to read the setpoint from the board."""
+        self._setpointValidUntil = 0.0
+
+    def _setpoint_cached(self) -> bool:
+        return self.setpointCacheTTL > 0 and time.monotonic() < self._setpointValidUntil
+
+    def _read_commands(self, commands) -> dict:
+        """
+        Reads a list of GET commands; returns {cmd: value}. Uses the bulk
+        status frame when the firmware has it, else pipelined (if enabled) or
+        one-by-one reads.
+        """
+        payload = self._read_status_frame() if len(commands) > 1 else None
+        if payload is not None:
+            frame = dict(zip(self.STATUS_COMMANDS, payload))
+            return {cmd: frame[cmd] for cmd in commands}
+        values = None
+        if self.pipelined:
+            values = self._send_batch(commands)
+        if values is None:
+            values = [self._send_command(cmd) for cmd in commands]
+        return dict(zip(commands, values))
+
+    @staticmethod
+    def _decode_temp(reply, frac_cmd, int_cmd):
+        """
+        Joins an integer/fraction reply pair; None if either byte timed out.
+        board1.asm keeps both fractions in hundredths (FRAC_TEMP, and
+        TARGET_TEMP_FRAC = tenths * 10 + hundredths from the keypad).
+        """
+        frac, whole = reply.get(frac_cmd), reply.get(int_cmd)
+        if frac is None or whole is None: return None
+        return round(whole + frac / 100, 2)
 
-    def update(self):
+    def update(self, fields=None):
         """Fetches current status from the AC unit via Serial."""
         if not self.is_connected(): return
-        
-        # 1. Get Desired Temp (Fractional part then Integer part)
-        d_frac = self._send_command(0x01)
-        d_int = self._send_command(0x02)
-        self.desiredTemperature = float(f"{d_int}.{d_frac}")
 
-        # 2. Get Ambient Temp (Fractional part then Integer part)
-        a_frac = self._send_command(0x03)
-        a_int = self._send_command(0x04)
-        self.ambientTemperature = float(f"{a_int}.{a_frac}")
+        fields = list(self.FIELD_COMMANDS if fields is None else fields)
+        use_cache = "desiredTemperature" in fields and self._setpoint_cached()
+        if use_cache: fields.remove("desiredTemperature")
+        commands = [cmd for field in fields for cmd in self.FIELD_COMMANDS[field]]
+        writes = self._setpointWrites
+        reply = self._read_commands(commands) if commands else {}
+
+        # A reply that timed out (None) keeps the previous reading
+        ambient = self._decode_temp(reply, 0x03, 0x04)
+
+        # 1. Desired Temp (Fractional part then Integer part); a setter that
+        # wrote while the read was under way already holds the newer value
+        desired = self._decode_temp(reply, 0x01, 0x02)
+        if desired is not None and writes == self._setpointWrites:
+            self.desiredTemperature = desired
+            self._setpointValidUntil = time.monotonic() + self.setpointCacheTTL
 
-        # 3. Get Fan Speed
-        self.fanSpeed = self._send_command(0x05)
+        # 2. Ambient Temp (Fractional part then Integer part)
+        if ambient is not None:
+            self.ambientTemperature = ambient
+
+        # 3. Fan Speed
+        if reply.get(0x05) is not None:
+            self.fanSpeed = reply[0x05]
 
     def setDesiredTemp(self, temp: float) -> bool:
         """Encodes and sends the target temperature to the microcontroller."""
-        if not self.is_connected(): return False
-        try:
-            val_int = int(temp)
-            val_frac = int((temp - val_int) * 10)
-            if val_frac > 63: val_frac = 63
+        if not self.is_connected() or self.breaker.is_open(): return False
+        with self.portLock.hold(PRIORITY_URGENT):
+            try:
+                val_int = int(temp)
+                # Hundredths, as CONTROL_TEMP compares them with FRAC_TEMP
+                # (6 bits on the wire: .64-.99 are sent as .63)
+                val_frac = int(round((temp - val_int) * 100))
+                if val_frac > 63: val_frac = 63
 
-            # Protocol specific bitwise operations to form command bytes
-            cmd_frac = 0x80 | (val_frac & 0x3F)
-            cmd_int = 0xC0 | (val_int & 0x3F)
+                # Protocol specific bitwise operations to form command bytes
+                cmd_frac = 0x80 | (val_frac & 0x3F)
+                cmd_int = 0xC0 | (val_int & 0x3F)
 
-            self.ser.write(bytes([cmd_frac]))
-            time.sleep(0.05) # Brief pause between bytes
-            self.ser.write(bytes([cmd_int]))
-            return True
-        except: return False
+                self.ser.write(bytes([cmd_frac]))
+                time.sleep(0.05) # Brief pause between bytes
+                self.ser.write(bytes([cmd_int]))
+                self._count_write(2)
+                # Write-through: the board now holds exactly these 6-bit values
+                self.desiredTemperature = round((val_int & 0x3F) + (val_frac & 0x3F) / 100, 2)
+                self._setpointWrites += 1
+                self._setpointValidUntil = time.monotonic() + self.setpointCacheTTL
+                self._wrote("desiredTemperature")
+                return True
+            except Exception as e:
+                self.metrics.io_errors.inc((self.name, "set"))
+                log.error("setDesiredTemp Error: %s", e)
+                return False
+
+    def setDesiredTempAsync(self, temp: float) -> Future:
+        """
+        Queues setDesiredTemp() and returns at once. The 50 ms pacing between
+        the two bytes runs on the write thread; queued setpoints that are
+        superseded before they are sent collapse to the newest one.
+        """
+        return self.writes.submit("desiredTemperature", self.setDesiredTemp, temp)
 
     def getAmbientTemp(self): return self.ambientTemperature
     def getDesiredTemp(self): return self.desiredTemperature
     def getFanSpeed(self): return self.fanSpeed
 
+    def snapshot(self) -> dict:
+        """Returns a copy of the last readings (no serial I/O)."""
+        return {
+            "ambientTemperature": self.ambientTemperature,
+            "desiredTemperature": self.desiredTemperature,
+            "fanSpeed": self.fanSpeed,
+        }
+
 
 class CurtainControlSystemConnection(HomeAutomationSystemConnection):
     """
     Concrete implementation for the Curtain and Light control board.
     """
+    BOARD_NAME = "curtain"
+    PROBE_COMMAND = 0x08    # LDR reading
+    BULK_LENGTH = 2         # Bulk frame payload: curtain %, LDR
+    # board2.asm answers once per main loop (LCD refresh + 200 ms delay): the
+    # old 0.15 s settle + 0.5 s read budget, until the link has been timed
+    REPLY_DEADLINE = 0.65
+    BULK_DEADLINE = 0.65
     # Commands defined in board2.asm firmware
     CMD_GET_CURTAIN = 0x02  # Ask Curtain Status
     CMD_GET_LIGHT = 0x08    # Ask Light Intensity
+
+    FIELD_COMMANDS = {
+        "curtainStatus": (CMD_GET_CURTAIN,),
+        "lightIntensity": (CMD_GET_LIGHT,),
+    }
+    FIELD_TOLERANCE = {"curtainStatus": 1, "lightIntensity": 2}
     
     def __init__(self):
         super().__init__()
@@ -151,236 +911,344 @@ class CurtainControlSystemConnection(HomeAutomationSystemConnection):
         self.outdoorPressure = 1013.0   # Static value (no command in board2.asm)
         self.lightIntensity = 0.0
 
-    def _read_single_byte(self, cmd_byte) -> int:
+    def _read_single_byte(self, cmd_byte):
         """
         board2ui.py style: Send single byte, receive single byte.
+        board2.asm only polls RCREG once per main loop (LCD refresh + 200 ms
+        delay), so the reply can take a while; the read blocks until it arrives.
+        Returns None on a timeout or IO error.
         """
-        if not self.is_connected(): return 0
-        
-        try:
-            self.ser.reset_input_buffer()
-            self.ser.write(bytes([cmd_byte]))
-            time.sleep(0.15)  # Allow time for PIC to process and respond
-            
-            # Wait for data to arrive (max 0.5 seconds)
-            start_time = time.time()
-            while (time.time() - start_time) < 0.5:
-                if self.ser.in_waiting > 0:
-                    raw_byte = self.ser.read(1)
-                    int_val = int.from_bytes(raw_byte, byteorder='big')
-                    print(f"<< Command {hex(cmd_byte)} -> Raw: {raw_byte} -> Int: {int_val}")
-                    return int_val
-                time.sleep(0.01)
-            
-            print(f"Timeout: No response for command {hex(cmd_byte)}.")
-            return 0
-        except Exception as e:
-            print(f"IO Error: {e}")
-            return 0
+        if not self.is_connected(): return None
+
+        # Wait for data to arrive (adaptive deadline, see replyDeadline())
+        raw_byte = self._exchange((cmd_byte,))
+        if raw_byte:
+            int_val = raw_byte[0]
+            log.debug("<< Command %#04x -> Raw: %r -> Int: %d", cmd_byte, raw_byte, int_val)
+            return int_val
+        if raw_byte is not None:
+            log.warning("Timeout: No response for command %#04x on %s.", cmd_byte, self.comPort)
+        return None
 
-    def update(self):
+    def update(self, fields=None):
         """
         Reading compatible with board2.asm firmware.
         Only 0x02 (curtain) and 0x08 (light) commands are available.
         Temp and Pressure are shown as static values.
         """
         if not self.is_connected(): return
+        if fields is None: fields = self.FIELD_COMMANDS
+
+        # Both values in one exchange (saves a full board2 main loop) when supported
+        payload = self._read_status_frame() if len(fields) > 1 else None
+        if payload is not None:
+            self.curtainStatus = float(payload[0])
+            self.lightIntensity = float(payload[1])
+            fields = ()
 
         # 1. Curtain Status - Command: 0x02
-        curtain_val = self._read_single_byte(self.CMD_GET_CURTAIN)
-        self.curtainStatus = float(curtain_val)
-        
-        time.sleep(0.1)
+        if "curtainStatus" in fields:
+            curtain_val = self._read_single_byte(self.CMD_GET_CURTAIN)
+            if curtain_val is not None: self.curtainStatus = float(curtain_val)
 
         # 2. Light Intensity - Command: 0x08
-        light_val = self._read_single_byte(self.CMD_GET_LIGHT)
-        self.lightIntensity = float(light_val)
+        if "lightIntensity" in fields:
+            light_val = self._read_single_byte(self.CMD_GET_LIGHT)
+            if light_val is not None: self.lightIntensity = float(light_val)
         
         # Temp and Pressure are not supported in board2.asm, keeping static
         # self.outdoorTemperature = 25.0
         # self.outdoorPressure = 1013.0
         
-        # DEBUG: Check values in console
-        print(f"[DEBUG] Curtain: {self.curtainStatus}% | Light: {self.lightIntensity} Lux")
+        log.debug("Curtain: %s%% | Light: %s Lux", self.curtainStatus, self.lightIntensity)
 
     def setCurtainStatus(self, std: float) -> bool:
         """
         board2ui.py style: Send single byte formatted as 0xC0 | val.
         """
-        if not self.is_connected(): return False
-        try:
-            val = int(std)
+        if not self.is_connected() or self.breaker.is_open(): return False
+        with self.portLock.hold(PRIORITY_URGENT):
+            try:
+                val = int(std)
             
-            # Construct the command byte
-            cmd = 0xC0 | (val & 0x3F)
-            self.ser.write(bytes([cmd]))
-            print(f">> Sent: {cmd} (Hex: {hex(cmd)})")
-            return True
-        except Exception as e:
-            print(f"setCurtainStatus Error: {e}")
-            return False
+                # Construct the command byte
+                cmd = 0xC0 | (val & 0x3F)
+                self.ser.write(bytes([cmd]))
+                self._count_write(1)
+                log.debug(">> Sent: %d (Hex: %#04x)", cmd, cmd)
+                self._wrote("curtainStatus")
+                return True
+            except Exception as e:
+                self.metrics.io_errors.inc((self.name, "set"))
+                log.error("setCurtainStatus Error: %s", e)
+                return False
+
+    def setCurtainStatusAsync(self, std: float) -> Future:
+        """Queues setCurtainStatus() and returns at once (superseded positions collapse)."""
+        return self.writes.submit("curtainStatus", self.setCurtainStatus, std)
 
     def getCurtainStatus(self): return self.curtainStatus
     def getOutdoorTemp(self): return self.outdoorTemperature
     def getOutdoorPress(self): return self.outdoorPressure
     def getLightIntensity(self): return self.lightIntensity
 
+    def snapshot(self) -> dict:
+        """Returns a copy of the last readings (no serial I/O)."""
+        return {
+            "curtainStatus": self.curtainStatus,
+            "outdoorTemperature": self.outdoorTemperature,
+            "outdoorPressure": self.outdoorPressure,
+            "lightIntensity": self.lightIntensity,
+        }
+
 
 # ==============================================================================
-# 2. INTERFACE LAYER (GUI)
+# 1b. CONNECTION MANAGER (Background serial polling)
 # ==============================================================================
 
-class HomeAutomationApp(tk.Tk):
+class PollScheduler:
     """
-    Main GUI Application class using Tkinter.
+    Adaptive per-field poll intervals for one connection.
+    Each field (i.e. its FIELD_COMMANDS) gets its own interval. After each read
+    the interval moves towards the time the field needs to change by its
+    tolerance at the observed rate; a field that does not change backs off
+    towards max_interval. A setter write makes the field due immediately at
+    min_interval.
     """
-    def __init__(self):
-        super().__init__()
-        self.title("ESOGU Home Automation System (Robust)")
-        self.geometry("600x550")
-        self.resizable(False, False)
-        
-        # Initialize API instances
-        self.ac_api = AirConditionerSystemConnection()
-        self.curtain_api = CurtainControlSystemConnection()
-        
-        self.container = tk.Frame(self)
-        self.container.pack(fill="both", expand=True, padx=20, pady=20)
-        
-        self.show_main_menu()
-        
-        # Update Rate: 2 seconds is ideal for sensors to catch up (Per documentation)
-        self.update_interval = 2000 
-        self.update_data_loop()
-
-    def clear_screen(self):
-        """Removes all widgets from the current view."""
-        for widget in self.container.winfo_children():
-            widget.destroy()
-
-    def ask_port_connection(self, api_obj, system_name):
-        """Creates a popup window to select and connect to a COM port."""
-        popup = tk.Toplevel(self)
-        popup.title(f"Connect {system_name}")
-        popup.geometry("300x150")
-        
-        tk.Label(popup, text=f"Port for {system_name}:").pack(pady=5)
-        # List available ports or default to COM1-9
-        ports = [p.device for p in serial.tools.list_ports.comports()]
-        if not ports: ports = [f"COM{i}" for i in range(1, 10)]
-        
-        combo = ttk.Combobox(popup, values=ports)
-        if ports: combo.current(0)
-        combo.pack(pady=5)
+    def __init__(self, conn, initial: float = 2.0, min_interval: float = 0.5,
+                 max_interval: float = 30.0, backoff: float = 1.5):
+        self.tolerance = dict(conn.FIELD_TOLERANCE)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        now = time.monotonic()
+        self.intervals = {f: initial for f in conn.FIELD_COMMANDS}
+        self.next_due = {f: now for f in conn.FIELD_COMMANDS}
+        self.last = {}          # field -> (time, value) of the previous read
+        self._lock = threading.Lock()
 
-        def connect():
-            p = combo.get()
-            try:
-                p_num = int(p.upper().replace("COM", ""))
-                api_obj.setComPort(p_num)
-                if api_obj.open():
-                    messagebox.showinfo("OK", f"Connected {p}")
-                    popup.destroy()
-                else: messagebox.showerror("Err", "Failed")
-            except: pass
-        
-        tk.Button(popup, text="Connect", command=connect).pack(pady=10)
-        self.wait_window(popup)
-
-    def show_main_menu(self):
-        """Displays the main navigation menu."""
-        self.clear_screen()
-        frame = tk.LabelFrame(self.container, text="MAIN MENU", font=("Arial", 14, "bold"), padx=20, pady=20)
-        frame.pack(expand=True)
-        tk.Button(frame, text="1. Air Conditioner", width=25, command=self.on_ac).pack(pady=5)
-        tk.Button(frame, text="2. Curtain Control", width=25, command=self.on_cc).pack(pady=5)
-        tk.Button(frame, text="3. Exit", width=25, bg="red", fg="white", command=self.quit_app).pack(pady=5)
-
-    def on_ac(self):
-        """Handler for Air Conditioner button."""
-        if not self.ac_api.is_connected(): self.ask_port_connection(self.ac_api, "Air Conditioner")
-        if self.ac_api.is_connected(): self.show_ac()
-
-    def on_cc(self):
-        """Handler for Curtain Control button."""
-        if not self.curtain_api.is_connected(): self.ask_port_connection(self.curtain_api, "Curtain")
-        if self.curtain_api.is_connected(): self.show_cc()
-
-    def show_ac(self):
-        """Displays the Air Conditioner Monitor/Control interface."""
-        self.clear_screen()
-        f_info = tk.LabelFrame(self.container, text="Monitor", font=("Arial", 10, "bold"))
-        f_info.pack(fill="x", pady=10)
-        
-        self.lbl_ac1 = tk.Label(f_info, text="Amb: --", font=("Arial", 12))
-        self.lbl_ac1.pack(anchor="w", padx=10)
-        self.lbl_ac2 = tk.Label(f_info, text="Des: --", font=("Arial", 12))
-        self.lbl_ac2.pack(anchor="w", padx=10)
-        self.lbl_ac3 = tk.Label(f_info, text="Fan: --", font=("Arial", 12))
-        self.lbl_ac3.pack(anchor="w", padx=10)
-
-        tk.Button(self.container, text="Set Temp", command=self.set_temp).pack(fill="x", pady=5)
-        tk.Button(self.container, text="Return", command=self.show_main_menu).pack(fill="x", pady=5)
-
-    def set_temp(self):
-        """Dialog to input desired temperature."""
-        val = simpledialog.askfloat("Input", "Temp (10-50):", minvalue=10, maxvalue=50)
-        if val: self.ac_api.setDesiredTemp(val)
-
-    def show_cc(self):
-        """Displays the Curtain & Light Monitor/Control interface."""
-        self.clear_screen()
-        f_info = tk.LabelFrame(self.container, text="System Monitor", font=("Arial", 10, "bold"))
-        f_info.pack(fill="x", pady=10)
-        
-        self.lbl_cc1 = tk.Label(f_info, text="Outdoor Temp: --", font=("Arial", 11))
-        self.lbl_cc1.pack(anchor="w", padx=10)
-        self.lbl_cc2 = tk.Label(f_info, text="Pressure: --", font=("Arial", 11))
-        self.lbl_cc2.pack(anchor="w", padx=10)
-        self.lbl_cc3 = tk.Label(f_info, text="Curtain: --", font=("Arial", 11, "bold"), fg="blue")
-        self.lbl_cc3.pack(anchor="w", padx=10)
-        self.lbl_cc4 = tk.Label(f_info, text="Light: --", font=("Arial", 11))
-        self.lbl_cc4.pack(anchor="w", padx=10)
+    def due(self, now: float = None):
+        """Fields whose next poll time has passed."""
+        if now is None: now = time.monotonic()
+        with self._lock:
+            return [f for f, t in self.next_due.items() if t <= now]
+
+    def next_wakeup(self) -> float:
+        """Monotonic time of the earliest next poll."""
+        with self._lock:
+            return min(self.next_due.values())
+
+    def observe(self, field: str, value, now: float = None):
+        """Adapts the field's interval after a read and schedules its next poll."""
+        if now is None: now = time.monotonic()
+        with self._lock:
+            interval = self.intervals[field]
+            prev = self.last.get(field)
+            if prev is not None:
+                dt, dv = now - prev[0], abs(value - prev[1])
+                if dv >= self.tolerance.get(field, 0) and dv > 0 and dt > 0:
+                    # Time to drift by one tolerance at the observed rate
+                    target = self.tolerance.get(field, dv) * dt / dv
+                    interval = 0.5 * interval + 0.5 * target
+                else:
+                    interval *= self.backoff
+            interval = max(self.min_interval, min(self.max_interval, interval))
+            self.intervals[field] = interval
+            self.last[field] = (now, value)
+            self.next_due[field] = now + interval
+
+    def touch(self, field: str):
+        """A setter wrote this field: read it back right away and keep it tight."""
+        with self._lock:
+            if field in self.intervals:
+                self.intervals[field] = self.min_interval
+                self.next_due[field] = time.monotonic()
+
+
+class _PollWorker(threading.Thread):
+    """
+    Background poll thread for one connection: runs update() on its
+    schedule and publishes an immutable snapshot of the readings. Setters
+    and on-demand reads go through the connection's CommandQueues and share
+    the port with it via the PortLock.
+    """
+    def __init__(self, name, conn, interval, history_capacity=0, log=None, scheduler=None):
+        super().__init__(name=f"poll-{name}", daemon=True)
+        self.board = name
+        self.conn = conn
+        self.scheduler = scheduler  # Optional PollScheduler (None = read everything each tick)
+        if scheduler is not None:
+            conn.onWrite = self._on_write
+        self.log = log              # Optional TelemetryLog (append never blocks)
+        self.interval = interval
+        self.latest = None          # Last published snapshot (dict), replaced atomically
+        self.published = threading.Condition()  # Notified on every new snapshot
+        # Bounded history of every published snapshot (fixed memory)
+        self.history = TelemetryHistory(conn.snapshot().keys(), history_capacity) if history_capacity else None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
 
-        tk.Button(self.container, text="Set Curtain", command=self.set_curtain).pack(fill="x", pady=5)
-        tk.Button(self.container, text="Return", command=self.show_main_menu).pack(fill="x", pady=5)
+    def _on_write(self, field):
+        self.scheduler.touch(field)
+        self._wake.set()
 
-    def set_curtain(self):
-        """Dialog to input curtain opening percentage."""
-        val = simpledialog.askfloat("Input", "Curtain %:")
-        if val is not None: self.curtain_api.setCurtainStatus(val)
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
 
-    def update_data_loop(self):
+    def _poll(self, fields):
+        """Reads the given fields (None = all) and publishes a new snapshot."""
+        started = time.monotonic()
+        self.conn.update(fields)
+        if self.conn.breaker.is_open(): return    # Link went down mid-update: nothing fresh to publish
+        snap = self.conn.snapshot()
+        if self.scheduler:
+            now = time.monotonic()
+            for field in fields: self.scheduler.observe(field, snap[field], now)
+        snap["timestamp"] = time.time()
+        snap["updateDuration"] = time.monotonic() - started
+        with self.published:
+            self.latest = snap
+            self.published.notify_all()
+        if self.history is not None:
+            self.history.append(snap, snap["timestamp"])
+        if self.log is not None:
+            self.log.append(self.board, snap, snap["timestamp"])
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            breaker = self.conn.breaker
+            if breaker.is_open():
+                # Dead board: no polling (snapshots go stale) until a re-probe answers
+                self.conn.recover()
+            if self.conn.is_connected() and not breaker.is_open():
+                fields = self.scheduler.due() if self.scheduler else None
+                if fields is None or fields:
+                    try:
+                        self._poll(fields)
+                    except Exception as e:
+                        log.error("Poll error (%s): %s", self.name, e)
+            # Sleep until the next tick, but wake early after a write or stop()
+            if breaker.is_open():
+                remaining = breaker.retry_in()
+            elif self.scheduler and self.conn.is_connected():
+                remaining = self.scheduler.next_wakeup() - time.monotonic()
+            else:
+                remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._wake.wait(remaining)
+            self._wake.clear()
+
+
+class ConnectionManager:
+    """
+    Polls any number of boards concurrently, one I/O thread per connection.
+    Boards refresh in parallel, so a full cycle costs about as much as the
+    slowest board instead of the sum of all of them.
+    The GUI only reads the latest snapshot, so it never blocks on serial I/O.
+    """
+    def __init__(self, interval: float = 2.0, history_capacity: int = 0, log=None, adaptive: bool = False):
+        self.interval = interval
+        self.adaptive = adaptive                   # Per-field PollScheduler instead of a fixed tick
+        self.history_capacity = history_capacity   # Samples kept per board (0 = no history)
+        self.log = log                             # Optional TelemetryLog for persistent history
+        self.workers = {}
+
+    def add(self, name: str, conn: HomeAutomationSystemConnection):
+        """Registers a connection under a name and starts its I/O thread."""
+        if name in self.workers:
+            raise ValueError(f"Board '{name}' is already registered")
+        conn.name = name    # Board label on the exported metrics
+        scheduler = PollScheduler(conn, initial=self.interval) if self.adaptive else None
+        worker = _PollWorker(name, conn, self.interval, self.history_capacity, self.log, scheduler)
+        self.workers[name] = worker
+        worker.start()
+        return worker
+
+    def remove(self, name: str, timeout: float = 2.0):
+        """Stops polling a board and forgets it (the port is left as it is)."""
+        worker = self.workers.pop(name, None)
+        if worker:
+            worker.stop()
+            worker.join(timeout)
+
+    def names(self):
+        return list(self.workers)
+
+    def connection(self, name: str) -> HomeAutomationSystemConnection:
+        return self.workers[name].conn
+
+    def latest(self, name: str):
+        """Returns the most recent snapshot dict for a board, or None if none yet."""
+        worker = self.workers.get(name)
+        return worker.latest if worker else None
+
+    def wait(self, name: str, since: float = 0.0, timeout: float = None):
         """
-        Periodic loop to fetch data from hardware and update UI labels.
+        Blocks until the board publishes a snapshot newer than `since` (a
+        snapshot timestamp) or the timeout passes; returns the latest snapshot.
+        Lets any number of readers follow a board without extra serial I/O.
         """
-        if self.ac_api.is_connected(): self.ac_api.update()
-        if self.curtain_api.is_connected(): self.curtain_api.update()
+        worker = self.workers[name]
+        with worker.published:
+            worker.published.wait_for(
+                lambda: worker.latest is not None and worker.latest["timestamp"] > since, timeout)
+            return worker.latest
 
-        try:
-            # Update AC labels if they exist
-            if hasattr(self, 'lbl_ac1') and self.lbl_ac1.winfo_exists():
-                self.lbl_ac1.config(text=f"Home Ambient Temperature: {self.ac_api.getAmbientTemp():.1f} C")
-                self.lbl_ac2.config(text=f"Home Desired Temperature: {self.ac_api.getDesiredTemp():.1f} C")
-                self.lbl_ac3.config(text=f"Fan Speed: {self.ac_api.getFanSpeed()} rps")
-
-            # Update Curtain labels if they exist
-            if hasattr(self, 'lbl_cc1') and self.lbl_cc1.winfo_exists():
-                self.lbl_cc1.config(text=f"Outdoor Temperature: {self.curtain_api.getOutdoorTemp():.1f} C")
-                self.lbl_cc2.config(text=f"Outdoor Pressure: {self.curtain_api.getOutdoorPress():.0f} hPa")
-                self.lbl_cc3.config(text=f"Curtain Status: {self.curtain_api.getCurtainStatus():.0f} %")
-                self.lbl_cc4.config(text=f"Light Intensity: {self.curtain_api.getLightIntensity():.0f} Lux")
-        except: pass
-        
-        # Schedule next update
-        self.after(self.update_interval, self.update_data_loop)
+    def history(self, name: str):
+        """Returns the board's TelemetryHistory (None if history is disabled)."""
+        return self.workers[name].history
+
+    def staleness(self, name: str):
+        """Seconds since the board's last published snapshot (None if never)."""
+        snap = self.latest(name)
+        return time.time() - snap["timestamp"] if snap else None
+
+    def cycleTime(self) -> float:
+        """
+        Time for every connected board to refresh once. Boards poll in
+        parallel, so this is the slowest board's last update() duration.
+        """
+        durations = [w.latest["updateDuration"] for w in self.workers.values()
+                     if w.latest and w.conn.is_connected()]
+        return max(durations) if durations else 0.0
+
+    def status(self) -> dict:
+        """Per-board health: connection state, staleness, last update() cost and reply deadlines."""
+        report = {}
+        for name, worker in self.workers.items():
+            snap = worker.latest
+            report[name] = {
+                "connected": worker.conn.is_connected(),
+                "link": worker.conn.breaker.state,
+                "staleness": time.time() - snap["timestamp"] if snap else None,
+                "updateDuration": snap["updateDuration"] if snap else None,
+                "replyDeadlines": {_command_label(cmd): est.rto for cmd, est in list(worker.conn.rtt.items())},
+            }
+        return report
+
+    def stop(self, timeout: float = 2.0):
+        """Stops all I/O threads and waits for them to finish."""
+        for worker in self.workers.values():
+            worker.stop()
+        for worker in self.workers.values():
+            worker.join(timeout)
+
+
+# ==============================================================================
+# 2. INTERFACE LAYER (GUI) -- lives in gui.py
+# ==============================================================================
+
+def __getattr__(name):
+    # Keeps `from API import HomeAutomationApp` working without importing Tk
+    # for the headless users of this module (PEP 562).
+    if name == "HomeAutomationApp":
+        from gui import HomeAutomationApp
+        return HomeAutomationApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    def quit_app(self):
-        """Closes connections and destroys the window."""
-        self.ac_api.close()
-        self.curtain_api.close()
-        self.destroy()
 
 if __name__ == "__main__":
-    app = HomeAutomationApp()
-    app.mainloop()
\ No newline at end of file
+    from gui import main
+    main()
@@ -1,97 +1,15 @@
-import serial
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
 
-# ==============================================================================
-# CLASS: Air Conditioner System API
-# (Serial Communication Logic - Unchanged, kept as is)
-# ==============================================================================
-class AirConditionerSystemConnection:
-    def __init__(self):
-        self.ser = None
-        self.comPort = "COM1"  # Adjust the port according to your system
-        self.baudRate = 9600
-        self.desiredTemperature = 0.0
-        self.ambientTemperature = 0.0
-        self.fanSpeed = 0
-
-    def setComPort(self, port):
-        self.comPort = port
-
-    def setBaudRate(self, rate):
-        self.baudRate = rate
-
-    def open(self):
-        try:
-            self.ser = serial.Serial(self.comPort, self.baudRate, timeout=0.1)
-            return True
-        except Exception as e:
-            print(f"Connection Error: {e}")
-            return False
-
-    def close(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-
-    def _send_byte(self, byte_val):
-        if self.ser and self.ser.is_open:
-            self.ser.write(bytes([byte_val]))
-
-    def _read_byte(self):
-        if self.ser and self.ser.is_open:
-            data = self.ser.read(1)
-            if data:
-                return int.from_bytes(data, byteorder='big')
-        return 0
-
-    def update(self):
-        try:
-            # 1. Desired Temp (Frac & Int)
-            self._send_byte(0x01)
-            d_frac = self._read_byte()
-            self._send_byte(0x02)
-            d_int = self._read_byte()
-            self.desiredTemperature = float(f"{d_int}.{d_frac}")
-
-            # 2. Ambient Temp (Frac & Int)
-            self._send_byte(0x03)
-            a_frac = self._read_byte()
-            self._send_byte(0x04)
-            a_int = self._read_byte()
-            self.ambientTemperature = float(f"{a_int}.{a_frac}")
-
-            # 3. Fan Speed (Source 197 - Command 0x05)
-            self._send_byte(0x05)
-            self.fanSpeed = self._read_byte()
-            return True
-        except Exception as e:
-            print(f"Update Error: {e}")
-            return False
-
-    def setDesiredTemp(self, temp: float):
-        try:
-            t_int = int(temp)
-            t_frac = int((temp - t_int) * 100)
-            if t_frac > 63: t_frac = 63 # 6-bit limit
-
-            # Send Fraction: 10xxxxxx
-            cmd_frac = 0x80 | (t_frac & 0x3F)
-            self._send_byte(cmd_frac)
-            time.sleep(0.05)
-
-            # Send Integer: 11xxxxxx
-            cmd_int = 0xC0 | (t_int & 0x3F)
-            self._send_byte(cmd_int)
-            return True
-        except Exception as e:
-            print(f"Set Temp Error: {e}")
-            return False
-
-    def getAmbientTemp(self): return self.ambientTemperature
-    def getDesiredTemp(self): return self.desiredTemperature
-    def getFanSpeed(self): return self.fanSpeed
+# Serial I/O goes through the shared transaction layer in API.py: every
+# request/response pair is serialized on the port, and the window never
+# blocks on it.
+from API import AirConditionerSystemConnection
+from telemetry import TelemetryHistory
+from charts import HistorySource, TrendPanel, AC_CHARTS
+
+HISTORY_SAMPLES = 3 * 86400     # Readings kept for the trend charts (3 days at 1 s)
 
 # ==============================================================================
 # GUI CLASS (Tkinter Interface)
@@ -100,12 +18,14 @@ class HomeAutomationUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Home Automation - Air Conditioner Control")
-        self.root.geometry("400x500")
+        self.root.geometry("400x860")
         self.root.resizable(False, False)
 
         # API Object
         self.api = AirConditionerSystemConnection()
         self.is_connected = False
+        self.pending = None     # Future of the read in flight
+        self.history = TelemetryHistory(self.api.snapshot().keys(), HISTORY_SAMPLES)
 
         # --- Style Settings ---
         style = ttk.Style()
@@ -159,6 +79,11 @@ class HomeAutomationUI:
         self.btn_set.grid(row=0, column=2, padx=5)
         self.btn_set.config(state="disabled")
 
+        # --- Trend Area ---
+        trend_frame = ttk.LabelFrame(root, text="Trends", padding=5)
+        trend_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        TrendPanel(trend_frame, HistorySource(self.history), AC_CHARTS, width=360, height=130).pack(fill="both")
+
         # Start the loop
         self.update_interval = 1000 # 1 second
         self.update_gui()
@@ -176,6 +101,7 @@ class HomeAutomationUI:
             else:
                 messagebox.showerror("Error", f"Could not open {port}")
         else:
+            if self.pending is not None: self.pending.cancel()
             self.api.close()
             self.is_connected = False
             self.btn_connect.config(text="Connect")
@@ -188,32 +114,48 @@ class HomeAutomationUI:
         try:
             val = float(self.entry_set_temp.get())
             if 10.0 <= val <= 50.0:
-                self.api.setDesiredTemp(val)
                 print(f"[USER ACTION] Set Temperature to {val}")
-                messagebox.showinfo("Success", f"Temperature set to {val}")
+                # Urgent write: goes out ahead of the next read
+                future = self.api.setDesiredTempAsync(val)
+                self.when_done(future, lambda f: self.show_write_result(f, val))
             else:
                 messagebox.showwarning("Range Error", "Temperature must be between 10.0 and 50.0")
         except ValueError:
             messagebox.showerror("Format Error", "Please enter a valid number.")
 
+    def when_done(self, future, callback):
+        """Runs callback(future) on the Tk thread once the API call has finished."""
+        if future.done(): callback(future)
+        else: self.root.after(50, self.when_done, future, callback)
+
+    def show_write_result(self, future, val):
+        if not future.cancelled() and future.exception() is None and future.result():
+            messagebox.showinfo("Success", f"Temperature set to {val}")
+        else:
+            messagebox.showerror("Error", "Could not send the temperature to the board.")
+
+    def show_reading(self, future):
+        if future.cancelled() or future.exception() is not None or not self.is_connected:
+            return
+        self.history.append(future.result(), time.time())
+        # 2. Update GUI Elements
+        amb_temp = self.api.getAmbientTemp()
+        des_temp = self.api.getDesiredTemp()
+        fan_spd = self.api.getFanSpeed()
+
+        self.lbl_ambient.config(text=f"{amb_temp:.2f} °C")
+        self.lbl_desired.config(text=f"{des_temp:.2f} °C")
+        self.lbl_fan.config(text=f"{fan_spd} rps")
+
+        # 3. PRINT TO TERMINAL (As requested)
+        print(f"--------------------------------------------------")
+        print(f"[DATA] Ambient: {amb_temp:.2f} C | Desired: {des_temp:.2f} C | Fan: {fan_spd} rps")
+
     def update_gui(self):
-        if self.is_connected:
-            # 1. Update data from API
-            success = self.api.update()
-            
-            if success:
-                # 2. Update GUI Elements
-                amb_temp = self.api.getAmbientTemp()
-                des_temp = self.api.getDesiredTemp()
-                fan_spd = self.api.getFanSpeed()
-
-                self.lbl_ambient.config(text=f"{amb_temp:.2f} °C")
-                self.lbl_desired.config(text=f"{des_temp:.2f} °C")
-                self.lbl_fan.config(text=f"{fan_spd} rps")
-
-                # 3. PRINT TO TERMINAL (As requested)
-                print(f"--------------------------------------------------")
-                print(f"[DATA] Ambient: {amb_temp:.2f} C | Desired: {des_temp:.2f} C | Fan: {fan_spd} rps")
+        # 1. Request fresh data from the API (one read in flight at a time)
+        if self.is_connected and (self.pending is None or self.pending.done()):
+            self.pending = self.api.updateAsync(timeout=self.update_interval / 1000)
+            self.when_done(self.pending, self.show_reading)
         
         # Call itself again (Loop)
         self.root.after(self.update_interval, self.update_gui)
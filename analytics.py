@@ -0,0 +1,215 @@
+"""
+Vectorized analytics over the stored telemetry (TelemetryLog).
+
+Every metric is computed with whole-array NumPy operations (no Python loop
+over samples), so months of history (tens of millions of samples) take
+seconds. Samples are irregularly spaced (adaptive polling), so durations
+are time-weighted; gaps longer than `max_gap` (link down, app closed) are
+not counted.
+
+    log = TelemetryLog("telemetry_data")
+    ac = load(log, "ac", days=30)
+    setpoint_tracking(ac, band=0.5)      # time above / below / within the band
+    step_responses(ac, band=0.5)         # overshoot + settling time per setDesiredTemp
+    fan_curve(ac)                        # fan speed vs temperature error
+    curtain_response(load(log, "curtain", days=30), light_threshold=100)
+
+    python analytics.py telemetry_data --days 30
+"""
+import sys
+import time
+import argparse
+
+try:
+    import numpy as np
+except ImportError:     # NumPy is optional for the rest of the project, not here
+    raise ImportError("analytics.py needs NumPy (pip install numpy)") from None
+
+from telemetry import TelemetryLog
+
+MAX_GAP = 60.0          # Longest sample spacing (s) still counted as continuous data
+
+
+def load(log: TelemetryLog, board: str, days: float = None, start: float = None, end: float = None,
+         fields=None) -> dict:
+    """Range query as NumPy arrays; `days` counts back from `end` (default now)."""
+    end = time.time() if end is None else end
+    if start is None: start = end - days * 86400 if days else 0.0
+    return log.query(board, start, end, fields)
+
+
+def _durations(ts, max_gap: float = MAX_GAP):
+    """Time each sample stands for: the gap to the next one, 0 across outages."""
+    dt = np.diff(ts, append=ts[-1] if len(ts) else 0.0)
+    dt[dt > max_gap] = 0.0
+    return dt
+
+
+# ==============================================================================
+# 1. AIR CONDITIONER
+# ==============================================================================
+
+def setpoint_tracking(data: dict, band: float = 0.5, max_gap: float = MAX_GAP) -> dict:
+    """
+    Time spent above (ambient > desired + band), below and within the band,
+    plus the time-weighted mean absolute and RMS error.
+    """
+    ts = data["timestamp"]
+    err = data["ambientTemperature"] - data["desiredTemperature"]
+    dt = _durations(ts, max_gap)
+    total = dt.sum()
+    above = dt[err > band].sum()
+    below = dt[err < -band].sum()
+    return {
+        "seconds": float(total),
+        "above": float(above),
+        "below": float(below),
+        "within": float(total - above - below),
+        "fractionAbove": float(above / total) if total else 0.0,
+        "fractionBelow": float(below / total) if total else 0.0,
+        "meanAbsError": float((np.abs(err) * dt).sum() / total) if total else 0.0,
+        "rmsError": float(np.sqrt((err * err * dt).sum() / total)) if total else 0.0,
+    }
+
+
+def setpoint_changes(data: dict, min_step: float = 0.05):
+    """Sample indices where the desired temperature changed (setDesiredTemp or keypad)."""
+    desired = data["desiredTemperature"]
+    return np.flatnonzero(np.abs(np.diff(desired)) >= min_step) + 1
+
+
+def step_responses(data: dict, band: float = 0.5, min_step: float = 0.05) -> dict:
+    """
+    One row per setpoint change, up to the next change:
+      overshoot      how far ambient went past the new setpoint (C, >= 0)
+      settlingTime   seconds until ambient entered the band and stayed there
+                     (NaN if it never settled before the next change)
+    """
+    ts = data["timestamp"]
+    desired, ambient = data["desiredTemperature"], data["ambientTemperature"]
+    starts = setpoint_changes(data, min_step)
+    if len(starts) == 0:
+        empty = np.empty(0)
+        return {"time": empty, "from": empty, "to": empty, "overshoot": empty, "settlingTime": empty}
+    ends = np.append(starts[1:], len(ts))           # Exclusive segment ends
+
+    # Error measured in the direction of the step: > 0 means "went past the setpoint"
+    direction = np.sign(desired[starts] - desired[starts - 1])
+    seg_dir = np.repeat(direction, ends - starts)
+    lo = starts[0]
+    err = ambient[lo:] - desired[lo:]
+    overshoot = np.maximum(np.maximum.reduceat(err * seg_dir, starts - lo), 0.0)
+
+    # Settled from the sample after the last one outside the band
+    idx = np.arange(lo, len(ts))
+    last_out = np.maximum.reduceat(np.where(np.abs(err) > band, idx, -1), starts - lo)
+    settle_at = np.clip(np.maximum(last_out + 1, starts), 0, len(ts) - 1)
+    settling = ts[settle_at] - ts[starts]
+    settling[last_out >= ends - 1] = np.nan         # Still outside at the end of the segment
+
+    return {
+        "time": ts[starts],
+        "from": desired[starts - 1],
+        "to": desired[starts],
+        "overshoot": overshoot,
+        "settlingTime": settling,
+    }
+
+
+def fan_curve(data: dict, edges=None) -> dict:
+    """
+    Fan speed against temperature error (ambient - desired), binned:
+    sample count, mean and standard deviation of the fan speed per bin.
+    """
+    if edges is None: edges = np.linspace(-5.0, 5.0, 41)
+    err = data["ambientTemperature"] - data["desiredTemperature"]
+    fan = data["fanSpeed"]
+    bins = np.digitize(err, edges) - 1
+    keep = (bins >= 0) & (bins < len(edges) - 1)
+    bins, fan = bins[keep], fan[keep]
+    n = len(edges) - 1
+    count = np.bincount(bins, minlength=n)
+    total = np.bincount(bins, fan, minlength=n)
+    squares = np.bincount(bins, fan * fan, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+    return {"edges": edges, "centers": (edges[:-1] + edges[1:]) / 2,
+            "count": count, "mean": mean, "std": std}
+
+
+# ==============================================================================
+# 2. CURTAIN
+# ==============================================================================
+
+def curtain_response(data: dict, light_threshold: float = 100.0, min_move: float = 1.0) -> dict:
+    """
+    One row per crossing of the light threshold (board2.asm LDR_LIMIT):
+      rising        True when light went above the threshold
+      responseTime  seconds until the curtain started moving (NaN if it did
+                    not move before the next crossing)
+      completeTime  seconds until its last movement before the next crossing
+    """
+    ts = data["timestamp"]
+    light, curtain = data["lightIntensity"], data["curtainStatus"]
+    above = light > light_threshold
+    crossings = np.flatnonzero(above[1:] != above[:-1]) + 1
+    moves = np.flatnonzero(np.abs(np.diff(curtain)) >= min_move) + 1
+    if len(crossings) == 0:
+        empty = np.empty(0)
+        return {"time": empty, "rising": np.empty(0, bool), "responseTime": empty, "completeTime": empty}
+
+    next_crossing = np.append(crossings[1:], len(ts))
+    first = np.searchsorted(moves, crossings)               # First move at/after the crossing
+    last = np.searchsorted(moves, next_crossing) - 1        # Last move before the next one
+    moved = (first < len(moves)) & (first <= last)
+    first_idx = moves[np.minimum(first, len(moves) - 1)] if len(moves) else crossings
+    last_idx = moves[np.clip(last, 0, len(moves) - 1)] if len(moves) else crossings
+
+    response = np.where(moved, ts[first_idx] - ts[crossings], np.nan)
+    complete = np.where(moved, ts[last_idx] - ts[crossings], np.nan)
+    return {"time": ts[crossings], "rising": above[crossings],
+            "responseTime": response, "completeTime": complete}
+
+
+# ==============================================================================
+# 3. ENTRY POINT
+# ==============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarise stored telemetry.")
+    parser.add_argument("root", nargs="?", default="telemetry_data")
+    parser.add_argument("--days", type=float, default=7.0)
+    parser.add_argument("--band", type=float, default=0.5, help="setpoint band (C)")
+    parser.add_argument("--light-threshold", type=float, default=100.0, help="LDR_LIMIT")
+    args = parser.parse_args(argv)
+
+    log = TelemetryLog(args.root)
+    try:
+        started = time.perf_counter()
+        boards = log.boards()
+        if "ac" in boards:
+            ac = load(log, "ac", args.days, fields=("desiredTemperature", "ambientTemperature", "fanSpeed"))
+            print(f"AC: {len(ac['timestamp'])} samples")
+            for key, value in setpoint_tracking(ac, args.band).items():
+                print(f"  {key:<15} {value:.3f}")
+            steps = step_responses(ac, args.band)
+            if len(steps["time"]):
+                settled = steps["settlingTime"][np.isfinite(steps["settlingTime"])]
+                print(f"  setpoint changes {len(steps['time'])}: overshoot mean {steps['overshoot'].mean():.2f} C,"
+                      f" settled {len(settled)}, settling median {np.median(settled) if len(settled) else np.nan:.1f} s")
+        if "curtain" in boards:
+            cc = load(log, "curtain", args.days, fields=("curtainStatus", "lightIntensity"))
+            resp = curtain_response(cc, args.light_threshold)
+            print(f"Curtain: {len(cc['timestamp'])} samples, {len(resp['time'])} light threshold crossings")
+            if np.isfinite(resp["responseTime"]).any():
+                print(f"  response median {np.nanmedian(resp['responseTime']):.1f} s,"
+                      f" complete median {np.nanmedian(resp['completeTime']):.1f} s")
+        print(f"({time.perf_counter() - started:.2f} s)")
+    finally:
+        log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Latency / throughput benchmark for the API.py connection classes.
+
+Runs AirConditionerSystemConnection and CurtainControlSystemConnection against
+the pty emulator (emulator.py) with a configurable device latency and writes
+the results as JSON. Two result files can be compared to flag regressions.
+
+Usage:
+    python benchmark.py run --delay 2 --jitter 1 --iterations 200 --out new.json
+    python benchmark.py run --legacy --pipelined --out legacy.json
+    python benchmark.py compare base.json new.json --threshold 0.10
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection
+from emulator import EmulatedBoard, AirConditionerModel, CurtainModel
+
+# ==============================================================================
+# 1. HELPERS
+# ==============================================================================
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (pct in 0-100)."""
+    if not samples: return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+class Results:
+    """Flat metric table: name -> {value, unit, better}."""
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit="s", better="lower"):
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+
+    def add_latency(self, prefix, samples):
+        self.add(f"{prefix}.p50", percentile(samples, 50))
+        self.add(f"{prefix}.p99", percentile(samples, 99))
+        self.add(f"{prefix}.mean", sum(samples) / len(samples) if samples else 0.0)
+
+
+# ==============================================================================
+# 2. BENCHMARKS
+# ==============================================================================
+
+def bench_commands(conn, commands, iterations, results, prefix):
+    """Round-trip time of each single GET command."""
+    for cmd in commands:
+        samples = [_timed(conn._send_command, cmd) for _ in range(iterations)]
+        results.add_latency(f"{prefix}.rtt.{cmd:#04x}", samples)
+
+
+def bench_update(conn, iterations, results, prefix):
+    """Cost of a full update() and the resulting polls per second."""
+    samples = [_timed(conn.update) for _ in range(iterations)]
+    results.add_latency(f"{prefix}.update", samples)
+    total = sum(samples)
+    results.add(f"{prefix}.polls_per_sec", iterations / total if total else 0.0, unit="1/s", better="higher")
+
+
+def bench_setter(conn, setter, value, readback, iterations, results, prefix, settle=5.0):
+    """
+    Setter cost: time for the call to return, and time until update() reads
+    the new value back from the board (completion).
+    """
+    call_samples, done_samples = [], []
+    for i in range(iterations):
+        target = value(i)
+        start = time.perf_counter()
+        setter(target)
+        call_samples.append(time.perf_counter() - start)
+        while time.perf_counter() - start < settle:
+            conn.update()
+            if readback() == target: break
+        done_samples.append(time.perf_counter() - start)
+    results.add_latency(f"{prefix}.call", call_samples)
+    results.add_latency(f"{prefix}.complete", done_samples)
+
+
+def run(args) -> dict:
+    delay, jitter = args.delay / 1000, args.jitter / 1000
+    # Legacy firmware ignores the bulk status opcode, so update() goes back to
+    # the single-value (or --pipelined) exchanges
+    bulk = not args.legacy
+    ac_board = EmulatedBoard(AirConditionerModel(seed=args.seed, bulk=bulk), delay, jitter,
+                             baud=args.baud, seed=args.seed)
+    # Instant stepper travel so setCurtainStatus completion measures the link, not the motor
+    cc_board = EmulatedBoard(CurtainModel(percent_time=0.0, seed=args.seed, bulk=bulk), delay, jitter,
+                             baud=args.baud, seed=args.seed)
+    results = Results()
+
+    with ac_board, cc_board:
+        ac = AirConditionerSystemConnection()
+        ac.setComPort(ac_board.device)
+        ac.pipelined = args.pipelined
+        # Off by default so setter completion measures the board read-back
+        ac.setpointCacheTTL = args.setpoint_cache
+        cc = CurtainControlSystemConnection()
+        cc.setComPort(cc_board.device)
+        if not (ac.open() and cc.open()):
+            raise RuntimeError("could not open emulator ports")
+        if args.legacy:
+            # Steady state: the bulk probes' silent waits are not update() cost
+            ac.assumeLegacyFirmware()
+            cc.assumeLegacyFirmware()
+        try:
+            n = args.iterations
+            bench_commands(ac, ac.STATUS_COMMANDS, n, results, "ac")
+            bench_commands(cc, (cc.CMD_GET_CURTAIN, cc.CMD_GET_LIGHT), n, results, "curtain")
+            bench_update(ac, n, results, "ac")
+            bench_update(cc, max(1, n // 10), results, "curtain")
+            bench_setter(ac, ac.setDesiredTemp, lambda i: 18.0 + (i % 20) + 0.5,
+                         ac.getDesiredTemp, max(1, n // 10), results, "ac.setDesiredTemp")
+            bench_setter(cc, cc.setCurtainStatus, lambda i: float(10 + (i % 40)),
+                         cc.getCurtainStatus, max(1, n // 10), results, "curtain.setCurtainStatus")
+        finally:
+            ac.close()
+            cc.close()
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "delay_ms": args.delay,
+            "jitter_ms": args.jitter,
+            "baud": args.baud,
+            "iterations": args.iterations,
+            "mode": result_mode(args.legacy),
+            "pipelined": args.pipelined,
+            "setpoint_cache": args.setpoint_cache,
+        },
+        "metrics": results.metrics,
+    }
+
+
+# ==============================================================================
+# 3. COMPARISON
+# ==============================================================================
+
+def result_mode(legacy: bool) -> str:
+    return "legacy" if legacy else "bulk"
+
+
+# Run settings that change what the metrics measure: runs are only
+# comparable when all of them match
+CONFIG_FIELDS = ("mode", "pipelined", "setpoint_cache", "delay_ms", "jitter_ms", "baud")
+
+
+def _config(data: dict) -> dict:
+    meta = data.get("meta", {})
+    # Files written before --legacy existed are bulk runs
+    return {field: meta.get(field, "bulk" if field == "mode" else None) for field in CONFIG_FIELDS}
+
+
+def config_mismatch(base: dict, new: dict) -> list:
+    """[(field, base value, new value)] for every run setting that differs."""
+    a, b = _config(base), _config(new)
+    return [(field, a[field], b[field]) for field in CONFIG_FIELDS if a[field] != b[field]]
+
+
+def compare(base: dict, new: dict, threshold: float):
+    """
+    Returns (rows, regressions) for two runs with the same settings (see
+    config_mismatch()). A metric regresses when it moves in its 'worse'
+    direction by more than threshold (relative).
+    """
+    rows, regressions = [], []
+    for name, cur in sorted(new["metrics"].items()):
+        old = base["metrics"].get(name)
+        if old is None: continue
+        a, b = old["value"], cur["value"]
+        change = (b - a) / a if a else 0.0
+        worse = change > threshold if cur["better"] == "lower" else change < -threshold
+        rows.append((name, a, b, change, worse))
+        if worse: regressions.append(name)
+    return rows, regressions
+
+
+# ==============================================================================
+# 4. ENTRY POINT
+# ==============================================================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the API.py serial I/O layer.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmark against the pty emulator")
+    p_run.add_argument("--delay", type=float, default=1.0, help="device response delay (ms)")
+    p_run.add_argument("--jitter", type=float, default=0.0, help="random extra delay (ms)")
+    p_run.add_argument("--baud", type=int, default=None, help="simulate serial byte time")
+    p_run.add_argument("--iterations", type=int, default=100)
+    p_run.add_argument("--legacy", "--no-bulk", action="store_true",
+                       help="emulate firmware without the bulk status opcode (5-exchange AC update)")
+    p_run.add_argument("--pipelined", action="store_true", help="use pipelined AC reads (legacy mode only)")
+    p_run.add_argument("--setpoint-cache", type=float, default=0.0, help="AC setpoint cache TTL (s, 0 = off)")
+    p_run.add_argument("--seed", type=int, default=1)
+    p_run.add_argument("--out", default="-", help="output JSON file ('-' for stdout)")
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="allowed relative change")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        data = run(args)
+        text = json.dumps(data, indent=2)
+        if args.out == "-": print(text)
+        else:
+            with open(args.out, "w") as f: f.write(text)
+            print(f"Results written to {args.out}")
+        return 0
+
+    with open(args.base) as f: base = json.load(f)
+    with open(args.new) as f: new = json.load(f)
+    mismatch = config_mismatch(base, new)
+    if mismatch:
+        for field, a, b in mismatch: print(f"{field}: {a} vs {b}")
+        print("Runs use different settings; not comparing")
+        return 2
+    rows, regressions = compare(base, new, args.threshold)
+    for name, a, b, change, worse in rows:
+        flag = "REGRESSION" if worse else ""
+        print(f"{name:<45} {a:>12.6f} {b:>12.6f} {change:>+8.1%} {flag}")
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
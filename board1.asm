@@ -71,6 +71,7 @@ PSECT udata_bank0
     UART_DATA:         DS 1   ; Received Data Buffer
     UART_READY:        DS 1   ; Flag: 1=Data Ready to process, 0=Empty
     UART_TEMP_REG:     DS 1   ; Temporary variable for ISR handling
+    UART_SUM:          DS 1   ; Running checksum of the status frame
 
     ; Interrupt Context Saving
     W_TEMP:            DS 1   ; Save W register
@@ -1054,6 +1055,11 @@ UART_GET_CMD:
     BTFSC   STATUS, 2
     GOTO    UART_GET_FAN_SPEED
     
+    MOVF    UART_TEMP_REG, W
+    SUBLW   0x0F
+    BTFSC   STATUS, 2
+    GOTO    UART_GET_STATUS
+    
     RETURN
 
 UART_GET_DESIRED_FRAC:
@@ -1086,6 +1092,36 @@ UART_GET_FAN_SPEED:
     CALL    UART_SEND
     RETURN
 
+UART_GET_STATUS:
+    ; Frame: LEN(5) | DES_FRAC | DES_INT | AMB_FRAC | AMB_INT | FAN | CHK
+    ; CHK = LEN + payload (mod 256). Sent back to back, so all five values
+    ; come from the same main loop pass.
+    MOVLW   0x05
+    BANKSEL UART_SUM
+    MOVWF   UART_SUM
+    CALL    UART_SEND
+    
+    BANKSEL TARGET_TEMP_FRAC
+    MOVF    TARGET_TEMP_FRAC, W
+    CALL    UART_SEND_SUM
+    BANKSEL TARGET_TEMP_INT
+    MOVF    TARGET_TEMP_INT, W
+    CALL    UART_SEND_SUM
+    BANKSEL FRAC_TEMP
+    MOVF    FRAC_TEMP, W
+    CALL    UART_SEND_SUM
+    BANKSEL AMBIENT_TEMP
+    MOVF    AMBIENT_TEMP, W
+    CALL    UART_SEND_SUM
+    BANKSEL FAN_SPEED_STORE
+    MOVF    FAN_SPEED_STORE, W
+    CALL    UART_SEND_SUM
+    
+    BANKSEL UART_SUM
+    MOVF    UART_SUM, W
+    CALL    UART_SEND
+    RETURN
+
 UART_SET_CMD:
     ; Bit 6: 0=Frac, 1=Int
     BANKSEL UART_TEMP_REG
@@ -1122,6 +1158,12 @@ UART_WAIT_TX:
     MOVWF   TXREG           ; Write data to Send
     RETURN
 
+UART_SEND_SUM:
+    ; Adds W to the frame checksum, then sends it
+    BANKSEL UART_SUM
+    ADDWF   UART_SUM, F
+    GOTO    UART_SEND
+
 ; ==============================================================================
 ; END OF CODE
 ; ==============================================================================
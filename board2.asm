@@ -18,6 +18,7 @@
         IS_AUTO            
         UART_DATA           
         TEMP_TX             
+        TX_SUM              ; Durum cercevesi checksum
     ENDC
 
 
@@ -237,6 +238,12 @@ CHECK_UART_PDF:
     GOTO    CMD_SEND_LIGHT
     
     
+    MOVF    UART_DATA, W
+    SUBLW   0x0F
+    BTFSC   STATUS, Z
+    GOTO    CMD_SEND_STATUS
+    
+    
     MOVF    UART_DATA, W
     ANDLW   B'11000000'     ; Ust 2 bite bak
     SUBLW   B'11000000'     ; 11 mi?
@@ -257,6 +264,24 @@ CMD_SEND_LIGHT:
     CALL    UART_TX
     RETURN
 
+CMD_SEND_STATUS:
+    ; LEN(2) | PERC_CURRENT | VAL_LDR | CHK  (CHK = LEN + veri, mod 256)
+    MOVLW   d'2'
+    MOVWF   TX_SUM
+    CALL    UART_TX
+    
+    MOVF    PERC_CURRENT, W
+    ADDWF   TX_SUM, F
+    CALL    UART_TX
+    
+    MOVF    VAL_LDR, W
+    ADDWF   TX_SUM, F
+    CALL    UART_TX
+    
+    MOVF    TX_SUM, W
+    CALL    UART_TX
+    RETURN
+
 CMD_SET_CURTAIN:
    
     
@@ -1,23 +1,30 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import serial.tools.list_ports
-import time
-import threading
+
+# Seri port işlemleri API.py üzerinden: istek/cevap çiftleri port başına
+# sıraya girer, arayüz porta hiç bloklanmaz.
+from API import CurtainControlSystemConnection, PRIORITY_POLL
+from telemetry import TelemetryHistory
+from charts import HistorySource, TrendPanel, CURTAIN_CHARTS
 
 # --- PROJE AYARLARI ---
-CMD_GET_CURTAIN = b'\x02'  # 2 (Perdeyi Sor)
-CMD_GET_LIGHT   = b'\x08'  # 8 (Işığı Sor)
+MAX_LOG_LINES   = 200      # Log penceresinde tutulan son satır sayısı
+READ_TIMEOUT    = 2.0      # GÜNCELLE isteğinin toplam süresi (s)
+POLL_INTERVAL   = 2000     # Grafikler için periyodik okuma aralığı (ms)
+HISTORY_SAMPLES = 86400    # Grafikler için tutulan okuma sayısı
 
 class CurtainControlApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Akıllı Perde - V3.1 (Raw Byte Modu)")
-        self.root.geometry("500x550")
+        self.root.geometry("500x850")
         self.root.resizable(False, False)
         
-        self.ser = None
+        self.api = CurtainControlSystemConnection()
         self.is_connected = False
+        self.pending = None     # Periyodik okuma (aynı anda tek okuma)
+        self.history = TelemetryHistory(self.api.snapshot().keys(), HISTORY_SAMPLES)
 
         # --- ARAYÜZ ---
         header_frame = tk.Frame(root, bg="#2c3e50", pady=15)
@@ -59,14 +66,26 @@ class CurtainControlApp:
 
         tk.Button(data_frame, text="GÜNCELLE", command=self.request_data, bg="#2980b9", fg="white", width=15).pack(side="bottom", pady=5)
 
+        # Grafikler (her okuma bir nokta)
+        trend_frame = tk.LabelFrame(root, text="Grafikler", padx=5, pady=5)
+        trend_frame.pack(padx=10, pady=5, fill="x")
+        TrendPanel(trend_frame, HistorySource(self.history), CURTAIN_CHARTS, width=460, height=120).pack(fill="x")
+
         # Log Penceresi
         log_frame = tk.LabelFrame(root, text="İletişim Logları", padx=5, pady=5)
         log_frame.pack(padx=10, pady=5, fill="both", expand=True)
         self.log_text = tk.Text(log_frame, height=8, font=("Courier", 9))
         self.log_text.pack(fill="both", expand=True)
 
+        # Grafikler kullanıcı işlemleri arasında da dolsun diye periyodik okuma
+        self.root.after(POLL_INTERVAL, self.poll_data)
+
     def log(self, msg):
         self.log_text.insert(tk.END, msg + "\n")
+        # Sadece son MAX_LOG_LINES satırı tut (widget sonsuza kadar büyümesin)
+        lines = int(self.log_text.index("end-1c").split(".")[0])
+        if lines > MAX_LOG_LINES:
+            self.log_text.delete("1.0", f"{lines - MAX_LOG_LINES}.0")
         self.log_text.see(tk.END)
 
     def toggle_connection(self):
@@ -78,79 +97,79 @@ class CurtainControlApp:
         if not port: 
             messagebox.showerror("Hata", "Lütfen COM port girin!")
             return
-        try:
-            # V43/V44 PIC kodları için en kararlı ayarlar
-            self.ser = serial.Serial(port, 9600, timeout=0.5)
-            self.ser.dtr = False
-            self.ser.rts = False
+        # V43/V44 PIC kodları için en kararlı ayarlar (DTR/RTS kapalı) API'de
+        self.api.setComPort(port)
+        if self.api.open():
             self.is_connected = True
             self.btn_connect.config(text="KES", bg="#c0392b")
             self.lbl_status.config(text=f"Durum: Bağlı ({port})", fg="green")
             self.log(f"Bağlandı: {port}")
-        except Exception as e:
-            messagebox.showerror("Hata", f"{port} açılamadı!\n{e}")
-            self.log(f"Hata: {e}")
+        else:
+            messagebox.showerror("Hata", f"{port} açılamadı!")
+            self.log(f"Hata: {port} açılamadı")
 
     def disconnect(self):
-        if self.ser: self.ser.close()
+        if self.pending is not None: self.pending.cancel()
+        self.api.close()
         self.is_connected = False
         self.btn_connect.config(text="BAĞLAN", bg="#27ae60")
         self.lbl_status.config(text="Durum: Bağlı Değil", fg="red")
 
+    def when_done(self, future, callback):
+        """API çağrısı bitince callback(future) Tk thread'inde çalışır."""
+        if future.done(): callback(future)
+        else: self.root.after(50, self.when_done, future, callback)
+
     def send_curtain_command(self):
         if not self.is_connected: return
         val = self.slider.get()
         cmd = 0xC0 | val
-        self.ser.write(bytes([cmd]))
-        self.log(f">> Gönderildi: {cmd} (Hex: {hex(cmd)})")
+        # Acil yazma: bekleyen okumaların önüne geçer; art arda ayarlar birleşir
+        future = self.api.setCurtainStatusAsync(val)
+        self.when_done(future, lambda f: self.log(
+            f">> Gönderildi: {cmd} (Hex: {hex(cmd)})" if not f.cancelled() and f.exception() is None and f.result()
+            else ">> Gönderilemedi!"))
 
     def request_data(self):
         if not self.is_connected: return
-        threading.Thread(target=self._read_process, daemon=True).start()
-
-    def _read_process(self):
-        try:
-            # ---------------------------------------------------------
-            # 1. PERDE SORGUSU (Komut: 2)
-            # ---------------------------------------------------------
-            self.ser.reset_input_buffer()
-            self.ser.write(CMD_GET_CURTAIN)
-            time.sleep(0.1) # PIC'in cevaplaması için süre
-            
-            if self.ser.in_waiting > 0:
-                # TEK BYTE OKU (Çünkü PIC tek byte sayı gönderiyor)
-                raw_byte = self.ser.read(1)
-                
-                # Byte'ı Tam Sayıya Çevir (Örn: b']' -> 93)
-                int_val = int.from_bytes(raw_byte, byteorder='big')
-                
-                self.log(f"<< Perde (Raw): {raw_byte} -> Sayı: {int_val}")
-                self.root.after(0, lambda: self.lbl_curtain.config(text=f"{int_val} %"))
-            else:
-                self.log("<< Perde verisi gelmedi.")
-
-            # ---------------------------------------------------------
-            # 2. IŞIK SORGUSU (Komut: 8)
-            # ---------------------------------------------------------
-            time.sleep(0.1)
-            self.ser.reset_input_buffer()
-            self.ser.write(CMD_GET_LIGHT)
-            time.sleep(0.1)
-            
-            if self.ser.in_waiting > 0:
-                # TEK BYTE OKU
-                raw_byte = self.ser.read(1)
-                
-                # Byte'ı Tam Sayıya Çevir (Örn: b'\x0e' -> 14)
-                int_val = int.from_bytes(raw_byte, byteorder='big')
-                
-                self.log(f"<< Işık (Raw): {raw_byte} -> Sayı: {int_val}")
-                self.root.after(0, lambda: self.lbl_light.config(text=f"{int_val}"))
-            else:
-                self.log("<< Işık verisi gelmedi.")
-
-        except Exception as e:
-            self.log(f"Okuma Hatası: {e}")
+        # Üst üste basılan GÜNCELLE'ler kuyrukta tek okumaya iner
+        timeouts = self._timeouts()
+        future = self.api.updateAsync(timeout=READ_TIMEOUT)
+        self.when_done(future, lambda f: self._show_data(f, timeouts))
+
+    def _timeouts(self) -> int:
+        return sum(st["timeouts"] for st in self.api.getTimingStats().values())
+
+    def _show_data(self, future, timeouts_before):
+        if future.cancelled() or future.exception() is not None:
+            self.log(f"Okuma Hatası: {future.exception() if not future.cancelled() else 'iptal'}")
+            return
+        snap = future.result()
+        self.history.append(snap, time.time())
+        curtain, light = int(snap["curtainStatus"]), int(snap["lightIntensity"])
+        self.log(f"<< Perde: {curtain} | Işık: {light}")
+        if self._timeouts() > timeouts_before:
+            self.log("<< Bazı veriler gelmedi (eski değerler gösteriliyor).")
+        self._show_values(curtain, light)
+
+    def _show_values(self, curtain, light):
+        self.lbl_curtain.config(text=f"{curtain} %")
+        self.lbl_light.config(text=f"{light}")
+
+    def poll_data(self):
+        # Arka plan okuması: GÜNCELLE'den farklı olarak log penceresine yazmaz;
+        # düşük öncelikli, kullanıcının isteklerini bekletmez ve onlarla birleşmez
+        if self.is_connected and (self.pending is None or self.pending.done()):
+            self.pending = self.api.updateAsync(priority=PRIORITY_POLL, timeout=POLL_INTERVAL / 1000)
+            self.when_done(self.pending, self._show_poll)
+        self.root.after(POLL_INTERVAL, self.poll_data)
+
+    def _show_poll(self, future):
+        if future.cancelled() or future.exception() is not None or not self.is_connected:
+            return
+        snap = future.result()
+        self.history.append(snap, time.time())
+        self._show_values(int(snap["curtainStatus"]), int(snap["lightIntensity"]))
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,322 @@
+"""
+Live trend charts on a Tk canvas.
+
+Each chart owns one polyline per series, created once; a frame only moves
+its points with coords(). Samples are reduced to a min/max pair per pixel
+column first, so a line never has more than ~4 points per pixel however
+many samples the window holds (a 7 day window of 2 s polls is 300k samples,
+drawn as at most 2 x plot width vertices). A chart redraws only when a new
+sample arrived or the window scrolled by a pixel, and the panel stretches
+its frame period if drawing ever takes more than a third of it.
+
+    source = HistorySource(manager.history("ac"), telemetry_log, "ac")
+    TrendPanel(frame, source, AC_CHARTS).pack(fill="both", expand=True)
+"""
+import math
+import time
+import bisect
+import tkinter as tk
+from array import array
+
+from telemetry import _numpy
+
+# Selectable time windows: label -> seconds
+WINDOWS = (
+    ("1 min", 60), ("10 min", 600), ("1 h", 3600), ("6 h", 21600),
+    ("1 day", 86400), ("3 days", 3 * 86400), ("7 days", 7 * 86400),
+)
+
+# (title, ((field, color, legend), ...), smallest y span shown)
+AC_CHARTS = (
+    ("Temperature (C)", (("ambientTemperature", "#c0392b", "Ambient"),
+                         ("desiredTemperature", "#2980b9", "Desired")), 1.0),
+    ("Fan speed (rps)", (("fanSpeed", "#27ae60", "Fan"),), 10.0),
+)
+CURTAIN_CHARTS = (
+    ("Curtain (%)", (("curtainStatus", "#2980b9", "Curtain"),), 10.0),
+    ("Light intensity", (("lightIntensity", "#e67e22", "Light"),), 10.0),
+)
+
+
+# ==============================================================================
+# 1. DECIMATION
+# ==============================================================================
+
+def decimate(times, values, t0: float, t1: float, width: int):
+    """
+    Min/max of the samples in each pixel column of [t0, t1] mapped onto
+    `width` pixels; NaNs and samples outside the range are dropped.
+    Returns (columns, minima, maxima) for the occupied columns, in order.
+    """
+    if width < 1 or t1 <= t0: return [], [], []
+    scale = (width - 1) / (t1 - t0)
+    np = _numpy()
+    if np:
+        t = np.asarray(times, dtype=np.float64)
+        v = np.asarray(values, dtype=np.float64)
+        keep = (t >= t0) & (t <= t1) & ~np.isnan(v)
+        t, v = t[keep], v[keep]
+        if not len(t): return [], [], []
+        cols = ((t - t0) * scale).astype(np.int64)     # Sorted, since t is
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        return cols[starts], np.minimum.reduceat(v, starts), np.maximum.reduceat(v, starts)
+
+    cols, mins, maxs = [], [], []
+    for t, v in zip(times, values):
+        if v != v or t < t0 or t > t1: continue    # v != v drops NaN
+        c = int((t - t0) * scale)
+        if cols and cols[-1] == c:
+            if v < mins[-1]: mins[-1] = v
+            elif v > maxs[-1]: maxs[-1] = v
+        else:
+            cols.append(c)
+            mins.append(v)
+            maxs.append(v)
+    return cols, mins, maxs
+
+
+def _nice_step(span: float) -> float:
+    """1, 2 or 5 times a power of ten, about a quarter of `span`."""
+    raw = span / 4
+    base = 10 ** math.floor(math.log10(raw))
+    for mult in (1, 2, 5, 10):
+        if raw <= mult * base: return mult * base
+    return 10 * base
+
+
+# ==============================================================================
+# 2. DATA SOURCE
+# ==============================================================================
+
+def _concat(a, b):
+    np = _numpy()
+    if np: return np.concatenate((a, b))
+    out = array("d", a)
+    out.extend(b)
+    return out
+
+
+def _first_at_or_after(times, t: float) -> int:
+    np = _numpy()
+    if np: return int(np.searchsorted(times, t))
+    return bisect.bisect_left(times, t)
+
+
+class HistorySource:
+    """
+    Time windows of one board's readings for the charts: the recent part
+    from its in-memory TelemetryHistory, anything older from its TelemetryLog
+    (optional). The on-disk part is cached per field and only extended or
+    trimmed at its edges, so a multi-day window does not re-read days of
+    records on every frame.
+    """
+    def __init__(self, history, log=None, board: str = None):
+        self.history = history
+        self.log = log
+        self.board = board
+        self._disk = {}     # field -> (start, end, times, values), times in [start, end)
+
+    def latest_time(self):
+        return self.history.latest_time()
+
+    def window(self, field: str, seconds: float, now: float):
+        """(timestamps, values) of the last `seconds` before `now`, oldest first."""
+        times, values = self.history.window(field, seconds, now)
+        start = now - seconds
+        # The ring still holds older samples: it covers the whole window
+        if self.log is None or len(times) < len(self.history): return times, values
+        end = times[0] if len(times) else now
+        old_t, old_v = self._disk_window(field, start, end)
+        return _concat(old_t, times), _concat(old_v, values)
+
+    def _query(self, field: str, start: float, end: float):
+        data = self.log.query(self.board, start, end, (field,))
+        times, values = data["timestamp"], data[field]
+        n = _first_at_or_after(times, end)      # query() includes `end`; the ring has it
+        return times[:n], values[:n]
+
+    def _disk_window(self, field: str, start: float, end: float):
+        cached = self._disk.get(field)
+        if cached is None or not cached[0] <= start <= cached[1] or end < cached[1]:
+            times, values = self._query(field, start, end)
+        else:
+            _, cached_end, times, values = cached
+            if end > cached_end:
+                new_t, new_v = self._query(field, cached_end, end)
+                times, values = _concat(times, new_t), _concat(values, new_v)
+            skip = _first_at_or_after(times, start)
+            times, values = times[skip:], values[skip:]
+        self._disk[field] = (start, end, times, values)
+        return times, values
+
+
+# ==============================================================================
+# 3. WIDGETS
+# ==============================================================================
+
+class TrendChart(tk.Canvas):
+    """
+    One chart: a polyline per series over a shared, auto-scaled y axis.
+    Every canvas item is created in __init__ (or on resize); render() only
+    moves points and changes label text that actually changed.
+    """
+    MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 44, 8, 16, 16
+    GRID_LINES = 5
+
+    def __init__(self, master, source: HistorySource, title: str, series, min_span: float = 1.0,
+                 width: int = 560, height: int = 140, **kwargs):
+        super().__init__(master, width=width, height=height, bg="white", highlightthickness=0, **kwargs)
+        self.source = source
+        self.series = tuple(series)
+        self.min_span = min_span
+        self.canvas_size = (width, height)
+        self.y_range = None
+        self._drawn = None      # What the current points show (skips identical frames)
+        self._text = {}         # item -> text currently shown
+
+        self.create_text(self.MARGIN_LEFT, 2, anchor="nw", text=title, font=("Arial", 9, "bold"))
+        x = width - self.MARGIN_RIGHT
+        for _, color, legend in reversed(self.series):
+            item = self.create_text(x, 2, anchor="ne", text=legend, fill=color, font=("Arial", 9))
+            x = self.bbox(item)[0] - 8
+        self.grid_lines = [self.create_line(0, 0, 0, 0, fill="#e5e5e5") for _ in range(self.GRID_LINES)]
+        self.grid_labels = [self.create_text(0, 0, anchor="e", font=("Arial", 8)) for _ in range(self.GRID_LINES)]
+        self.time_labels = [self.create_text(0, 0, anchor=a, font=("Arial", 8)) for a in ("sw", "s", "se")]
+        self.lines = [self.create_line(0, 0, 0, 0, fill=color, width=1.5, state="hidden")
+                      for _, color, _ in self.series]
+        self._layout()
+        self.bind("<Configure>", self._on_resize)
+
+    @property
+    def plot_width(self) -> int:
+        return max(1, self.canvas_size[0] - self.MARGIN_LEFT - self.MARGIN_RIGHT)
+
+    def _layout(self):
+        """Places the grid and axis labels for the current size."""
+        width, height = self.canvas_size
+        left, right, bottom = self.MARGIN_LEFT, width - self.MARGIN_RIGHT, height - self.MARGIN_BOTTOM
+        for i, (line, label) in enumerate(zip(self.grid_lines, self.grid_labels)):
+            y = bottom - i * (bottom - self.MARGIN_TOP) / (self.GRID_LINES - 1)
+            self.coords(line, left, y, right, y)
+            self.coords(label, left - 4, y)
+        for label, x in zip(self.time_labels, (left, (left + right) / 2, right)):
+            self.coords(label, x, height)
+        self._drawn = None
+
+    def _on_resize(self, event):
+        if (event.width, event.height) != self.canvas_size:
+            self.canvas_size = (event.width, event.height)
+            self._layout()
+
+    def _set_text(self, item, text: str):
+        if self._text.get(item) != text:
+            self.itemconfigure(item, text=text)
+            self._text[item] = text
+
+    def _scale(self, lo: float, hi: float):
+        """Y range snapped to a nice step, so it only moves when the data leaves it."""
+        if self.y_range and self.y_range[0] <= lo and hi <= self.y_range[1] \
+                and hi - lo >= 0.25 * (self.y_range[1] - self.y_range[0]):
+            return self.y_range
+        mid, span = (lo + hi) / 2, max(hi - lo, self.min_span)
+        step = _nice_step(span)
+        lo_r = math.floor((mid - span / 2) / step) * step
+        hi_r = math.ceil((mid + span / 2) / step) * step
+        self.y_range = (lo_r, hi_r)
+        return self.y_range
+
+    def set_window_label(self, label: str):
+        self._set_text(self.time_labels[0], f"-{label}")
+        self._set_text(self.time_labels[2], "now")
+
+    def render(self, now: float, seconds: float) -> bool:
+        """Redraws if a new sample arrived or the window scrolled a pixel; True if it did."""
+        pw = self.plot_width
+        key = (self.source.latest_time(), int(now * pw / seconds), seconds, self.canvas_size)
+        if key == self._drawn: return False
+        self._drawn = key
+
+        t0 = now - seconds
+        reduced = [decimate(*self.source.window(field, seconds, now), t0, now, pw) for field, _, _ in self.series]
+        lows = [min(mins) for _, mins, _ in reduced if len(mins)]
+        highs = [max(maxs) for _, _, maxs in reduced if len(maxs)]
+        if not lows:
+            for line in self.lines: self.itemconfigure(line, state="hidden")
+            return True
+        lo, hi = self._scale(min(lows), max(highs))
+
+        bottom = self.canvas_size[1] - self.MARGIN_BOTTOM
+        y_scale = (bottom - self.MARGIN_TOP) / (hi - lo)
+        np = _numpy()
+        for line, (cols, mins, maxs) in zip(self.lines, reduced):
+            if not len(cols):
+                self.itemconfigure(line, state="hidden")
+                continue
+            # Each column becomes a vertical stroke min -> max; consecutive columns join up
+            if np:
+                points = np.empty((len(cols), 4))
+                points[:, 0] = points[:, 2] = self.MARGIN_LEFT + np.asarray(cols)
+                points[:, 1] = bottom - (np.asarray(mins) - lo) * y_scale
+                points[:, 3] = bottom - (np.asarray(maxs) - lo) * y_scale
+                flat = points.ravel().tolist()
+            else:
+                flat = []
+                for c, vmin, vmax in zip(cols, mins, maxs):
+                    x = self.MARGIN_LEFT + c
+                    flat += (x, bottom - (vmin - lo) * y_scale, x, bottom - (vmax - lo) * y_scale)
+            self.coords(line, flat)
+            self.itemconfigure(line, state="normal")
+
+        for i, label in enumerate(self.grid_labels):
+            self._set_text(label, f"{lo + i * (hi - lo) / (self.GRID_LINES - 1):.4g}")
+        return True
+
+
+class TrendPanel(tk.Frame):
+    """
+    A window selector plus a stack of TrendCharts over one source, redrawn
+    `fps` times a second while visible. If a frame's drawing takes more than
+    a third of the frame period, the period is stretched to keep Tk responsive.
+    """
+    def __init__(self, master, source: HistorySource, charts, window: int = 60, fps: float = 8.0,
+                 width: int = 560, height: int = 140, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = source
+        self.period = 1.0 / fps
+        self.frame_time = 0.0   # Seconds spent drawing the last frame
+        self.labels = dict((seconds, label) for label, seconds in WINDOWS)
+        self.window = window
+
+        bar = tk.Frame(self)
+        bar.pack(fill="x")
+        tk.Label(bar, text="Window:").pack(side="left")
+        self.choice = tk.StringVar(value=self.labels.get(window, f"{window} s"))
+        tk.OptionMenu(bar, self.choice, *(label for label, _ in WINDOWS),
+                      command=self.set_window).pack(side="left")
+
+        self.charts = []
+        for title, series, min_span in charts:
+            chart = TrendChart(self, source, title, series, min_span, width=width, height=height)
+            chart.pack(fill="x", pady=2)
+            chart.set_window_label(self.choice.get())
+            self.charts.append(chart)
+        self._job = self.after(0, self._tick)
+        self.bind("<Destroy>", self._on_destroy)
+
+    def set_window(self, label: str):
+        self.window = dict(WINDOWS)[label]
+        for chart in self.charts: chart.set_window_label(label)
+
+    def _tick(self):
+        started = time.perf_counter()
+        if self.winfo_viewable():   # Hidden screens cost nothing
+            now = time.time()
+            for chart in self.charts: chart.render(now, self.window)
+        self.frame_time = time.perf_counter() - started
+        delay = max(self.period, 3 * self.frame_time)
+        self._job = self.after(int(delay * 1000), self._tick)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
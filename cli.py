@@ -0,0 +1,113 @@
+"""
+One-shot command line access to the boards, for scripts and cron jobs.
+
+Imports only the connection layer (no Tk, no HTTP server), so a read costs
+roughly interpreter start + ~20 ms of imports + the serial exchange itself.
+
+Usage:
+    python cli.py read ac                       # key=value lines
+    python cli.py read curtain --json
+    python cli.py set ac 22.5
+    python cli.py set curtain 40 --port /dev/ttyUSB1
+    python cli.py --daemon read ac              # through a running daemon.py
+
+Ports come from --port or the port map written by discovery.py (probed on
+first use). Exit status: 0 ok, 1 no connection / write failed, 2 a read timed out.
+"""
+import sys
+import json
+import argparse
+
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection
+
+BOARDS = {
+    "ac": (AirConditionerSystemConnection, "setDesiredTemp", "desiredTemperature"),
+    "curtain": (CurtainControlSystemConnection, "setCurtainStatus", "curtainStatus"),
+}
+
+
+def _print_state(state: dict, as_json: bool):
+    if as_json:
+        print(json.dumps(state))
+    else:
+        for key, value in state.items():
+            print(f"{key}={value}")
+
+
+def _open(board: str, port):
+    """Opens the board from --port or the cached port map; None on failure."""
+    import discovery    # Only needed when the port has to be looked up
+    conn = BOARDS[board][0]()
+    if port is not None:
+        conn.setComPort(int(port[3:]) if port.upper().startswith("COM") and port[3:].isdigit() else port)
+        ok = conn.open()
+    else:
+        ok = discovery.connect(conn, board)
+    if not ok:
+        print(f"error: could not open the {board} board", file=sys.stderr)
+        return None
+    return conn
+
+
+def run_local(args) -> int:
+    conn = _open(args.board, args.port)
+    if conn is None: return 1
+    try:
+        if args.command == "set":
+            ok = getattr(conn, BOARDS[args.board][1])(args.value)
+            if not ok: print("error: write failed", file=sys.stderr)
+            return 0 if ok else 1
+        conn.update()
+        _print_state(conn.snapshot(), args.json)
+        timeouts = sum(st["timeouts"] for st in conn.getTimingStats().values())
+        if timeouts:
+            print(f"warning: {timeouts} command(s) timed out; their values are not current", file=sys.stderr)
+            return 2
+        return 0
+    finally:
+        conn.close()
+
+
+def run_daemon(args) -> int:
+    from daemon import DaemonClient, DEFAULT_PORT
+    host, _, port = args.daemon.partition(":")
+    client = DaemonClient(host or "127.0.0.1", int(port or DEFAULT_PORT))
+    try:
+        if args.command == "set":
+            ok = client.set(args.board, BOARDS[args.board][2], args.value)
+            if not ok: print("error: write failed", file=sys.stderr)
+            return 0 if ok else 1
+        state = client.state(args.board)
+    except OSError as e:
+        print(f"error: daemon not reachable: {e}", file=sys.stderr)
+        return 1
+    if state is None:
+        print(f"error: no reading from the {args.board} board yet", file=sys.stderr)
+        return 1
+    _print_state(state, args.json)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Read or set a home automation board once.")
+    parser.add_argument("--daemon", nargs="?", const="127.0.0.1", metavar="HOST[:PORT]",
+                        help="go through a running daemon.py instead of opening the port")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_read = sub.add_parser("read", help="print the board's current readings")
+    p_read.add_argument("board", choices=BOARDS)
+    p_read.add_argument("--json", action="store_true")
+
+    p_set = sub.add_parser("set", help="set the AC target temperature or the curtain position")
+    p_set.add_argument("board", choices=BOARDS)
+    p_set.add_argument("value", type=float)
+
+    for p in (p_read, p_set):
+        p.add_argument("--port", help="port to open (default: from port_map.json)")
+    args = parser.parse_args(argv)
+
+    return run_daemon(args) if args.daemon else run_local(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
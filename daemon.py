@@ -0,0 +1,276 @@
+"""
+Headless daemon: owns the serial ports and shares them with local clients.
+
+One ConnectionManager polls each board once; any number of dashboards read
+the cached snapshots and send setter commands over a local HTTP/JSON API, so
+ten clients put the same load on the serial link as one.
+
+Endpoints (all JSON unless noted):
+    GET  /boards                         per-board status (connected, staleness, ...)
+    GET  /state                          latest snapshot of every board
+    GET  /state/<board>?since=TS&wait=S  latest snapshot; with `wait`, blocks up to S
+                                         seconds for one newer than TS (long poll)
+    GET  /history/<board>?field=F&seconds=S   min/max/mean of F over the last S seconds
+    POST /set/<board>   {"field": "desiredTemperature", "value": 22.5}
+    GET  /metrics                        Prometheus text (see metrics.py)
+
+Usage:
+    python daemon.py --ac COM3 --curtain COM4
+    python daemon.py --ac /dev/ttyUSB0 --port 8765
+    python daemon.py                     # ports from port_map.json (probed if missing)
+    python daemon.py --record sessions   # also capture the serial traffic (see recording.py)
+
+    client = DaemonClient()
+    client.state("ac"); client.set("curtain", "curtainStatus", 40)
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection, ConnectionManager
+from telemetry import TelemetryLog
+from metrics import REGISTRY, CONTENT_TYPE
+from eventlog import get_logger, install as install_event_log
+import discovery
+from recording import Recorder
+
+log = get_logger("daemon")
+
+DEFAULT_PORT = 8765
+MAX_WAIT = 30.0         # Longest long-poll a client may ask for (s)
+SETTER_TIMEOUT = 5.0    # How long POST /set waits for the write to go out (s)
+
+# Writable field -> async setter on the connection
+SETTERS = {
+    "desiredTemperature": "setDesiredTempAsync",
+    "curtainStatus": "setCurtainStatusAsync",
+}
+
+
+# ==============================================================================
+# 1. SERVER
+# ==============================================================================
+
+class _DaemonHandler(BaseHTTPRequestHandler):
+    daemon = None   # Set per server by HomeAutomationDaemon
+
+    def _reply(self, status: int, payload, content_type="application/json"):
+        body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._reply(status, {"error": message})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        manager = self.daemon.manager
+        try:
+            if parts == ["boards"]:
+                return self._reply(200, manager.status())
+            if parts == ["state"]:
+                return self._reply(200, {name: manager.latest(name) for name in manager.names()})
+            if parts == ["metrics"]:
+                return self._reply(200, REGISTRY.render(), CONTENT_TYPE)
+            if len(parts) == 2 and parts[1] not in manager.workers:
+                return self._error(404, f"unknown board '{parts[1]}'")
+            if len(parts) == 2 and parts[0] == "state":
+                if "wait" in query:
+                    wait = min(float(query["wait"]), MAX_WAIT)
+                    snap = manager.wait(parts[1], float(query.get("since", 0)), wait)
+                else:
+                    snap = manager.latest(parts[1])
+                return self._reply(200, snap)
+            if len(parts) == 2 and parts[0] == "history":
+                history = manager.history(parts[1])
+                if history is None:
+                    return self._error(404, "history is disabled")
+                stats = history.stats(query["field"], float(query.get("seconds", 60)))
+                return self._reply(200, stats)
+        except (KeyError, ValueError) as e:
+            return self._error(400, f"bad request: {e}")
+        self._error(404, "not found")
+
+    def do_POST(self):
+        parts = [p for p in urlsplit(self.path).path.split("/") if p]
+        manager = self.daemon.manager
+        if len(parts) != 2 or parts[0] != "set":
+            return self._error(404, "not found")
+        if parts[1] not in manager.workers:
+            return self._error(404, f"unknown board '{parts[1]}'")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            field, value = request["field"], float(request["value"])
+        except (KeyError, ValueError, TypeError) as e:
+            return self._error(400, f"bad request: {e}")
+
+        setter = getattr(manager.connection(parts[1]), SETTERS.get(field, ""), None)
+        if setter is None:
+            return self._error(400, f"'{field}' is not writable on '{parts[1]}'")
+        try:
+            ok = setter(value).result(SETTER_TIMEOUT)
+        except Exception as e:
+            log.error("Setter %s on %s failed: %s", field, parts[1], e)
+            ok = False
+        self._reply(200 if ok else 503, {"ok": bool(ok)})
+
+    def log_message(self, *args):
+        pass    # Requests are not worth a console line each
+
+
+class HomeAutomationDaemon:
+    """Owns a ConnectionManager and serves it over HTTP on a background thread."""
+    def __init__(self, manager: ConnectionManager, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.manager = manager
+        handler = type("DaemonHandler", (_DaemonHandler,), {"daemon": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="daemon-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving; the manager and ports are left to the owner."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ==============================================================================
+# 2. CLIENT
+# ==============================================================================
+
+class DaemonClient:
+    """Minimal client for the daemon's HTTP API (standard library only)."""
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, timeout: float = 5.0):
+        self.base = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _get(self, path: str, timeout: float = None):
+        with urllib.request.urlopen(self.base + path, timeout=timeout or self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def boards(self) -> dict:
+        return self._get("/boards")
+
+    def state(self, board: str = None):
+        """Latest snapshot of one board, or of every board when board is None."""
+        return self._get(f"/state/{board}" if board else "/state")
+
+    def wait(self, board: str, since: float = 0.0, timeout: float = 10.0):
+        """Long poll: the first snapshot newer than `since` (or the latest after timeout)."""
+        return self._get(f"/state/{board}?since={since}&wait={timeout}", timeout + self.timeout)
+
+    def history(self, board: str, field: str, seconds: float = 60.0) -> dict:
+        return self._get(f"/history/{board}?field={field}&seconds={seconds}")
+
+    def set(self, board: str, field: str, value: float) -> bool:
+        body = json.dumps({"field": field, "value": value}).encode("utf-8")
+        req = urllib.request.Request(self.base + f"/set/{board}", body, {"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=SETTER_TIMEOUT + self.timeout) as resp:
+                return json.loads(resp.read())["ok"]
+        except urllib.error.HTTPError as e:
+            if e.code == 503: return False
+            raise
+
+    def metrics(self) -> str:
+        with urllib.request.urlopen(self.base + "/metrics", timeout=self.timeout) as resp:
+            return resp.read().decode("utf-8")
+
+
+# ==============================================================================
+# 3. ENTRY POINT
+# ==============================================================================
+
+def _port(value: str):
+    """'3' or 'COM3' -> 3; anything else is a device path or pyserial URL."""
+    number = value[3:] if value.upper().startswith("COM") else value
+    return int(number) if number.isdigit() else value
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the home automation boards to local clients.")
+    parser.add_argument("--ac", help="AC board port (number, COMn, device path or URL)")
+    parser.add_argument("--curtain", help="Curtain board port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--interval", type=float, default=2.0, help="base poll interval (s)")
+    parser.add_argument("--history", type=int, default=43200, help="samples kept in memory per board")
+    parser.add_argument("--telemetry", default="telemetry_data", help="telemetry log directory ('' = off)")
+    parser.add_argument("--record", metavar="DIR", help="record each port's traffic into DIR")
+    args = parser.parse_args(argv)
+
+    install_event_log(capacity=1000, console=True)
+    # No ports given: take them from the port map (probed if missing), which
+    # also remembers whether each board's firmware has the bulk status opcode
+    lookup = not (args.ac or args.curtain)
+
+    telemetry = TelemetryLog(args.telemetry) if args.telemetry else None
+    manager = ConnectionManager(interval=args.interval, history_capacity=args.history,
+                                log=telemetry, adaptive=True)
+    recorders, opened, daemon = [], [], None
+    if args.record: os.makedirs(args.record, exist_ok=True)
+    try:
+        for name, cls, port in (("ac", AirConditionerSystemConnection, args.ac),
+                                ("curtain", CurtainControlSystemConnection, args.curtain)):
+            if port is None and not lookup: continue
+            conn = cls()
+            if args.record:
+                conn.serialFactory = Recorder(os.path.join(args.record, f"{name}-{int(time.time())}.rec"))
+                recorders.append(conn.serialFactory)
+            if port is None:
+                if not discovery.connect(conn, name, exclude=[c.getPortName() for c in opened]):
+                    log.warning("No %s board found", name)
+                    continue
+            else:
+                conn.setComPort(_port(str(port)))
+                if not conn.open():
+                    log.error("Could not open %s port %s", name, conn.getPortName())
+                    return 1
+            opened.append(conn)
+            manager.add(name, conn)
+        if not opened:
+            log.error("No board found; pass --ac / --curtain")
+            return 1
+
+        daemon = HomeAutomationDaemon(manager, args.host, args.port).start()
+        log.info("Serving %s on http://%s:%d", ", ".join(manager.names()), *daemon.address[:2])
+
+        stopping = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: stopping.set())
+        signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+        while not stopping.is_set():
+            stopping.wait(1.0)
+        return 0
+    finally:
+        # Also on the early exits: no poll thread or open port is left behind
+        if daemon: daemon.stop()
+        manager.stop()
+        for conn in opened: conn.close()
+        if telemetry: telemetry.close()
+        for recorder in recorders: recorder.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Serial port discovery for the two boards.
+
+Every candidate port is probed at the same time with a read-only handshake:
+board1.asm answers 0x05 (fan speed) and ignores 0x08, board2.asm answers 0x08
+(LDR) and ignores 0x05. The result is cached in a small JSON port map, so the
+next start opens the known ports straight away without probing.
+
+Usage:
+    python discovery.py                  # probe all ports, print and save the map
+    ports = resolve()                    # cached map, probing only if it is empty
+    connect(ac_api, "ac")                # open from the map, re-probe if that fails
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from API import HomeAutomationSystemConnection
+from eventlog import get_logger, install as install_event_log
+from metrics import LinkMetrics, MetricsRegistry
+
+log = get_logger("discovery")
+
+PORT_MAP_FILE = "port_map.json"
+
+# Board -> (probe command, reply deadline). board1 answers within a display
+# frame (~11 ms); board2 only reads RCREG once per ~200 ms main loop.
+BOARD_PROBES = (
+    ("ac", 0x05, 0.25),
+    ("curtain", 0x08, 0.65),
+)
+
+
+class _ProbeConnection(HomeAutomationSystemConnection):
+    """Bare connection used only to send the handshake bytes."""
+    BOARD_NAME = "probe"
+
+    def __init__(self):
+        super().__init__()
+        # Silence is the expected answer on most ports: keep those timeouts
+        # out of the exported metrics, and use the fixed BOARD_PROBES
+        # deadlines without a drain wait between the two probes
+        self.metrics = LinkMetrics(MetricsRegistry())
+        self.adaptiveDeadlines = False
+
+    def update(self, fields=None): pass
+    def snapshot(self) -> dict: return {}
+
+
+def candidate_ports() -> list:
+    """Ports the OS reports, or COM1-COM9 when it reports none (e.g. virtual COM pairs)."""
+    import serial.tools.list_ports     # Not needed on a warm start
+    ports = [p.device for p in serial.tools.list_ports.comports()]
+    return ports or [f"COM{i}" for i in range(1, 10)]
+
+
+def probe_port(port, baud_rate: int = 9600):
+    """Returns the board name answering on `port`, or None (no board / cannot open)."""
+    conn = _ProbeConnection()
+    conn.setComPort(port)
+    conn.setBaudRate(baud_rate)
+    if not conn.open(): return None
+    try:
+        # _exchange() rather than _send_command(): silence is the expected
+        # answer on most ports and should not log a timeout warning
+        for board, cmd, deadline in BOARD_PROBES:
+            if conn._exchange((cmd,), deadline):
+                return board
+        return None
+    finally:
+        conn.close()
+
+
+def discover(ports=None, baud_rate: int = 9600, max_workers: int = 16) -> dict:
+    """
+    Probes all ports concurrently; returns {board: port}. The whole scan takes
+    about one port's worst case (~0.9 s) however many ports there are.
+    """
+    ports = list(candidate_ports() if ports is None else ports)
+    if not ports: return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ports))) as pool:
+        found = list(pool.map(lambda p: (p, probe_port(p, baud_rate)), ports))
+    mapping = {}
+    for port, board in found:
+        if board and board not in mapping:
+            mapping[board] = port
+            log.info("Found %s board on %s", board, port)
+    return mapping
+
+
+# ==============================================================================
+# PORT MAP CACHE
+# ==============================================================================
+
+def _load(path: str, key: str) -> dict:
+    try:
+        with open(path) as f:
+            return dict(json.load(f).get(key, {}))
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _save(path: str, ports: dict, bulk: dict):
+    """Writes the map atomically (a crash never leaves a half-written file)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"ports": ports, "bulk": bulk, "updated": time.time()}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_port_map(path: str = PORT_MAP_FILE) -> dict:
+    """Cached {board: port}; empty if there is no (readable) cache yet."""
+    return _load(path, "ports")
+
+
+def save_port_map(mapping: dict, path: str = PORT_MAP_FILE):
+    """Stores {board: port}, keeping the cached firmware flags."""
+    _save(path, mapping, _load(path, "bulk"))
+
+
+def load_bulk_support(path: str = PORT_MAP_FILE) -> dict:
+    """Cached {board: firmware answers the bulk status opcode}."""
+    return _load(path, "bulk")
+
+
+def save_bulk_support(board: str, supported: bool, path: str = PORT_MAP_FILE):
+    _save(path, load_port_map(path), {**load_bulk_support(path), board: supported})
+
+
+def resolve(path: str = PORT_MAP_FILE, refresh: bool = False, **kwargs) -> dict:
+    """The cached map, or a fresh discover() (saved) if it is empty or refresh is set."""
+    mapping = {} if refresh else load_port_map(path)
+    if not mapping:
+        mapping = discover(**kwargs)
+        if mapping: save_port_map(mapping, path)
+    return mapping
+
+
+def connect(conn: HomeAutomationSystemConnection, board: str, path: str = PORT_MAP_FILE, exclude=()) -> bool:
+    """
+    Opens `conn` on the board's cached port (warm start, no probing). If there
+    is no entry or the port will not open, re-discovers once, skipping the
+    ports in `exclude` (e.g. ones this process already holds).
+    Firmware known to lack the bulk status opcode is not probed for it again,
+    and the outcome of a probe is saved for the next start.
+    """
+    port = load_port_map(path).get(board)
+    opened = False
+    if port is not None:
+        conn.setComPort(port)
+        opened = conn.open()
+
+    if not opened:
+        ports = [p for p in candidate_ports() if p not in exclude]
+        mapping = {**load_port_map(path), **discover(ports, conn.baudRate)}
+        if board not in mapping or mapping[board] == port: return False
+        save_port_map(mapping, path)
+        conn.setComPort(mapping[board])
+        if not conn.open(): return False
+
+    supported = load_bulk_support(path).get(board)
+    if supported is False:
+        conn.assumeLegacyFirmware()
+    elif supported is None:
+        supported = conn.probeBulkSupport()
+        if supported is not None: save_bulk_support(board, supported, path)
+    conn.onBulkProbe = lambda supported: save_bulk_support(board, supported, path)
+    return True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Find which serial port carries which board.")
+    parser.add_argument("ports", nargs="*", help="ports to probe (default: all)")
+    parser.add_argument("--map", default=PORT_MAP_FILE, help="port map file")
+    parser.add_argument("--baud", type=int, default=9600)
+    args = parser.parse_args(argv)
+
+    install_event_log(console=True)
+    start = time.perf_counter()
+    mapping = discover(args.ports or None, args.baud)
+    log.info("Scan took %.2f s", time.perf_counter() - start)
+    if mapping: save_port_map(mapping, args.map)
+    print(json.dumps(mapping, indent=2))
+    return 0 if mapping else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Firmware emulator for the two PIC boards (board1.asm / board2.asm UART protocols).
+
+Each board is exposed on a pseudo-terminal pair, so the API.py connection
+classes can open it by device path (e.g. /dev/pts/5) instead of COM{n}.
+This lets the Python side run on Linux without PicSimLab or com0com.
+
+Usage:
+    python emulator.py --delay 5 --jitter 2 --drop 0.01
+"""
+import os
+import tty
+import time
+import math
+import heapq
+import random
+import select
+import argparse
+import threading
+from abc import ABC, abstractmethod
+
+# ==============================================================================
+# 1. BOARD MODELS (Protocol + simulated sensors)
+# ==============================================================================
+
+class BoardModel(ABC):
+    """
+    Abstract Base Class for an emulated board: decodes received bytes and evolves the
+    simulated sensor values over time.
+    """
+    name = "board"
+
+    @abstractmethod
+    def handle_byte(self, byte: int) -> bytes:
+        """Processes one received byte and returns the reply bytes (maybe empty)."""
+        pass
+
+    def step(self, dt: float):
+        """Advances the simulated sensors by dt seconds."""
+        pass
+
+
+BULK_COMMAND = 0x0F
+
+
+def status_frame(payload) -> bytes:
+    """Bulk status reply: LEN | payload | CHK, CHK = (LEN + payload) mod 256."""
+    frame = bytes([len(payload)]) + bytes(payload)
+    return frame + bytes([sum(frame) & 0xFF])
+
+class AirConditionerModel(BoardModel):
+    """
+    Mirrors board1.asm: 0x01-0x05 getters, the 0x0F status frame and the
+    0x80/0xC0 setters. bulk=False emulates firmware from before the 0x0F opcode.
+    CONTROL_TEMP is a plain comparison: heater on below target, cooler on above.
+    """
+    name = "ac"
+    # MAIN_LOOP shows ambient, target and fan for 2 x 45 display frames each
+    # (~11 ms per frame), so FAN_SPEED_STORE changes about every 3 s
+    FAN_PERIOD = 3.0
+
+    def __init__(self, ambient=24.0, target=22.0, outside=28.0, heat_rate=0.05, leak_rate=0.01, seed=None,
+                 bulk=True):
+        self.rng = random.Random(seed)
+        self.bulk = bulk
+        self.ambient = ambient          # Room temperature (C)
+        self.outside = outside          # Temperature the room drifts towards
+        self.heat_rate = heat_rate      # C/s from heater or cooler
+        self.leak_rate = leak_rate      # 1/s drift towards outside
+        self.set_target_locally(target)
+        self.fan_speed = 0
+        self._fan_age = self.FAN_PERIOD     # Seconds since FAN_SPEED_STORE was last written
+        self.heater = False
+        self.cooler = False
+
+    # --- Firmware registers (as the PIC reports them) ---
+    def ambient_int(self) -> int:
+        return max(0, min(255, int(self.ambient)))
+
+    def ambient_frac(self) -> int:
+        # FRAC_TEMP holds hundredths (remainder * 100 / 1023 in the firmware)
+        return max(0, min(99, int((self.ambient - int(self.ambient)) * 100)))
+
+    def set_target_locally(self, temp: float):
+        """Simulates a keypad entry on the board (bypasses the UART)."""
+        self.target_int = int(temp) & 0x3F
+        # ACCEPT_VALUE: TARGET_TEMP_FRAC = INPUT_TENTHS * 10 + INPUT_HUNDREDTHS
+        self.target_frac = min(99, int(round((temp - int(temp)) * 100)))
+
+    def handle_byte(self, byte: int) -> bytes:
+        if byte & 0x80:
+            # UART_SET_CMD: bit 6 selects Int (1) or Frac (0)
+            if byte & 0x40: self.target_int = byte & 0x3F
+            else: self.target_frac = byte & 0x3F
+            return b""
+        if byte == 0x01: return bytes([self.target_frac])
+        if byte == 0x02: return bytes([self.target_int])
+        if byte == 0x03: return bytes([self.ambient_frac()])
+        if byte == 0x04: return bytes([self.ambient_int()])
+        if byte == 0x05: return bytes([self.fan_speed & 0xFF])
+        if byte == BULK_COMMAND and self.bulk:
+            return status_frame((self.target_frac, self.target_int, self.ambient_frac(),
+                                 self.ambient_int(), self.fan_speed & 0xFF))
+        return b""  # Unknown GET commands are ignored by the firmware
+
+    def step(self, dt: float):
+        # CONTROL_TEMP compares (int, frac) of ambient against target; both
+        # fractions are hundredths
+        amb = (self.ambient_int(), self.ambient_frac())
+        tgt = (self.target_int, self.target_frac)
+        self.heater = amb < tgt
+        self.cooler = amb > tgt
+
+        drive = self.heat_rate if self.heater else -self.heat_rate if self.cooler else 0.0
+        self.ambient += (drive + (self.outside - self.ambient) * self.leak_rate) * dt
+        self.ambient += self.rng.gauss(0.0, 0.01)
+
+        # "RPS simulation": FAN_SPEED_STORE = TMR0 >> 1, a free-running timer
+        # sampled once per main loop, so unrelated to the heater or cooler
+        self._fan_age += dt
+        if self._fan_age >= self.FAN_PERIOD:
+            self._fan_age = 0.0
+            self.fan_speed = self.rng.randrange(256) >> 1
+
+
+class CurtainModel(BoardModel):
+    """
+    Mirrors board2.asm: 0x02 (curtain %), 0x08 (LDR), 0x0F (status frame:
+    curtain %, LDR), 0xC0|val (set curtain). bulk=False drops the 0x0F opcode.
+    Above LDR_LIMIT the board closes the curtain (auto mode); otherwise the
+    potentiometer sets the target. A UART setter switches to manual mode for good.
+    """
+    name = "curtain"
+
+    LDR_LIMIT = 100
+
+    def __init__(self, day_period=600.0, pot=80, percent_time=0.0225, seed=None, bulk=True):
+        self.rng = random.Random(seed)
+        self.bulk = bulk
+        self.day_period = day_period      # Seconds for one simulated day/night cycle
+        self.pot = pot                    # VAL_POT (ADRESH, 0-255)
+        self.percent_time = percent_time  # Seconds per 1 % of stepper travel
+        self.ldr = 0                      # VAL_LDR (ADRESH, 0-255)
+        self.is_auto = 0                  # IS_AUTO: 0 manual pot, 1 auto, 2 UART
+        self.target = 0                   # PERC_TARGET
+        self.current = 0.0                # PERC_CURRENT
+        self.clock = 0.0
+
+    def handle_byte(self, byte: int) -> bytes:
+        if byte == 0x02: return bytes([int(self.current) & 0xFF])
+        if byte == 0x08: return bytes([self.ldr & 0xFF])
+        if byte == BULK_COMMAND and self.bulk:
+            return status_frame((int(self.current) & 0xFF, self.ldr & 0xFF))
+        if (byte & 0xC0) == 0xC0:
+            self.target = byte & 0x3F
+            self.is_auto = 2
+        return b""
+
+    def step(self, dt: float):
+        self.clock += dt
+        light = 0.5 - 0.5 * math.cos(2 * math.pi * self.clock / self.day_period)
+        self.ldr = max(0, min(255, int(light * 200 + self.rng.gauss(0.0, 2.0))))
+
+        if self.is_auto != 2:
+            if self.ldr >= self.LDR_LIMIT:
+                self.is_auto, self.target = 1, 100
+            else:
+                self.is_auto, self.target = 0, min(100, self.pot >> 1)
+
+        # Stepper moves 1 % per percent_time towards the target
+        max_move = dt / self.percent_time if self.percent_time > 0 else abs(self.target - self.current)
+        delta = self.target - self.current
+        self.current += max(-max_move, min(max_move, delta))
+
+
+# ==============================================================================
+# 2. PTY TRANSPORT
+# ==============================================================================
+
+class EmulatedBoard:
+    """
+    Runs a BoardModel behind a pseudo-terminal.
+
+    delay / jitter      : response time in seconds (fixed + uniform random part)
+    drop_rate           : probability that a reply is never sent
+    rx_service_period   : if > 0, models board1.asm's single-byte RX mailbox that
+                          is only serviced once per period; a byte that arrives
+                          before the previous one was serviced overwrites it
+    baud                : if set, adds the serial transmission time per byte
+    """
+    def __init__(self, model: BoardModel, delay=0.0, jitter=0.0, drop_rate=0.0,
+                 rx_service_period=0.0, baud=None, tick=0.05, seed=None):
+        self.model = model
+        self.delay = delay
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.rx_service_period = rx_service_period
+        self.byte_time = 10.0 / baud if baud else 0.0
+        self.tick = tick
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()    # Guards the model against step()/handle races
+        self.device = None
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.dropped = 0
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._running = False
+        self._pending = []              # Heap of (due_time, seq, reply)
+        self._seq = 0
+        self._mailbox = None            # (service_time, byte) waiting in the RX mailbox
+
+    def start(self) -> str:
+        """Creates the pty pair, starts the emulator thread and returns the device path."""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)     # Binary-safe: no echo, no line discipline
+        self.device = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"emu-{self.model.name}", daemon=True)
+        self._thread.start()
+        return self.device
+
+    def stop(self):
+        self._running = False
+        if self._thread: self._thread.join(1.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try: os.close(fd)
+                except OSError: pass
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _schedule(self, due: float, reply: bytes):
+        if not reply: return
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        if self.jitter: due += self.rng.uniform(0.0, self.jitter)
+        self._seq += 1
+        heapq.heappush(self._pending, (due, self._seq, reply))
+
+    def _process(self, byte: int, at: float):
+        with self.lock:
+            reply = self.model.handle_byte(byte)
+        self._schedule(at + self.delay, reply)
+
+    def _receive(self, data: bytes, now: float):
+        self.rx_bytes += len(data)
+        for i, byte in enumerate(data):
+            arrival = now + i * self.byte_time
+            if self.rx_service_period <= 0:
+                self._process(byte, arrival)
+                continue
+            # Single-byte mailbox: a newer byte overwrites one not serviced yet
+            if self._mailbox is not None and self._mailbox[0] > arrival:
+                self.dropped += 1
+            elif self._mailbox is not None:
+                self._process(self._mailbox[1], self._mailbox[0])
+            period = self.rx_service_period
+            service = (math.floor(arrival / period) + 1) * period
+            self._mailbox = (service, byte)
+
+    def _run(self):
+        last_step = time.monotonic()
+        while self._running:
+            now = time.monotonic()
+
+            if self._mailbox is not None and self._mailbox[0] <= now:
+                self._process(self._mailbox[1], self._mailbox[0])
+                self._mailbox = None
+
+            # Send every reply that is due (keeps order for equal due times)
+            while self._pending and self._pending[0][0] <= now:
+                _, _, reply = heapq.heappop(self._pending)
+                try:
+                    os.write(self._master, reply)
+                    self.tx_bytes += len(reply)
+                except OSError:
+                    pass
+
+            if now - last_step >= self.tick:
+                with self.lock:
+                    self.model.step(now - last_step)
+                last_step = now
+
+            # Sleep until input arrives, the next reply is due, or the next tick
+            wake = last_step + self.tick
+            if self._pending: wake = min(wake, self._pending[0][0])
+            if self._mailbox is not None: wake = min(wake, self._mailbox[0])
+            timeout = max(0.0, wake - time.monotonic())
+            try:
+                ready, _, _ = select.select([self._master], [], [], timeout)
+            except (OSError, ValueError):
+                break
+            if ready:
+                try:
+                    data = os.read(self._master, 256)
+                except OSError:
+                    continue
+                if data:
+                    self._receive(data, time.monotonic() + self.byte_time)
+
+
+def start_boards(delay=0.0, jitter=0.0, drop_rate=0.0, seed=None, bulk=True):
+    """Starts one AC and one curtain emulator; returns (ac_board, curtain_board)."""
+    ac = EmulatedBoard(AirConditionerModel(seed=seed, bulk=bulk), delay, jitter, drop_rate, seed=seed)
+    cc = EmulatedBoard(CurtainModel(seed=seed, bulk=bulk), delay, jitter, drop_rate, seed=seed)
+    ac.start()
+    cc.start()
+    return ac, cc
+
+
+# ==============================================================================
+# 3. STANDALONE ENTRY POINT
+# ==============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulate board1/board2 on pty pairs.")
+    parser.add_argument("--delay", type=float, default=0.0, help="response delay (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay (ms)")
+    parser.add_argument("--drop", type=float, default=0.0, help="reply drop probability (0-1)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--legacy", action="store_true", help="firmware without the 0x0F status frame")
+    args = parser.parse_args()
+
+    ac, cc = start_boards(args.delay / 1000, args.jitter / 1000, args.drop, args.seed, not args.legacy)
+    print(f"Air Conditioner (board1) on: {ac.device}")
+    print(f"Curtain Control (board2) on: {cc.device}")
+    print("Press Ctrl+C to stop.")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ac.stop()
+        cc.stop()
@@ -0,0 +1,76 @@
+"""
+Structured event log for the serial I/O layer.
+
+Built on the standard logging module: call sites pass a %-style template and
+arguments, so nothing is formatted unless a handler actually wants the event.
+With the default WARNING level a debug call in the poll loop costs a single
+cached level check.
+
+EventRing keeps the most recent records in a bounded deque (no formatting at
+emit time); GUIs and tools format only the tail they display.
+"""
+import logging
+from collections import deque
+
+LOGGER_NAME = "home_automation"
+
+_ring = None        # The EventRing attached by install()
+_console = None     # Its stderr handler (None = not printing)
+_level = None       # Package logger level set by install()
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    """Returns the package logger or a child of it (e.g. get_logger("api"))."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+class EventRing(logging.Handler):
+    """Keeps the last `capacity` log records; formatting is deferred to tail()/events()."""
+    def __init__(self, capacity: int = 1000, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+
+    def emit(self, record):
+        self.records.append(record)     # deque append is atomic; no lock needed
+
+    def resize(self, capacity: int):
+        """Keeps the last `capacity` records from now on (the newest ones are kept)."""
+        self.records = deque(self.records, maxlen=capacity)
+
+    def events(self, n: int = None, level=logging.NOTSET) -> list:
+        """Structured view of the newest n records: time, level, logger, message, args."""
+        records = [r for r in list(self.records) if r.levelno >= level]
+        if n is not None: records = records[-n:]
+        return [{"time": r.created, "level": r.levelname, "logger": r.name,
+                 "event": r.msg, "args": r.args, "message": r.getMessage()} for r in records]
+
+    def tail(self, n: int = 50, level=logging.NOTSET) -> list:
+        """The newest n records as formatted lines."""
+        records = [r for r in list(self.records) if r.levelno >= level][-n:]
+        return [self.format(r) for r in records]
+
+
+def install(capacity: int = 1000, level=logging.INFO, console: bool = False) -> EventRing:
+    """
+    Attaches an EventRing to the package logger and sets its level.
+    With console=True events are also printed to stderr (formatted on demand).
+    Idempotent: later calls (a second entry point, a re-created app) return
+    the installed ring, grown to the largest capacity and set to the most
+    verbose level any caller asked for, and only add the console handler if
+    it is missing.
+    """
+    global _ring, _console, _level
+    logger = get_logger()
+    _level = level if _level is None else min(_level, level)
+    logger.setLevel(_level)
+    if _ring is None:
+        _ring = EventRing(capacity)
+        logger.addHandler(_ring)
+    elif capacity > _ring.records.maxlen:
+        _ring.resize(capacity)
+    if console and _console is None:
+        _console = logging.StreamHandler()
+        _console.setFormatter(_ring.formatter)
+        logger.addHandler(_console)
+    return _ring
@@ -0,0 +1,265 @@
+"""
+Tkinter desktop application for both boards.
+
+Kept apart from API.py so scripts and services can use the connection
+classes without importing Tk. Run with `python gui.py` (or `python API.py`).
+"""
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+
+import serial.tools.list_ports
+
+import discovery
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection, ConnectionManager
+from telemetry import TelemetryLog
+from eventlog import get_logger, install as install_event_log
+from metrics import start_metrics_server
+from charts import HistorySource, TrendPanel, AC_CHARTS, CURTAIN_CHARTS
+
+log = get_logger("gui")
+
+# ==============================================================================
+# INTERFACE LAYER (GUI)
+# ==============================================================================
+
+class HomeAutomationApp(tk.Tk):
+    """
+    Main GUI Application class using Tkinter.
+    """
+    # Screen name -> board whose labels it shows
+    SCREEN_BOARDS = {"ac": "ac", "curtain": "curtain"}
+
+    def __init__(self):
+        super().__init__()
+        self.title("ESOGU Home Automation System (Robust)")
+        self.geometry("600x800")
+        self.resizable(False, False)
+
+        # Recent I/O events stay in a bounded ring; INFO and above also go to the console
+        self.events = install_event_log(capacity=500, level=logging.INFO, console=True)
+        
+        # Initialize API instances
+        self.ac_api = AirConditionerSystemConnection()
+        self.curtain_api = CurtainControlSystemConnection()
+        
+        self.container = tk.Frame(self)
+        self.container.pack(fill="both", expand=True, padx=20, pady=20)
+
+        # Screens are built once and shown/hidden; labels redraw only when their text changes
+        self.screens = {}
+        self.current_screen = None
+        self.current_board = None
+        self.board_labels = {}      # board -> [(label, snapshot key, format)]
+        self.shown_text = {}        # label -> text currently displayed
+        self.shown_snapshot = {}    # board -> snapshot last rendered
+
+        self.show_main_menu()
+        
+        # Update Rate: 2 seconds is ideal for sensors to catch up (Per documentation)
+        self.update_interval = 2000 
+
+        # Serial polling runs on background threads; the UI only reads snapshots
+        # One day of samples per board in memory, everything on disk
+        self.telemetry_log = TelemetryLog("telemetry_data")
+        self.manager = ConnectionManager(interval=self.update_interval / 1000, history_capacity=43200,
+                                         log=self.telemetry_log, adaptive=True)
+        self.manager.add("ac", self.ac_api)
+        self.manager.add("curtain", self.curtain_api)
+
+        # Link health for alerting: http://127.0.0.1:9108/metrics
+        try:
+            self.metrics_server = start_metrics_server(port=9108)
+        except OSError as e:
+            self.metrics_server = None
+            log.warning("Metrics endpoint not started: %s", e)
+        self.update_data_loop()
+
+    def show_screen(self, name: str, builder):
+        """
+        Shows one screen and hides the others. Each screen is built once by
+        builder(frame) on first use and kept; switching only re-packs frames.
+        """
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = tk.Frame(self.container)
+            builder(screen)
+        if self.current_screen is not None and self.current_screen is not screen:
+            self.current_screen.pack_forget()
+        screen.pack(fill="both", expand=True)
+        self.current_screen = screen
+        self.current_board = self.SCREEN_BOARDS.get(name)
+        self.refresh_labels()
+
+    def bind_label(self, board: str, label: tk.Label, key: str, fmt: str):
+        """Registers a label that shows snapshot[key] formatted with fmt."""
+        self.board_labels.setdefault(board, []).append((label, key, fmt))
+
+    def auto_connect(self, api_obj, board: str) -> bool:
+        """
+        Opens the board's port from the cached port map, probing every free
+        port in parallel only when the map is missing or stale.
+        """
+        held = [api.getPortName() for api in (self.ac_api, self.curtain_api) if api.is_connected()]
+        return discovery.connect(api_obj, board, exclude=held)
+
+    def remember_port(self, board: str, port):
+        """Stores a manually chosen port in the port map for the next start."""
+        discovery.save_port_map({**discovery.load_port_map(), board: port})
+
+    def ask_port_connection(self, api_obj, system_name, board):
+        """Creates a popup window to select and connect to a COM port."""
+        popup = tk.Toplevel(self)
+        popup.title(f"Connect {system_name}")
+        popup.geometry("300x150")
+        
+        tk.Label(popup, text=f"Port for {system_name}:").pack(pady=5)
+        # List available ports or default to COM1-9
+        ports = [p.device for p in serial.tools.list_ports.comports()]
+        if not ports: ports = [f"COM{i}" for i in range(1, 10)]
+        
+        combo = ttk.Combobox(popup, values=ports)
+        if ports: combo.current(0)
+        combo.pack(pady=5)
+
+        def connect():
+            p = combo.get()
+            try:
+                # "COM3" keeps the numeric form; anything else (/dev/ttyUSB0, /dev/pts/4) is a path
+                if p.upper().startswith("COM") and p[3:].isdigit(): api_obj.setComPort(int(p[3:]))
+                else: api_obj.setComPort(p)
+                if api_obj.open():
+                    self.remember_port(board, api_obj.comPort)
+                    messagebox.showinfo("OK", f"Connected {p}")
+                    popup.destroy()
+                else: messagebox.showerror("Err", "Failed")
+            except: pass
+        
+        tk.Button(popup, text="Connect", command=connect).pack(pady=10)
+        self.wait_window(popup)
+
+    def show_main_menu(self):
+        """Displays the main navigation menu."""
+        self.show_screen("menu", self.build_main_menu)
+
+    def build_main_menu(self, screen):
+        frame = tk.LabelFrame(screen, text="MAIN MENU", font=("Arial", 14, "bold"), padx=20, pady=20)
+        frame.pack(expand=True)
+        tk.Button(frame, text="1. Air Conditioner", width=25, command=self.on_ac).pack(pady=5)
+        tk.Button(frame, text="2. Curtain Control", width=25, command=self.on_cc).pack(pady=5)
+        tk.Button(frame, text="3. Exit", width=25, bg="red", fg="white", command=self.quit_app).pack(pady=5)
+
+    def on_ac(self):
+        """Handler for Air Conditioner button."""
+        if not self.ac_api.is_connected() and not self.auto_connect(self.ac_api, "ac"):
+            self.ask_port_connection(self.ac_api, "Air Conditioner", "ac")
+        if self.ac_api.is_connected(): self.show_ac()
+
+    def on_cc(self):
+        """Handler for Curtain Control button."""
+        if not self.curtain_api.is_connected() and not self.auto_connect(self.curtain_api, "curtain"):
+            self.ask_port_connection(self.curtain_api, "Curtain", "curtain")
+        if self.curtain_api.is_connected(): self.show_cc()
+
+    def show_ac(self):
+        """Displays the Air Conditioner Monitor/Control interface."""
+        self.show_screen("ac", self.build_ac)
+
+    def build_ac(self, screen):
+        f_info = tk.LabelFrame(screen, text="Monitor", font=("Arial", 10, "bold"))
+        f_info.pack(fill="x", pady=10)
+
+        for text, key, fmt in (("Amb: --", "ambientTemperature", "Home Ambient Temperature: {:.1f} C"),
+                               ("Des: --", "desiredTemperature", "Home Desired Temperature: {:.1f} C"),
+                               ("Fan: --", "fanSpeed", "Fan Speed: {} rps")):
+            label = tk.Label(f_info, text=text, font=("Arial", 12))
+            label.pack(anchor="w", padx=10)
+            self.bind_label("ac", label, key, fmt)
+
+        self.build_trends(screen, "ac", AC_CHARTS)
+        tk.Button(screen, text="Set Temp", command=self.set_temp).pack(fill="x", pady=5)
+        tk.Button(screen, text="Return", command=self.show_main_menu).pack(fill="x", pady=5)
+
+    def set_temp(self):
+        """Dialog to input desired temperature."""
+        val = simpledialog.askfloat("Input", "Temp (10-50):", minvalue=10, maxvalue=50)
+        if val: self.ac_api.setDesiredTempAsync(val)
+
+    def show_cc(self):
+        """Displays the Curtain & Light Monitor/Control interface."""
+        self.show_screen("curtain", self.build_cc)
+
+    def build_cc(self, screen):
+        f_info = tk.LabelFrame(screen, text="System Monitor", font=("Arial", 10, "bold"))
+        f_info.pack(fill="x", pady=10)
+
+        for text, key, fmt, style in (
+                ("Outdoor Temp: --", "outdoorTemperature", "Outdoor Temperature: {:.1f} C", {}),
+                ("Pressure: --", "outdoorPressure", "Outdoor Pressure: {:.0f} hPa", {}),
+                ("Curtain: --", "curtainStatus", "Curtain Status: {:.0f} %",
+                 {"font": ("Arial", 11, "bold"), "fg": "blue"}),
+                ("Light: --", "lightIntensity", "Light Intensity: {:.0f} Lux", {})):
+            label = tk.Label(f_info, text=text, **{"font": ("Arial", 11), **style})
+            label.pack(anchor="w", padx=10)
+            self.bind_label("curtain", label, key, fmt)
+
+        self.build_trends(screen, "curtain", CURTAIN_CHARTS)
+        tk.Button(screen, text="Set Curtain", command=self.set_curtain).pack(fill="x", pady=5)
+        tk.Button(screen, text="Return", command=self.show_main_menu).pack(fill="x", pady=5)
+
+    def build_trends(self, screen, board: str, charts):
+        """Live charts of the board's history (recent samples in memory, older ones from disk)."""
+        f_trend = tk.LabelFrame(screen, text="Trends", font=("Arial", 10, "bold"))
+        f_trend.pack(fill="both", expand=True, pady=5)
+        source = HistorySource(self.manager.history(board), self.telemetry_log, board)
+        TrendPanel(f_trend, source, charts, width=540, height=150).pack(fill="both", expand=True)
+
+    def set_curtain(self):
+        """Dialog to input curtain opening percentage."""
+        val = simpledialog.askfloat("Input", "Curtain %:")
+        if val is not None: self.curtain_api.setCurtainStatusAsync(val)
+
+    def refresh_labels(self):
+        """
+        Renders the visible board's latest snapshot. Nothing happens unless a
+        new snapshot was published, and only labels whose text changed are
+        reconfigured (each config() forces a Tk redraw).
+        """
+        board = self.current_board
+        if board is None: return
+        snap = self.manager.latest(board)
+        if snap is None or snap is self.shown_snapshot.get(board): return
+        self.shown_snapshot[board] = snap
+        for label, key, fmt in self.board_labels.get(board, ()):
+            text = fmt.format(snap[key])
+            if self.shown_text.get(label) != text:
+                label.config(text=text)
+                self.shown_text[label] = text
+
+    def update_data_loop(self):
+        """
+        Periodic loop to refresh UI labels from the latest published snapshots.
+        Serial I/O happens on the ConnectionManager threads, never here.
+        """
+        self.refresh_labels()
+        
+        # Schedule next update
+        self.after(self.update_interval, self.update_data_loop)
+
+    def quit_app(self):
+        """Closes connections and destroys the window."""
+        self.manager.stop()
+        self.telemetry_log.close()
+        if self.metrics_server: self.metrics_server.shutdown()
+        self.ac_api.close()
+        self.curtain_api.close()
+        self.destroy()
+
+
+def main():
+    app = HomeAutomationApp()
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Virtual fleet load generator: how the API layer scales with the number of boards.
+
+Starts N emulated boards (board1.asm / board2.asm byte protocols, see
+emulator.py) on pseudo-terminals with a mix of latency and failure
+profiles, points one connection class per board at them through a
+ConnectionManager, and reports for each N:
+
+    throughput      updates/s and exchanges/s (and how close polling keeps
+                    up with N / interval)
+    tail latency    exchange round trip p50 / p99 / p99.9, update() p50 / p99
+    correctness     AC setpoint readings that differ from what the board holds
+                    (a late reply taken as the answer to the next command)
+    cost            CPU (total and per board), threads, open file
+                    descriptors and resident memory of this process
+
+The whole fleet runs in a child process on one selector loop, so its own
+CPU, threads and descriptors do not count against the API side.
+
+Usage:
+    python loadgen.py --boards 10,50,100,200 --duration 20
+    python loadgen.py --boards 100 --mix fast:60,slow:30,flaky:10 --adaptive --out fleet.json
+"""
+import os
+import sys
+import tty
+import json
+import time
+import logging
+import heapq
+import random
+import argparse
+import platform
+import selectors
+import threading
+import multiprocessing
+
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection, ConnectionManager
+from emulator import AirConditionerModel, CurtainModel
+from benchmark import percentile
+from eventlog import install as install_event_log
+
+try:
+    import resource     # POSIX only
+except ImportError:
+    resource = None
+
+# Board behaviour: reply delay + uniform jitter (s), reply drop probability,
+# and whether the firmware has the 0x0F bulk status opcode
+PROFILES = {
+    "fast":    {"delay": 0.002, "jitter": 0.002, "drop_rate": 0.0,   "bulk": True},
+    "typical": {"delay": 0.010, "jitter": 0.010, "drop_rate": 0.001, "bulk": True},
+    "slow":    {"delay": 0.080, "jitter": 0.050, "drop_rate": 0.005, "bulk": True},
+    "flaky":   {"delay": 0.020, "jitter": 0.100, "drop_rate": 0.10,  "bulk": True},
+    "legacy":  {"delay": 0.010, "jitter": 0.010, "drop_rate": 0.001, "bulk": False},
+    "dead":    {"delay": 0.0,   "jitter": 0.0,   "drop_rate": 1.0,   "bulk": True},
+}
+DEFAULT_MIX = "fast:30,typical:40,slow:15,flaky:10,legacy:4,dead:1"
+# Setpoint of every emulated AC board; nothing writes it, so any other
+# reading is a misread
+SETPOINT = 22.0
+
+
+def parse_mix(text: str) -> list:
+    """'fast:60,slow:40' -> [("fast", 0.6), ("slow", 0.4)] (weights normalized)."""
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition(":")
+        if name not in PROFILES:
+            raise ValueError(f"unknown profile '{name}' (choose from {', '.join(PROFILES)})")
+        mix.append((name, float(weight or 1)))
+    total = sum(w for _, w in mix)
+    return [(name, w / total) for name, w in mix]
+
+
+def fleet_plan(n: int, mix, curtain_fraction: float = 0.5, seed: int = 1) -> list:
+    """
+    [(kind, profile), ...] for N boards: profile counts follow the mix
+    (largest remainder), kinds alternate so every profile gets both.
+    """
+    counts = {name: int(n * share) for name, share in mix}
+    by_remainder = sorted(mix, key=lambda m: n * m[1] - int(n * m[1]), reverse=True)
+    for name, _ in by_remainder[:n - sum(counts.values())]:
+        counts[name] += 1
+    profiles = [name for name, _ in mix for _ in range(counts[name])]
+    random.Random(seed).shuffle(profiles)
+    curtain_every = 1 / curtain_fraction if curtain_fraction > 0 else float("inf")
+    return [("curtain" if curtain_fraction and (i + 1) % curtain_every < 1 else "ac", profile)
+            for i, profile in enumerate(profiles)]
+
+
+# ==============================================================================
+# 1. FLEET (child process)
+# ==============================================================================
+
+class Fleet:
+    """
+    Any number of emulated boards served by one thread: a selector over all
+    pty masters plus one heap of pending replies (same reply semantics as
+    emulator.EmulatedBoard, without a thread per board).
+    """
+    TICK = 0.1      # Sensor model step (s)
+
+    def __init__(self, plan, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.boards = []        # [model, profile, master, slave, device]
+        for i, (kind, profile) in enumerate(plan):
+            params = PROFILES[profile]
+            if kind == "curtain":
+                model = CurtainModel(seed=seed + i, bulk=params["bulk"])
+            else:
+                model = AirConditionerModel(target=SETPOINT, seed=seed + i, bulk=params["bulk"])
+            self.boards.append([model, params, None, None, None])
+        self.selector = selectors.DefaultSelector()
+        self._pending = []      # Heap of (due, seq, master fd, reply)
+        self._seq = 0
+
+    def start(self) -> list:
+        """Creates the pty pairs; returns their device paths in plan order."""
+        for board in self.boards:
+            master, slave = os.openpty()
+            tty.setraw(slave)
+            board[2], board[3], board[4] = master, slave, os.ttyname(slave)
+            self.selector.register(master, selectors.EVENT_READ, board)
+        return [board[4] for board in self.boards]
+
+    def close(self):
+        self.selector.close()
+        for board in self.boards:
+            for fd in board[2:4]:
+                if fd is not None:
+                    try: os.close(fd)
+                    except OSError: pass
+
+    def _receive(self, board, data: bytes, now: float):
+        model, params, master = board[0], board[1], board[2]
+        for byte in data:
+            reply = model.handle_byte(byte)
+            if not reply or (params["drop_rate"] and self.rng.random() < params["drop_rate"]):
+                continue
+            due = now + params["delay"] + (self.rng.uniform(0.0, params["jitter"]) if params["jitter"] else 0.0)
+            self._seq += 1
+            heapq.heappush(self._pending, (due, self._seq, master, reply))
+
+    def run(self, stop_fd: int):
+        """Serves the boards until stop_fd becomes readable."""
+        self.selector.register(stop_fd, selectors.EVENT_READ, None)
+        last_step = time.monotonic()
+        while True:
+            now = time.monotonic()
+            while self._pending and self._pending[0][0] <= now:
+                _, _, master, reply = heapq.heappop(self._pending)
+                try: os.write(master, reply)
+                except OSError: pass
+            if now - last_step >= self.TICK:
+                for board in self.boards: board[0].step(now - last_step)
+                last_step = now
+            wake = last_step + self.TICK
+            if self._pending: wake = min(wake, self._pending[0][0])
+            for key, _ in self.selector.select(max(0.0, wake - time.monotonic())):
+                if key.data is None: return
+                try:
+                    data = os.read(key.fd, 256)
+                except OSError:
+                    continue
+                if data: self._receive(key.data, data, time.monotonic())
+
+
+def _fleet_main(plan, seed, pipe):
+    fleet = Fleet(plan, seed)
+    try:
+        pipe.send(fleet.start())
+        fleet.run(pipe.fileno())
+    finally:
+        fleet.close()
+
+
+class FleetProcess:
+    """Runs a Fleet in a child process; `devices` are the pty paths to open."""
+    def __init__(self, plan, seed: int = 1):
+        # spawn: a fork would copy this process's poll threads' locks mid-use
+        context = multiprocessing.get_context("spawn")
+        self._pipe, child = context.Pipe()
+        self.process = context.Process(target=_fleet_main, args=(plan, seed, child), daemon=True)
+        self.process.start()
+        self.devices = self._pipe.recv()
+
+    def stop(self):
+        self._pipe.send("stop")
+        self.process.join(5.0)
+        if self.process.is_alive(): self.process.terminate()
+
+
+# ==============================================================================
+# 2. MEASUREMENT (this process)
+# ==============================================================================
+
+def _instrument(conn, exchanges: list, updates: list, wrong: list):
+    """
+    Collects raw exchange (seconds, ok) and update() durations for
+    percentiles, and the updates that left a wrong setpoint on an AC board.
+    """
+    record_timing, update = conn._record_timing, conn.update
+    unread = getattr(conn, "desiredTemperature", None)   # Before the first reply
+
+    def recording(cmd, elapsed, ok):
+        exchanges.append((elapsed, ok))
+        record_timing(cmd, elapsed, ok)
+
+    def timed_update(fields=None):
+        start = time.perf_counter()
+        update(fields)
+        updates.append(time.perf_counter() - start)
+        if unread is not None and conn.desiredTemperature not in (SETPOINT, unread):
+            wrong.append(conn.desiredTemperature)
+
+    conn._record_timing = recording
+    conn.update = timed_update
+
+
+def process_usage() -> dict:
+    """CPU seconds, threads, open descriptors and resident memory of this process."""
+    usage = {"cpu": time.process_time(), "threads": threading.active_count(), "fds": None, "rss_mb": None}
+    try:
+        usage["fds"] = len(os.listdir("/proc/self/fd"))
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): usage["rss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        if resource is not None:    # Peak RSS: KiB on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            usage["rss_mb"] = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return usage
+
+
+def raise_fd_limit():
+    """Lifts the soft descriptor limit to the hard one (hundreds of ports)."""
+    if resource is None: return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try: resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError): pass
+
+
+def run_fleet(n: int, mix, args) -> dict:
+    """Polls N emulated boards for args.duration seconds; returns one result row."""
+    plan = fleet_plan(n, mix, args.curtain_fraction, args.seed)
+    fleet = FleetProcess(plan, args.seed)
+    manager = ConnectionManager(interval=args.interval, adaptive=args.adaptive)
+    exchanges, updates, wrong, conns = [], [], [], []
+    baseline = process_usage()
+    try:
+        for i, ((kind, profile), device) in enumerate(zip(plan, fleet.devices)):
+            conn = CurtainControlSystemConnection() if kind == "curtain" else AirConditionerSystemConnection()
+            conn.setComPort(device)
+            if kind == "ac": conn.setpointCacheTTL = args.setpoint_cache
+            if not conn.open():
+                raise RuntimeError(f"could not open {device}")
+            _instrument(conn, exchanges, updates, wrong)
+            conns.append(conn)
+            manager.add(f"{kind}-{i:04d}-{profile}", conn)
+
+        time.sleep(args.warmup)
+        del exchanges[:], updates[:], wrong[:]
+        start, before = time.monotonic(), process_usage()
+        time.sleep(args.duration)
+        elapsed, after = time.monotonic() - start, process_usage()
+        done_exchanges, done_updates, done_wrong = list(exchanges), list(updates), list(wrong)
+        breakers_open = sum(conn.breaker.is_open() for conn in conns)
+    finally:
+        manager.stop()
+        for conn in conns: conn.close()
+        fleet.stop()
+
+    latencies = [t for t, ok in done_exchanges if ok]
+    cpu = after["cpu"] - before["cpu"]
+    updates_per_sec = len(done_updates) / elapsed
+    return {
+        "boards": n,
+        "updates_per_sec": updates_per_sec,
+        "poll_ratio": updates_per_sec / (n / args.interval),
+        "exchanges_per_sec": len(done_exchanges) / elapsed,
+        "timeout_rate": 1 - len(latencies) / len(done_exchanges) if done_exchanges else 0.0,
+        "rtt_p50": percentile(latencies, 50),
+        "rtt_p99": percentile(latencies, 99),
+        "rtt_p999": percentile(latencies, 99.9),
+        "update_p50": percentile(done_updates, 50),
+        "update_p99": percentile(done_updates, 99),
+        "wrong_readings": len(done_wrong),
+        "cpu_percent": 100 * cpu / elapsed,
+        "cpu_ms_per_board_sec": 1000 * cpu / elapsed / n,
+        "threads": after["threads"],
+        "fds": after["fds"],
+        "fds_added": None if after["fds"] is None else after["fds"] - baseline["fds"],
+        "fds_per_board": None if after["fds"] is None else (after["fds"] - baseline["fds"]) / n,
+        "rss_mb": after["rss_mb"],
+        "breakers_open": breakers_open,
+    }
+
+
+# ==============================================================================
+# 3. ENTRY POINT
+# ==============================================================================
+
+# (result key, header, width, format spec)
+COLUMNS = (
+    ("boards", "N", 5, "d"), ("updates_per_sec", "upd/s", 8, ".1f"), ("poll_ratio", "keep-up", 7, ".0%"),
+    ("exchanges_per_sec", "xchg/s", 8, ".1f"), ("timeout_rate", "t/o", 6, ".1%"),
+    ("rtt_p50", "rtt p50", 8, ".4f"), ("rtt_p99", "rtt p99", 8, ".4f"), ("rtt_p999", "p99.9", 8, ".4f"),
+    ("update_p99", "upd p99", 8, ".3f"), ("wrong_readings", "wrong", 6, "d"), ("cpu_percent", "cpu %", 6, ".1f"),
+    ("cpu_ms_per_board_sec", "ms/brd/s", 8, ".2f"), ("threads", "thr", 5, "d"), ("fds", "fds", 5, "d"),
+    ("rss_mb", "rss MB", 7, ".1f"), ("breakers_open", "open", 5, "d"),
+)
+
+
+def print_header():
+    print(" ".join(f"{title:>{width}}" for _, title, width, _ in COLUMNS))
+
+
+def print_row(row: dict):
+    print(" ".join(f"{'-':>{width}}" if row[key] is None else f"{row[key]:>{width}{spec}}"
+                   for key, _, width, spec in COLUMNS))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Stress-test the API layer with a fleet of emulated boards.")
+    parser.add_argument("--boards", default="10,50,100", help="comma-separated fleet sizes to sweep")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"profile:weight list ({', '.join(PROFILES)})")
+    parser.add_argument("--curtain-fraction", type=float, default=0.5, help="share of curtain boards")
+    parser.add_argument("--interval", type=float, default=1.0, help="poll interval per board (s)")
+    parser.add_argument("--adaptive", action="store_true", help="per-field adaptive polling")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per fleet size")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each run")
+    parser.add_argument("--setpoint-cache", type=float, default=30.0,
+                        help="AC setpoint cache TTL (s, 0 = read it on every update)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="print link warnings (timeouts, breakers)")
+    args = parser.parse_args(argv)
+
+    # Warnings still reach the in-memory event ring; the console keeps the table
+    install_event_log(capacity=1000, level=logging.WARNING, console=args.verbose)
+
+    mix = parse_mix(args.mix)
+    raise_fd_limit()
+    print_header()
+    rows = []
+    for n in (int(x) for x in args.boards.split(",")):
+        row = run_fleet(n, mix, args)
+        print_row(row)
+        rows.append(row)
+
+    if args.out:
+        meta = {"timestamp": time.time(), "python": platform.python_version(), "platform": platform.platform(),
+                "mix": args.mix, "interval": args.interval, "adaptive": args.adaptive,
+                "duration": args.duration, "curtain_fraction": args.curtain_fraction}
+        with open(args.out, "w") as f:
+            json.dump({"meta": meta, "results": rows}, f, indent=2)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
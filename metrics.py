@@ -0,0 +1,215 @@
+"""
+Instrumentation for the serial I/O layer.
+
+Counters and latency histograms labelled by board and command byte, rendered
+in the Prometheus text exposition format and served from a local HTTP
+endpoint (GET /metrics).
+
+Usage:
+    server = start_metrics_server(port=9108)   # http://127.0.0.1:9108/metrics
+"""
+import threading
+
+# Serial round trips range from ~1 ms (fast link) to the 2 s deadline ceiling
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ==============================================================================
+# 1. METRIC TYPES
+# ==============================================================================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels: counter.inc(("ac", "0x01"), 1)."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, label_values=()) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_label_text(self.labels, values)} {total}"
+
+
+class Gauge(Counter):
+    """Labelled value that can go up and down: gauge.set(("ac",), 1)."""
+    kind = "gauge"
+
+    def set(self, label_values=(), value: float = 0):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels: hist.observe(("ac", "0x01"), 0.004)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}       # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for values, series in items:
+            running = 0
+            for bound, n in zip(self.buckets, series):
+                running += n
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_label_text(self.labels, values, le)} {running}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_text(self.labels, values, le)} {series[-1]}"
+            yield f"{self.name}_sum{_label_text(self.labels, values)} {series[-2]}"
+            yield f"{self.name}_count{_label_text(self.labels, values)} {series[-1]}"
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ==============================================================================
+# 2. SERIAL LINK METRICS
+# ==============================================================================
+
+class LinkMetrics:
+    """The per-board / per-command series recorded by the connection classes."""
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        labels = ("board", "command")
+        self.latency = registry.histogram(
+            "home_automation_command_latency_seconds",
+            "Request/response round-trip time per command.", labels)
+        self.timeouts = registry.counter(
+            "home_automation_command_timeouts_total",
+            "Commands that got no reply before the deadline.", labels)
+        self.io_errors = registry.counter(
+            "home_automation_io_errors_total",
+            "Serial exceptions raised during a command.", labels)
+        self.bytes_sent = registry.counter(
+            "home_automation_bytes_sent_total", "Bytes written to the port.", ("board",))
+        self.bytes_received = registry.counter(
+            "home_automation_bytes_received_total", "Reply bytes read from the port.", ("board",))
+        self.stale_discards = registry.counter(
+            "home_automation_stale_bytes_discarded_total",
+            "Late bytes dropped by reset_input_buffer() before a command.", ("board",))
+        self.frame_errors = registry.counter(
+            "home_automation_frame_errors_total",
+            "Bulk status frames with a wrong length byte or checksum.", ("board",))
+        self.deadline_misses = registry.counter(
+            "home_automation_deadline_misses_total",
+            "Exchanges not sent because their transaction was cancelled or past its deadline.", labels)
+        self.short_circuits = registry.counter(
+            "home_automation_commands_short_circuited_total",
+            "Commands skipped without I/O because the board's circuit breaker is open.", labels)
+        self.reply_deadline = registry.gauge(
+            "home_automation_reply_deadline_seconds",
+            "Current adaptive reply deadline (smoothed RTT + 4 deviations) per command.", labels)
+        self.circuit_open = registry.gauge(
+            "home_automation_circuit_open", "1 while the board's circuit breaker is open.", ("board",))
+
+
+LINK_METRICS = LinkMetrics()
+
+
+# ==============================================================================
+# 3. HTTP EXPOSITION ENDPOINT
+# ==============================================================================
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+    """Serves GET /metrics on a daemon thread; returns the server (call shutdown() to stop)."""
+    # Imported here: http.server is the slowest import in the library and only
+    # the processes that serve metrics need it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass    # Keep scrapes out of the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
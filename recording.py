@@ -0,0 +1,374 @@
+"""
+Record and replay of serial sessions.
+
+Recorder wraps the real port and logs every byte written, read, or thrown
+away by reset_input_buffer() with a nanosecond timestamp. Replayer feeds a
+recorded session back to the connection classes in place of the port. It
+can run in real time, or as fast as possible on a virtual clock that keeps
+the recorded timing, so late replies are still discarded and timeouts still
+time out. Both plug into HomeAutomationSystemConnection.serialFactory.
+replay() also drives the connection's clock from the session, so adaptive
+reply deadlines are learned in recorded seconds and behave as they did live.
+
+File format (little endian):
+    b"HASR" | u8 version | u16 name length | port name
+    events: u64 ns since start | u8 kind (0 write, 1 read, 2 discard) | u16 length | bytes
+
+Usage:
+    conn.serialFactory = Recorder("ac.rec")          # then open() as usual
+    conn.serialFactory = Replayer("ac.rec")          # offline, virtual clock
+
+    python recording.py dump ac.rec
+    python recording.py replay ac.rec --board ac [--realtime --speed 2]
+"""
+import sys
+import time
+import struct
+import argparse
+import threading
+from collections import deque
+
+import serial
+
+MAGIC = b"HASR"
+VERSION = 1
+EVENT = struct.Struct("<QBH")
+WRITE, READ, DISCARD = 0, 1, 2
+KIND_NAMES = {WRITE: "write", READ: "read", DISCARD: "discard"}
+
+
+class ReplayMismatch(Exception):
+    """The connection wrote something the recorded session did not (strict replay)."""
+
+
+# ==============================================================================
+# 1. SESSION FILES
+# ==============================================================================
+
+class SessionWriter:
+    """Appends timestamped events to a session file (buffered, thread-safe)."""
+    def __init__(self, path: str, port_name: str):
+        self._file = open(path, "wb")
+        name = port_name.encode("utf-8")
+        self._file.write(MAGIC + bytes([VERSION]) + struct.pack("<H", len(name)) + name)
+        self._t0 = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def event(self, kind: int, data: bytes):
+        with self._lock:
+            if self._file.closed: return
+            self._file.write(EVENT.pack(time.perf_counter_ns() - self._t0, kind, len(data)) + data)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_session(path: str):
+    """Returns (port_name, [(seconds, kind, data), ...])."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    if blob[:4] != MAGIC or blob[4] != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} session file")
+    name_len = struct.unpack_from("<H", blob, 5)[0]
+    port_name = blob[7:7 + name_len].decode("utf-8")
+    events, pos = [], 7 + name_len
+    while pos + EVENT.size <= len(blob):
+        ns, kind, length = EVENT.unpack_from(blob, pos)
+        pos += EVENT.size
+        events.append((ns / 1e9, kind, blob[pos:pos + length]))
+        pos += length
+    return port_name, events
+
+
+# ==============================================================================
+# 2. RECORDING
+# ==============================================================================
+
+class SerialRecorder:
+    """pyserial port proxy that logs traffic; everything else is passed through."""
+    def __init__(self, inner, writer: SessionWriter):
+        object.__setattr__(self, "_inner", inner)
+        object.__setattr__(self, "_writer", writer)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._inner, name, value)   # timeout, dtr, rts, ...
+
+    def write(self, data):
+        count = self._inner.write(data)
+        self._writer.event(WRITE, bytes(data))
+        return count
+
+    def read(self, size: int = 1) -> bytes:
+        data = self._inner.read(size)
+        self._writer.event(READ, data)      # Empty = the read timed out
+        return data
+
+    def reset_input_buffer(self):
+        # Drain what is about to be thrown away so late replies are on record
+        waiting = self._inner.in_waiting
+        if waiting: self._writer.event(DISCARD, self._inner.read(waiting))
+        self._inner.reset_input_buffer()
+
+    flushInput = reset_input_buffer
+
+
+class Recorder:
+    """serialFactory that opens real ports and records them into one file."""
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    def __call__(self, url, *args, **kwargs):
+        inner = serial.serial_for_url(url, *args, **kwargs)
+        if self.writer is None: self.writer = SessionWriter(self.path, str(url))
+        return SerialRecorder(inner, self.writer)
+
+    def close(self):
+        if self.writer: self.writer.close()
+
+
+# ==============================================================================
+# 3. REPLAY
+# ==============================================================================
+
+def _segments(events):
+    """
+    Splits a session into exchanges: (write time, written bytes, [(offset, reply bytes)]).
+    Bytes read or discarded after a write belong to it; their offset from the
+    write is the reply latency that replay reproduces.
+    """
+    segments = [(0.0, None, [])]    # Device output seen before the first write
+    for t, kind, data in events:
+        if kind == WRITE:
+            segments.append((t, data, []))
+        elif data:
+            segments[-1][2].append((t - segments[-1][0], data))
+    return segments
+
+
+class ReplaySerial:
+    """
+    Stand-in for a pyserial port that answers from a recorded session.
+    Writes are matched against the recorded writes (resynchronising past
+    unmatched ones unless strict); the recorded replies then arrive at the
+    recorded offsets. In fast mode time is virtual: reads jump the clock to
+    the next arrival or to the timeout instead of sleeping.
+    """
+    def __init__(self, segments, realtime: bool = False, speed: float = 1.0, strict: bool = False):
+        self.port = "replay"
+        self.timeout = None
+        self.dtr = self.rts = False
+        self.is_open = False
+        self.realtime = realtime
+        self.speed = speed
+        self.strict = strict
+        self.skipped = 0        # Recorded exchanges the connection never made
+        self.unmatched = 0      # Writes with no recorded counterpart
+        self.discarded = 0      # Reply bytes dropped by reset_input_buffer()
+        self._segments = segments
+        self._next = 1
+        self._pending = deque((off, data) for off, data in segments[0][2])
+        self._buffer = bytearray()
+        self._clock = 0.0       # Virtual time in recorded seconds (fast mode)
+        self._start = time.perf_counter()
+        self._anchor = None     # (recorded write time, replay time) of the last match
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next >= len(self._segments)
+
+    @property
+    def position(self) -> int:
+        """Index of the next recorded exchange a write can match."""
+        return self._next
+
+    def skip_rest(self):
+        """Counts the exchanges left as skipped (e.g. trailing setter writes) and ends the session."""
+        self.skipped += len(self._segments) - self._next
+        self._next = len(self._segments)
+
+    def _now(self) -> float:
+        if self.realtime: return (time.perf_counter() - self._start) * self.speed
+        return self._clock
+
+    def now(self) -> float:
+        """Session time in recorded seconds (a connection clock, see replay())."""
+        return self._now()
+
+    def sleep(self, seconds: float):
+        """Waits `seconds` of session time (jumps the virtual clock in fast mode)."""
+        self._wait_until(self._now() + seconds)
+
+    def _wait_until(self, t: float):
+        if self.realtime:
+            delay = (t - self._now()) / self.speed
+            if delay > 0: time.sleep(delay)
+        else:
+            self._clock = max(self._clock, t)
+
+    def _deliver(self):
+        now = self._now()
+        while self._pending and self._pending[0][0] <= now:
+            self._buffer += self._pending.popleft()[1]
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def in_waiting(self) -> int:
+        self._deliver()
+        return len(self._buffer)
+
+    def reset_input_buffer(self):
+        self._deliver()
+        self.discarded += len(self._buffer)
+        self._buffer.clear()
+
+    flushInput = reset_input_buffer
+
+    def reset_output_buffer(self):
+        pass
+
+    flushOutput = reset_output_buffer
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        match = self._next
+        while match < len(self._segments) and self._segments[match][1] != data:
+            if self.strict:
+                raise ReplayMismatch(f"wrote {data.hex()}, session expects {self._segments[match][1].hex()}")
+            match += 1
+        if match >= len(self._segments):
+            self.unmatched += 1     # Nothing recorded for this: the board stays silent
+            return len(data)
+
+        self.skipped += match - self._next
+        self._next = match + 1
+        t_write, _, replies = self._segments[match]
+        if not self.realtime and self._anchor is not None:
+            # Keep the recorded spacing between exchanges on the virtual clock
+            self._clock = max(self._clock, self._anchor[1] + (t_write - self._anchor[0]))
+        now = self._now()
+        self._anchor = (t_write, now)
+        self._pending.extend((now + off, chunk) for off, chunk in replies)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        # Real time: the timeout is wall time, the session runs `speed` times
+        # faster. Fast mode: the connection's clock is this one (recorded seconds)
+        scale = self.speed if self.realtime else 1.0
+        limit = float("inf") if self.timeout is None else self.timeout * scale
+        deadline = self._now() + limit
+        self._deliver()
+        while len(self._buffer) < size:
+            if not self._pending or self._pending[0][0] > deadline:
+                if limit != float("inf"): self._wait_until(deadline)
+                break
+            self._wait_until(self._pending[0][0])
+            self._deliver()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class Replayer:
+    """serialFactory that opens a ReplaySerial over a recorded session file."""
+    def __init__(self, path: str, realtime: bool = False, speed: float = 1.0, strict: bool = False):
+        self.port_name, events = read_session(path)
+        self.segments = _segments(events)
+        self.realtime, self.speed, self.strict = realtime, speed, strict
+        self.port = None    # The last ReplaySerial handed out
+
+    def __call__(self, url=None, *args, **kwargs):
+        self.port = ReplaySerial(self.segments, self.realtime, self.speed, self.strict)
+        return self.port
+
+    def now(self) -> float:
+        return self.port.now() if self.port else 0.0
+
+    def sleep(self, seconds: float):
+        if self.port: self.port.sleep(seconds)
+
+
+# ==============================================================================
+# 4. ENTRY POINT
+# ==============================================================================
+
+def dump(path: str):
+    port_name, events = read_session(path)
+    print(f"# {path}: {port_name}, {len(events)} events")
+    for t, kind, data in events:
+        print(f"{t:12.6f} {KIND_NAMES.get(kind, kind):<7} {data.hex(' ') if data else '(timeout)'}")
+
+
+def open_replay(path: str, board: str, realtime: bool = False, speed: float = 1.0, strict: bool = False):
+    """Returns a connection of the given board opened on a recorded session."""
+    from API import AirConditionerSystemConnection, CurtainControlSystemConnection
+    conn = {"ac": AirConditionerSystemConnection, "curtain": CurtainControlSystemConnection}[board]()
+    if board == "ac": conn.setpointCacheTTL = 0     # Replay every recorded read
+    conn.breaker.threshold = float("inf")           # Recorded timeouts must not stop the replay
+    factory = Replayer(path, realtime, speed, strict)
+    conn.serialFactory = factory
+    if not realtime:
+        # Replies arrive in microseconds of wall time on the virtual clock:
+        # time the exchanges on it, so deadlines are learned in recorded seconds
+        conn.clock, conn.sleep = factory.now, factory.sleep
+    conn.setComPort(path)
+    conn.open()
+    return conn
+
+
+def replay(path: str, board: str, realtime: bool = False, speed: float = 1.0, strict: bool = False):
+    """Runs update() over the whole session; returns (snapshots, seconds per update, port)."""
+    conn = open_replay(path, board, realtime, speed, strict)
+    port = conn.ser
+    snapshots, durations = [], []
+    while not port.exhausted:
+        before = port.position
+        start = time.perf_counter()
+        conn.update()
+        if port.position == before:
+            # Nothing left that update() sends (the session ends in setter writes)
+            port.skip_rest()
+            break
+        durations.append(time.perf_counter() - start)
+        snapshots.append(conn.snapshot())
+    return snapshots, durations, port
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or replay recorded serial sessions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_dump = sub.add_parser("dump", help="print the events of a session")
+    p_dump.add_argument("path")
+    p_replay = sub.add_parser("replay", help="run update() against a session")
+    p_replay.add_argument("path")
+    p_replay.add_argument("--board", choices=("ac", "curtain"), required=True)
+    p_replay.add_argument("--realtime", action="store_true", help="keep recorded timing on the wall clock")
+    p_replay.add_argument("--speed", type=float, default=1.0, help="real-time speed factor")
+    p_replay.add_argument("--strict", action="store_true", help="fail on the first unexpected write")
+    args = parser.parse_args(argv)
+
+    if args.command == "dump":
+        dump(args.path)
+        return 0
+
+    start = time.perf_counter()
+    snapshots, durations, port = replay(args.path, args.board, args.realtime, args.speed, args.strict)
+    elapsed = time.perf_counter() - start
+    print(f"{len(snapshots)} updates in {elapsed:.3f} s "
+          f"({sum(durations) / len(durations) * 1e6 if durations else 0:.0f} us per update)")
+    print(f"skipped {port.skipped}, unmatched {port.unmatched}, discarded {port.discarded} bytes")
+    if snapshots: print(f"last: {snapshots[-1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Telemetry storage for the board readings.
+
+TelemetryHistory keeps a bounded in-memory history per connection in
+fixed-size typed arrays (one column per field). Memory use is fixed at
+construction time, however long the polling runs.
+
+TelemetryLog is the persistent store: append-only segments of fixed-width
+binary records with a sparse timestamp index, read back through mmap.
+"""
+import os
+import math
+import mmap
+import time
+import queue
+import struct
+import bisect
+import threading
+from array import array
+
+from eventlog import get_logger
+
+log = get_logger("telemetry")
+
+_np = None
+
+
+def _numpy():
+    """Imports NumPy on first use (optional; queries fall back to array slices)."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np
+
+
+# ==============================================================================
+# 1. IN-MEMORY RING BUFFER
+# ==============================================================================
+
+class TelemetryHistory:
+    """
+    Ring buffer of timestamped samples stored column-wise in array('d').
+    append() is O(1); window queries binary-search the (sorted) timestamps
+    and reduce over at most two contiguous slices per column.
+    """
+    def __init__(self, fields, capacity: int = 86400):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._time = array("d", bytes(8 * capacity))
+        self._columns = {f: array("d", bytes(8 * capacity)) for f in self.fields}
+        self._head = 0      # Physical index of the next write
+        self._count = 0     # Number of valid samples
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, sample: dict, timestamp: float):
+        """Stores one sample (missing fields are stored as NaN). Timestamps must not go backwards."""
+        with self._lock:
+            i = self._head
+            self._time[i] = timestamp
+            for field, column in self._columns.items():
+                value = sample.get(field)
+                column[i] = math.nan if value is None else value
+            self._head = (i + 1) % self.capacity
+            if self._count < self.capacity: self._count += 1
+
+    # --- Index helpers (logical index 0 = oldest sample) ---
+    def _physical(self, logical: int) -> int:
+        return (self._head - self._count + logical) % self.capacity
+
+    def _first_at_or_after(self, t: float) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time[self._physical(mid)] < t: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def _segments(self, start: int):
+        """Physical (lo, hi) slices covering logical samples start..newest."""
+        n = self._count - start
+        if n <= 0: return []
+        lo = self._physical(start)
+        hi = lo + n
+        if hi <= self.capacity: return [(lo, hi)]
+        return [(lo, self.capacity), (0, hi - self.capacity)]
+
+    def _slices(self, column, segments):
+        np = _numpy()
+        if np:
+            return [np.frombuffer(column, dtype=np.float64)[lo:hi] for lo, hi in segments]
+        return [column[lo:hi] for lo, hi in segments]
+
+    # --- Queries ---
+    def latest_time(self):
+        with self._lock:
+            return self._time[self._physical(self._count - 1)] if self._count else None
+
+    def window(self, field: str, seconds: float, now: float = None):
+        """
+        Returns (timestamps, values) for the last `seconds` as copies
+        (NumPy arrays if NumPy is installed, otherwise array('d')).
+        """
+        with self._lock:
+            if now is None:
+                now = self._time[self._physical(self._count - 1)] if self._count else 0.0
+            segments = self._segments(self._first_at_or_after(now - seconds))
+            times = self._slices(self._time, segments)
+            values = self._slices(self._columns[field], segments)
+            np = _numpy()
+            if np:
+                return (np.concatenate(times) if times else np.empty(0),
+                        np.concatenate(values) if values else np.empty(0))
+            out_t, out_v = array("d"), array("d")
+            for t, v in zip(times, values):
+                out_t.extend(t)
+                out_v.extend(v)
+            return out_t, out_v
+
+    def stats(self, field: str, seconds: float, now: float = None) -> dict:
+        """min / max / mean / count of a field over the last `seconds` (NaNs ignored)."""
+        with self._lock:
+            if now is None:
+                now = self._time[self._physical(self._count - 1)] if self._count else 0.0
+            segments = self._segments(self._first_at_or_after(now - seconds))
+            parts = self._slices(self._columns[field], segments)
+            np = _numpy()
+            if np:
+                data = np.concatenate(parts) if len(parts) > 1 else (parts[0] if parts else np.empty(0))
+                data = data[~np.isnan(data)]
+                if data.size == 0: return {"min": None, "max": None, "mean": None, "count": 0}
+                return {"min": float(data.min()), "max": float(data.max()),
+                        "mean": float(data.mean()), "count": int(data.size)}
+            values = [v for part in parts for v in part if v == v]   # v == v drops NaN
+            if not values: return {"min": None, "max": None, "mean": None, "count": 0}
+            return {"min": min(values), "max": max(values),
+                    "mean": math.fsum(values) / len(values), "count": len(values)}
+
+
+# ==============================================================================
+# 2. ON-DISK LOG (Append-only segments + sparse index, mmap reads)
+# ==============================================================================
+
+# Same fields the connection classes expose; a board stores NaN for the ones it lacks
+RECORD_FIELDS = (
+    "desiredTemperature", "ambientTemperature", "fanSpeed",
+    "curtainStatus", "outdoorTemperature", "outdoorPressure", "lightIntensity",
+)
+RECORD = struct.Struct("<d" + "f" * len(RECORD_FIELDS))   # timestamp + float32 fields
+INDEX_ENTRY = struct.Struct("<dQ")                         # (timestamp, record number)
+
+
+class TelemetryLog:
+    """
+    Append-only telemetry store, one directory per board:
+
+        <root>/<board>/<start_ms>.seg   fixed-width RECORD entries
+        <root>/<board>/<start_ms>.idx   one INDEX_ENTRY every `index_every` records
+
+    append() only enqueues; a writer thread does the file I/O, so the
+    acquisition loop never blocks on disk. If the queue is full the sample is
+    dropped and counted in `dropped`.
+    Range queries pick segments by name, bisect the sparse index, and mmap
+    just the matching record span.
+    """
+    def __init__(self, root: str, segment_records: int = 1 << 20, index_every: int = 256,
+                 queue_size: int = 10000, flush_interval: float = 1.0):
+        self.root = root
+        self.segment_records = segment_records
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._segments = {}     # board -> [seg_file, idx_file, record_count]
+        os.makedirs(root, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="telemetry-log", daemon=True)
+        self._thread.start()
+
+    # --- Write path ---
+    def append(self, board: str, sample: dict, timestamp: float):
+        """Queues one sample for writing (never blocks)."""
+        try:
+            self._queue.put_nowait((board, sample, timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Writes out everything queued so far and closes the files."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _board_dir(self, board: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in board)
+        return os.path.join(self.root, safe)
+
+    def _open_segment(self, board: str, timestamp: float):
+        directory = self._board_dir(board)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{int(timestamp * 1000):015d}")
+        while os.path.exists(base + ".seg"):   # Two segments started in the same ms
+            base += "_"
+        seg = [open(base + ".seg", "ab"), open(base + ".idx", "ab"), 0]
+        self._segments[board] = seg
+        return seg
+
+    def _write(self, board: str, sample: dict, timestamp: float):
+        seg = self._segments.get(board)
+        if seg is None or seg[2] >= self.segment_records:
+            if seg is not None:
+                seg[0].close()
+                seg[1].close()
+            seg = self._open_segment(board, timestamp)
+        values = [sample.get(f) for f in RECORD_FIELDS]
+        seg[0].write(RECORD.pack(timestamp, *(math.nan if v is None else v for v in values)))
+        if seg[2] % self.index_every == 0:
+            seg[1].write(INDEX_ENTRY.pack(timestamp, seg[2]))
+        seg[2] += 1
+
+    def _flush(self):
+        for seg_file, idx_file, _ in self._segments.values():
+            seg_file.flush()
+            idx_file.flush()
+
+    def _writer(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                try:
+                    self._write(*item)
+                except (OSError, struct.error, TypeError) as e:
+                    log.error("Telemetry write error: %s", e)
+            if time.monotonic() - last_flush >= self.flush_interval or self._queue.empty():
+                self._flush()
+                last_flush = time.monotonic()
+        # Drain whatever is still queued, then close
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item: self._write(*item)
+        for seg_file, idx_file, _ in self._segments.values():
+            seg_file.close()
+            idx_file.close()
+        self._segments.clear()
+
+    # --- Read path ---
+    def boards(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def _segment_bases(self, board: str):
+        directory = self._board_dir(board)
+        if not os.path.isdir(directory): return []
+        names = sorted(n[:-4] for n in os.listdir(directory) if n.endswith(".seg"))
+        return [(int(n.rstrip("_")) / 1000.0, os.path.join(directory, n)) for n in names]
+
+    def _record_span(self, base: str, start: float, end: float, total: int):
+        """Uses the sparse index to bound the records that can fall in [start, end]."""
+        try:
+            with open(base + ".idx", "rb") as f:
+                raw = f.read()
+        except OSError:
+            return 0, total
+        entries = [INDEX_ENTRY.unpack_from(raw, i) for i in range(0, len(raw) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)]
+        if not entries: return 0, total
+        times = [e[0] for e in entries]
+        lo_i = bisect.bisect_right(times, start) - 1
+        hi_i = bisect.bisect_right(times, end)
+        lo = entries[lo_i][1] if lo_i >= 0 else 0
+        hi = entries[hi_i][1] if hi_i < len(entries) else total
+        return lo, min(hi, total)
+
+    def query(self, board: str, start: float, end: float, fields=None) -> dict:
+        """
+        Returns {"timestamp": [...], field: [...], ...} for records with
+        start <= timestamp <= end. Values are NumPy arrays when NumPy is
+        installed, otherwise array('d').
+        """
+        fields = tuple(fields) if fields else RECORD_FIELDS
+        columns = [RECORD_FIELDS.index(f) + 1 for f in fields]
+        np = _numpy()
+        chunks = []
+
+        bases = self._segment_bases(board)
+        for i, (seg_start, base) in enumerate(bases):
+            seg_end = bases[i + 1][0] if i + 1 < len(bases) else math.inf
+            if seg_start > end or seg_end < start: continue
+            try:
+                size = os.path.getsize(base + ".seg")
+            except OSError:
+                continue
+            total = size // RECORD.size      # Ignores a torn trailing record
+            if total == 0: continue
+            lo, hi = self._record_span(base, start, end, total)
+            if hi <= lo: continue
+            with open(base + ".seg", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = mm[lo * RECORD.size:hi * RECORD.size]   # Only these pages are touched
+            if np:
+                dtype = np.dtype([("timestamp", "<f8")] + [(f, "<f4") for f in RECORD_FIELDS])
+                recs = np.frombuffer(view, dtype=dtype)
+                recs = recs[(recs["timestamp"] >= start) & (recs["timestamp"] <= end)]
+                chunks.append({"timestamp": recs["timestamp"].copy(),
+                               **{f: recs[f].astype(np.float64) for f in fields}})
+            else:
+                out = {"timestamp": array("d"), **{f: array("d") for f in fields}}
+                for rec in RECORD.iter_unpack(view):
+                    if start <= rec[0] <= end:
+                        out["timestamp"].append(rec[0])
+                        for f, c in zip(fields, columns):
+                            out[f].append(rec[c])
+                chunks.append(out)
+
+        keys = ("timestamp",) + fields
+        if np:
+            if not chunks: return {k: np.empty(0) for k in keys}
+            return {k: np.concatenate([c[k] for c in chunks]) for k in keys}
+        result = {k: array("d") for k in keys}
+        for c in chunks:
+            for k in keys: result[k].extend(c[k])
+        return result
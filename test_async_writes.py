@@ -0,0 +1,78 @@
+"""
+Emulator regression tests for the setter write lane.
+
+A setter queued while updateAsync() is refreshing must only wait for the
+exchange already on the wire, not for the rest of the update(), and
+setpoints queued behind a write in flight collapse to the newest one.
+
+Run with: python -m pytest -q test_async_writes.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import start_boards
+from API import AirConditionerSystemConnection
+
+DELAY = 0.1     # Board response time: a legacy update() takes five of them
+
+
+@pytest.fixture
+def ac_board():
+    install_event_log(console=False)
+    ac, cc = start_boards(delay=DELAY, bulk=False, seed=1)
+    yield ac
+    ac.stop()
+    cc.stop()
+
+
+def test_setter_does_not_wait_for_update(ac_board):
+    ac = AirConditionerSystemConnection()
+    ac.setComPort(ac_board.device)
+    assert ac.open()
+    ac.adaptiveDeadlines = False
+    ac.setpointCacheTTL = 0     # Read all five registers on every update
+    try:
+        refresh = ac.updateAsync()
+        time.sleep(1.5 * DELAY)     # The update is now on its second exchange
+        started = time.monotonic()
+        assert ac.setDesiredTempAsync(25.0).result(timeout=5.0)
+        waited = time.monotonic() - started
+        # One exchange on the wire plus the 50 ms pacing between the two bytes,
+        # not the three exchanges left in the update()
+        assert waited < 2 * DELAY + 0.05 + 0.05
+        assert not refresh.done()
+        refresh.result(timeout=5.0)
+    finally:
+        ac.close()
+
+
+def test_queued_setpoints_coalesce(ac_board):
+    ac = AirConditionerSystemConnection()
+    ac.setComPort(ac_board.device)
+    assert ac.open()
+    try:
+        with ac.portLock.hold():
+            # The first write takes the queue's thread and waits for the port
+            first = ac.setDesiredTempAsync(20.0)
+            deadline = time.monotonic() + 5.0
+            while ac.writes.pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            received = ac_board.rx_bytes
+            later = [ac.setDesiredTempAsync(t) for t in (21.0, 22.0, 23.0)]
+            assert ac.writes.pending() == 1
+        assert first.result(timeout=5.0)
+        # The superseded setpoints resolve with the result of the one sent
+        assert [f.result(timeout=5.0) for f in later] == [True, True, True]
+        assert ac.writes.coalesced == 2
+        deadline = time.monotonic() + 5.0
+        while ac_board.rx_bytes < received + 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(2 * DELAY)
+        assert ac_board.rx_bytes == received + 4    # Two writes of two bytes each
+        assert ac_board.model.target_int == 23
+    finally:
+        ac.close()
@@ -0,0 +1,124 @@
+"""
+Emulator regression tests for the 0x0F bulk status frame.
+
+Bad frames must fall back to the single-value reads, and firmware without
+the opcode must be detected after BULK_PROBES silent probes (one lost
+reply is not enough) and re-probed later in case it was reflashed.
+
+Run with: python -m pytest -q test_bulk_status.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import EmulatedBoard, AirConditionerModel, BULK_COMMAND
+from metrics import LinkMetrics, MetricsRegistry
+from API import AirConditionerSystemConnection
+
+
+def _bad_checksum(frame: bytes) -> bytes:
+    return frame[:-1] + bytes([(frame[-1] + 1) & 0xFF])
+
+
+def _bad_length(frame: bytes) -> bytes:
+    # Valid checksum over a LEN byte that does not match the payload
+    body = bytes([frame[0] - 1]) + frame[1:-1]
+    return body + bytes([sum(body) & 0xFF])
+
+
+class CorruptFrameModel(AirConditionerModel):
+    """board1 whose status frames come back damaged by `corrupt`."""
+    def __init__(self, corrupt, **kwargs):
+        super().__init__(**kwargs)
+        self.corrupt = corrupt
+        self.received = []
+
+    def handle_byte(self, byte: int) -> bytes:
+        self.received.append(byte)
+        reply = super().handle_byte(byte)
+        if byte == BULK_COMMAND and reply: reply = self.corrupt(reply)
+        return reply
+
+
+def _board(model):
+    install_event_log(console=False)
+    board = EmulatedBoard(model, delay=0.005, seed=1)
+    board.start()
+    return board
+
+
+def _open(board):
+    conn = AirConditionerSystemConnection()
+    conn.metrics = LinkMetrics(MetricsRegistry())
+    conn.setpointCacheTTL = 0
+    conn.setComPort(board.device)
+    assert conn.open()
+    return conn
+
+
+@pytest.mark.parametrize("corrupt", [_bad_checksum, _bad_length])
+def test_bad_frame_falls_back_to_single_reads(corrupt):
+    board = _board(CorruptFrameModel(corrupt, seed=1))
+    ac = _open(board)
+    try:
+        ac.update()
+        assert ac.metrics.frame_errors.get((ac.name,)) == 1
+        # The board did answer: a bad frame says nothing about the firmware
+        assert ac.bulkSupported is None
+        assert board.model.received == [BULK_COMMAND, 0x01, 0x02, 0x03, 0x04, 0x05]
+        assert ac.desiredTemperature == 22.0
+        assert ac.ambientTemperature == pytest.approx(24.0, abs=0.5)
+    finally:
+        ac.close()
+        board.stop()
+
+
+def test_legacy_firmware_detected_and_reprobed():
+    board = _board(AirConditionerModel(seed=1, bulk=False))
+    ac = _open(board)
+    ac.BULK_REPROBE = 0.5
+    probes = []
+    ac.onBulkProbe = probes.append
+    try:
+        # Silent probes: the first two are not enough to give up on the opcode
+        for _ in range(ac.BULK_PROBES - 1):
+            ac.update()
+            assert ac.bulkSupported is None
+        ac.update()
+        assert ac.bulkSupported is False and probes == [False]
+        assert ac.desiredTemperature == 22.0
+        # No probe until BULK_REPROBE has passed
+        sent = board.rx_bytes
+        ac.update()
+        assert board.rx_bytes == sent + len(ac.STATUS_COMMANDS)
+        # Reflashed firmware is picked up by the next re-probe
+        board.model.bulk = True
+        time.sleep(ac.BULK_REPROBE)
+        sent = board.rx_bytes
+        ac.update()
+        assert ac.bulkSupported is True and probes == [False, True]
+        assert board.rx_bytes == sent + 1
+        # Silent probes never counted as timeouts
+        assert sum(st["timeouts"] for st in ac.getTimingStats().values()) == 0
+    finally:
+        ac.close()
+        board.stop()
+
+
+def test_one_lost_frame_keeps_bulk_support():
+    board = _board(AirConditionerModel(seed=1))
+    ac = _open(board)
+    try:
+        ac.update()
+        assert ac.bulkSupported is True
+        board.drop_rate = 1.0
+        ac.update()             # Frame lost: a timeout, not a legacy verdict
+        board.drop_rate = 0.0
+        assert ac.bulkSupported is True
+        assert ac.getTimingStats()[BULK_COMMAND]["timeouts"] == 1
+    finally:
+        ac.close()
+        board.stop()
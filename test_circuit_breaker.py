@@ -0,0 +1,104 @@
+"""
+Emulator regression tests for the per-connection circuit breaker.
+
+The emulated board goes silent (every reply dropped) to trip the breaker,
+then answers again so the background re-probe closes it.
+
+Run with: python -m pytest -q test_circuit_breaker.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import start_boards
+from metrics import LinkMetrics, MetricsRegistry
+from API import AirConditionerSystemConnection, CircuitBreaker
+
+BASE_DELAY = 0.2
+
+
+@pytest.fixture
+def ac_board():
+    install_event_log(console=False)
+    ac, cc = start_boards(delay=0.005, seed=1)
+    yield ac
+    ac.stop()
+    cc.stop()
+
+
+@pytest.fixture
+def ac(ac_board):
+    conn = AirConditionerSystemConnection()
+    conn.metrics = LinkMetrics(MetricsRegistry())
+    conn.breaker = CircuitBreaker(threshold=3, base_delay=BASE_DELAY, max_delay=4 * BASE_DELAY)
+    conn.adaptiveDeadlines = False
+    conn.REPLY_DEADLINE = 0.1
+    conn.setComPort(ac_board.device)
+    assert conn.open()
+    yield conn
+    conn.close()
+
+
+def _wait_for_retry(breaker):
+    time.sleep(breaker.retry_in() + 0.01)
+
+
+def test_breaker_cycle(ac_board, ac):
+    breaker = ac.breaker
+    ac_board.drop_rate = 1.0    # Board goes silent
+
+    # CLOSED -> OPEN after `threshold` consecutive timeouts
+    for _ in range(2):
+        assert ac._send_command(0x05) is None
+        assert breaker.state == CircuitBreaker.CLOSED
+    assert ac._send_command(0x05) is None
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() == pytest.approx(BASE_DELAY, abs=0.05)
+
+    # While open, exchanges fail fast without touching the port
+    sent = ac_board.rx_bytes
+    started = time.monotonic()
+    assert ac._send_command(0x05) is None
+    assert time.monotonic() - started < 0.05
+    assert ac_board.rx_bytes == sent
+    assert not ac.recover()     # Backoff not over yet: no trial
+    assert ac_board.rx_bytes == sent
+
+    # A failed trial re-opens it with a doubled backoff, up to max_delay
+    for delay in (2 * BASE_DELAY, 4 * BASE_DELAY, 4 * BASE_DELAY):
+        _wait_for_retry(breaker)
+        assert not ac.recover()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.delay == pytest.approx(delay)
+
+    # The board answers again: the trial closes it and resets the backoff
+    ac_board.drop_rate = 0.0
+    _wait_for_retry(breaker)
+    assert ac.recover()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert (breaker.failures, breaker.delay) == (0, BASE_DELAY)
+    assert ac._send_command(0x02) == 22
+
+
+def test_half_open_admits_one_trial():
+    breaker = CircuitBreaker(threshold=1, base_delay=BASE_DELAY)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    _wait_for_retry(breaker)
+    assert breaker.allow()      # Claims the trial slot
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # Nothing else while the trial is in flight
+    assert breaker.record(True) == CircuitBreaker.CLOSED
+
+
+def test_breaker_blocks_setters_and_resets_on_close(ac_board, ac):
+    ac_board.drop_rate = 1.0
+    for _ in range(3): ac._send_command(0x05)
+    assert ac.breaker.is_open()
+    assert not ac.setDesiredTemp(25.0)      # Fails fast instead of writing into a dead link
+    ac.close()
+    assert ac.breaker.state == CircuitBreaker.CLOSED
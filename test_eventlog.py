@@ -0,0 +1,43 @@
+"""
+Tests for eventlog.install(): repeat calls share one ring and handler set.
+
+Run with: python -m pytest -q test_eventlog.py
+"""
+import logging
+
+import pytest
+
+import eventlog
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """Starts from an uninstalled event log and restores the package logger after."""
+    logger = eventlog.get_logger()
+    handlers, level = list(logger.handlers), logger.level
+    for name in ("_ring", "_console", "_level"):
+        monkeypatch.setattr(eventlog, name, None)
+    yield logger
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+
+
+def test_install_is_idempotent(fresh):
+    ring = eventlog.install(capacity=10, level=logging.WARNING, console=True)
+    handlers = list(fresh.handlers)
+    assert eventlog.install(capacity=10, level=logging.WARNING, console=True) is ring
+    assert fresh.handlers == handlers
+    eventlog.get_logger("test").warning("once")
+    assert [e["message"] for e in ring.events()] == ["once"]
+
+
+def test_repeat_install_grows_and_relevels(fresh):
+    ring = eventlog.install(capacity=10, level=logging.WARNING)
+    for i in range(10): eventlog.get_logger("test").warning("w%d", i)
+    assert eventlog.install(capacity=100, level=logging.INFO) is ring
+    assert ring.records.maxlen == 100
+    assert len(ring.records) == 10      # Kept across the resize
+    assert fresh.level == logging.INFO
+    # A smaller or quieter request does not take anything from the first caller
+    eventlog.install(capacity=5, level=logging.ERROR)
+    assert (ring.records.maxlen, fresh.level) == (100, logging.INFO)
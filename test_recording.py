@@ -0,0 +1,81 @@
+"""
+Emulator regression tests for session record and replay.
+
+Sessions are recorded against the pty emulator with recording.Recorder and
+fed back through recording.replay() on the virtual clock.
+
+Run with: python -m pytest -q test_recording.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import start_boards
+from recording import Recorder, open_replay, replay
+from API import AirConditionerSystemConnection
+
+UPDATES = 3
+
+
+DELAY = 0.02    # Board response time, well above the replay's wall-clock cost
+
+
+@pytest.fixture
+def ac_board():
+    install_event_log(console=False)
+    ac, cc = start_boards(delay=DELAY, bulk=False, seed=1)
+    yield ac
+    ac.stop()
+    cc.stop()
+
+
+def _record(board, path, session):
+    conn = AirConditionerSystemConnection()
+    conn.setpointCacheTTL = 0
+    recorder = Recorder(str(path))
+    conn.serialFactory = recorder
+    conn.setComPort(board.device)
+    assert conn.open()
+    try:
+        session(conn)
+    finally:
+        conn.close()
+        recorder.close()
+    return conn
+
+
+def test_replay_ends_after_trailing_setter(ac_board, tmp_path):
+    path = tmp_path / "ac.rec"
+
+    def session(conn):
+        for _ in range(UPDATES): conn.update()
+        assert conn.setDesiredTemp(25.0)
+
+    _record(ac_board, path, session)
+    snapshots, _, port = replay(str(path), "ac")
+    # The 0x80/0xC0 setpoint bytes are never sent by update(): they are
+    # skipped instead of keeping the replay waiting for a match forever
+    assert len(snapshots) == UPDATES
+    assert port.exhausted
+    assert port.skipped == 2
+    assert snapshots[-1]["desiredTemperature"] == 22.0
+
+
+def test_replay_learns_recorded_deadlines(ac_board, tmp_path):
+    path = tmp_path / "ac.rec"
+    live = _record(ac_board, path, lambda conn: [conn.update() for _ in range(UPDATES * 5)])
+    replayed = open_replay(str(path), "ac")
+    started = time.perf_counter()
+    while not replayed.ser.exhausted:
+        replayed.update()
+    assert time.perf_counter() - started < DELAY * UPDATES * 5     # Virtual clock, not real time
+    # Round trips are timed on the session clock, so the adaptive deadlines
+    # match the live ones instead of shrinking to the replay's wall time
+    for cmd, st in live.getTimingStats().items():
+        again = replayed.getTimingStats()[cmd]
+        assert again["timeouts"] == st["timeouts"]
+        assert again["srtt"] == pytest.approx(st["srtt"], rel=0.2)
+    assert replayed.snapshot() == live.snapshot()
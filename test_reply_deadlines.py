@@ -0,0 +1,91 @@
+"""
+Emulator regression tests for the adaptive reply deadlines.
+
+A deadline that is too short does not always show up as a timeout: the late
+reply can land during the next exchange and be taken as its answer. These
+tests therefore check the decoded values against what the emulated board
+holds, with jitter close to the deadline and commands sent back to back.
+
+Run with: python -m pytest -q test_reply_deadlines.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import start_boards
+from API import AirConditionerSystemConnection, CurtainControlSystemConnection
+
+UPDATES = 40
+
+
+@pytest.fixture
+def boards(request):
+    install_event_log(console=False)
+    delay, jitter = request.param
+    ac, cc = start_boards(delay=delay, jitter=jitter, bulk=False, seed=1)
+    yield ac, cc
+    ac.stop()
+    cc.stop()
+
+
+def _open(cls, board):
+    conn = cls()
+    conn.setComPort(board.device)
+    assert conn.open()
+    return conn
+
+
+@pytest.mark.parametrize("boards", [(0.005, 0.05), (0.005, 0.07)], indirect=True)
+def test_ac_readings_are_not_shifted(boards):
+    ac_board, _ = boards
+    ac = _open(AirConditionerSystemConnection, ac_board)
+    ac.setpointCacheTTL = 0     # Read 0x01/0x02 on every update
+    try:
+        setpoints = []
+        for _ in range(UPDATES):
+            ac.update()
+            setpoints.append(ac.desiredTemperature)
+        # A late reply taken as the next command's answer shifts the setpoint
+        # pair onto other registers (e.g. "0.<fan speed>")
+        assert [t for t in setpoints if t != 22.0] == []
+    finally:
+        ac.close()
+
+
+@pytest.mark.parametrize("boards", [(0.005, 0.07)], indirect=True)
+def test_curtain_readings_are_not_swapped(boards):
+    _, cc_board = boards
+    cc = _open(CurtainControlSystemConnection, cc_board)
+    try:
+        assert cc.setCurtainStatus(50)
+        deadline = time.monotonic() + 5.0
+        while cc_board.model.current != 50 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        readings = []
+        for _ in range(UPDATES):
+            cc.update()
+            readings.append((cc.curtainStatus, cc.lightIntensity))
+        # The LDR stays near 0 at the start of the simulated day, so a swap
+        # puts 50 into lightIntensity or a small value into curtainStatus
+        assert [r for r in readings if r[0] != 50 or r[1] >= 50] == []
+    finally:
+        cc.close()
+
+
+@pytest.mark.parametrize("boards", [(0.005, 0.002)], indirect=True)
+def test_deadlines_follow_a_fast_link(boards):
+    ac_board, _ = boards
+    ac = _open(AirConditionerSystemConnection, ac_board)
+    ac.setpointCacheTTL = 0
+    try:
+        for _ in range(UPDATES):
+            ac.update()
+        stats = ac.getTimingStats()
+        assert sum(st["timeouts"] for st in stats.values()) == 0
+        assert all(st["deadline"] < ac.REPLY_DEADLINE / 4 for st in stats.values())
+        assert ac.snapshot()["desiredTemperature"] == 22.0
+    finally:
+        ac.close()
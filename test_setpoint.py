@@ -0,0 +1,54 @@
+"""
+Emulator regression tests for the AC setpoint encoding.
+
+board1.asm keeps TARGET_TEMP_FRAC in hundredths and compares it directly
+with the ambient FRAC_TEMP hundredths; the API must write and read it back
+the same way on the single-value and the 0x0F frame paths.
+
+Run with: python -m pytest -q test_setpoint.py   (POSIX, needs ptys)
+"""
+import time
+
+import pytest
+
+pytest.importorskip("pty")      # emulator.py serves the boards on pseudo-terminals
+
+from eventlog import install as install_event_log
+from emulator import start_boards, AirConditionerModel
+from API import AirConditionerSystemConnection
+
+
+@pytest.fixture(params=[True, False], ids=["bulk", "legacy"])
+def ac_board(request):
+    install_event_log(console=False)
+    ac, cc = start_boards(bulk=request.param, seed=1)
+    yield ac
+    ac.stop()
+    cc.stop()
+
+
+def test_setpoint_round_trip(ac_board):
+    ac = AirConditionerSystemConnection()
+    ac.setComPort(ac_board.device)
+    assert ac.open()
+    ac.setpointCacheTTL = 0     # Read the setpoint back from the board
+    try:
+        assert ac.setDesiredTemp(25.5)
+        deadline = time.monotonic() + 5.0
+        while ac_board.model.target_int != 25 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert (ac_board.model.target_int, ac_board.model.target_frac) == (25, 50)
+        ac.update()
+        assert ac.desiredTemperature == 25.5
+    finally:
+        ac.close()
+
+
+def test_control_compares_hundredths():
+    # Target 25.35: 25.38 is above it (cooler), 25.30 below it (heater)
+    model = AirConditionerModel(ambient=25.38, target=25.35, seed=1)
+    model.step(0.0)
+    assert model.cooler and not model.heater
+    model = AirConditionerModel(ambient=25.30, target=25.35, seed=1)
+    model.step(0.0)
+    assert model.heater and not model.cooler
@@ -0,0 +1,110 @@
+"""
+Tests for the telemetry stores: ring buffer wraparound in TelemetryHistory
+and sparse-index range queries across TelemetryLog segments.
+
+Run with: python -m pytest -q test_telemetry.py
+"""
+import math
+
+import pytest
+
+import telemetry
+from telemetry import TelemetryHistory, TelemetryLog
+
+CAPACITY = 5
+T0 = 1000.0
+SAMPLES = 35        # Four segments of 10 records (the last one partial)
+
+
+@pytest.fixture(autouse=True, params=["numpy", "array"])
+def backend(request, monkeypatch):
+    """Runs every test with NumPy slices and with the array('d') fallback."""
+    if request.param == "numpy": pytest.importorskip("numpy")
+    else: monkeypatch.setattr(telemetry, "_np", False)
+
+
+@pytest.fixture
+def wrapped():
+    # 8 samples into 5 slots: the oldest three are overwritten and the
+    # logical order (3..7) starts in the middle of the arrays
+    history = TelemetryHistory(("x",), CAPACITY)
+    for t in range(8):
+        history.append({"x": float(t)}, float(t))
+    return history
+
+
+def test_wraparound_keeps_newest(wrapped):
+    assert len(wrapped) == CAPACITY
+    assert wrapped.latest_time() == 7.0
+    times, values = wrapped.window("x", 100.0)
+    assert list(times) == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert list(values) == list(times)
+
+
+def test_window_across_the_wrap(wrapped):
+    # Samples 4..7 sit at the end and the start of the arrays
+    times, values = wrapped.window("x", 3.0)
+    assert list(times) == [4.0, 5.0, 6.0, 7.0]
+    assert list(values) == list(times)
+
+
+def test_stats_across_the_wrap(wrapped):
+    assert wrapped.stats("x", 100.0) == {"min": 3.0, "max": 7.0, "mean": 5.0, "count": 5}
+    wrapped.append({}, 8.0)     # Missing field: NaN, ignored by stats
+    stats = wrapped.stats("x", 100.0)
+    assert (stats["min"], stats["max"], stats["count"]) == (4.0, 7.0, 4)
+    assert math.isnan(wrapped.window("x", 0.0)[1][-1])
+
+
+def test_empty_history():
+    history = TelemetryHistory(("x",), CAPACITY)
+    assert history.latest_time() is None
+    assert list(history.window("x", 10.0)[0]) == []
+    assert history.stats("x", 10.0)["count"] == 0
+
+
+@pytest.fixture
+def telemetry_log(tmp_path):
+    # Small segments and a sparse index (every 3rd record) so that query
+    # bounds fall between index entries and across segment files
+    store = TelemetryLog(str(tmp_path), segment_records=10, index_every=3)
+    for i in range(SAMPLES):
+        store.append("ac", {"ambientTemperature": 20.0 + i}, T0 + i)
+    store.close()
+    return store
+
+
+def _times(result):
+    return [t - T0 for t in result["timestamp"]]
+
+
+def test_log_segments(telemetry_log, tmp_path):
+    assert telemetry_log.boards() == ["ac"]
+    assert len(list((tmp_path / "ac").glob("*.seg"))) == 4
+    assert _times(telemetry_log.query("ac", 0.0, math.inf)) == list(range(SAMPLES))
+
+
+def test_log_range_across_segments(telemetry_log):
+    result = telemetry_log.query("ac", T0 + 8.5, T0 + 23.0, ["ambientTemperature"])
+    assert _times(result) == list(range(9, 24))
+    assert list(result["ambientTemperature"]) == [20.0 + i for i in range(9, 24)]
+    assert set(result) == {"timestamp", "ambientTemperature"}
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (10, 10, [10]),                 # First record of a segment
+    (9, 10, [9, 10]),               # Last of one segment, first of the next
+    (4, 5, [4, 5]),                 # Between two index entries (3 and 6)
+    (29, 29, [29]),                 # Last record of a full segment
+    (34, 100, [34]),                # Tail of the partial last segment
+    (-10, -1, []),                  # Before the first record
+    (40, 50, []),                   # After the last record
+])
+def test_log_range_bounds(telemetry_log, start, end, expected):
+    assert _times(telemetry_log.query("ac", T0 + start, T0 + end)) == expected
+
+
+def test_log_missing_fields_are_nan(telemetry_log):
+    result = telemetry_log.query("ac", T0, T0, ["fanSpeed"])
+    assert math.isnan(result["fanSpeed"][0])
+    assert _times(telemetry_log.query("curtain", 0.0, math.inf)) == []